@@ -0,0 +1,162 @@
+# aho_corasick.py
+"""
+Aho-Corasick multi-pattern matching for MediGuideAI
+
+Compiles a set of phrases into one automaton so that every occurrence of every
+phrase is found in a single left-to-right pass over the text, in time linear
+in the text length plus the number of matches. Matching is case-insensitive.
+
+`TokenAhoCorasick` runs the same automaton over a sequence of tokens (words)
+instead of characters, with every transition in one flat dict; that keeps
+dictionaries of hundreds of thousands of multi-word phrases affordable.
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+Match = Tuple[int, int, Any]
+
+
+def _fold(text: str) -> str:
+    """Lowercase `text` without changing its length, so match offsets stay valid."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        """Build the automaton from (phrase, value) pairs; later duplicates win."""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # state -> [(pattern length, value)] for every pattern ending there
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self.size = 0
+        for phrase, value in patterns:
+            phrase = _fold(phrase)
+            if not phrase:
+                continue
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state] = [o for o in self._out[state] if o[0] != len(phrase)] + [(len(phrase), value)]
+            self.size += 1
+        self._link()
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # inherit the outputs of the longest proper suffix
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[Match]:
+        """Yield (start, end, value) for every occurrence, overlapping ones included."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(_fold(text)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
+
+    def find(self, text: str, whole_words: bool = True) -> List[Match]:
+        """Leftmost-longest, non-overlapping matches.
+
+        With `whole_words`, a match must not start or end inside a word, so
+        "iron" is not found in "ironing".
+        """
+        hits = []
+        for start, end, value in self.iter(text):
+            if whole_words and ((start > 0 and text[start - 1].isalnum()) or
+                                (end < len(text) and text[end].isalnum())):
+                continue
+            hits.append((start, end, value))
+        hits.sort(key=lambda m: (m[0], m[0] - m[1]))
+        chosen: List[Match] = []
+        last_end = 0
+        for start, end, value in hits:
+            if start >= last_end:
+                chosen.append((start, end, value))
+                last_end = end
+        return chosen
+
+
+class TokenAhoCorasick:
+    def __init__(self, patterns: Iterable[Tuple[Sequence[str], Any]]):
+        """Build the automaton from (tokens, value) pairs; later duplicates win.
+
+        Tokens are compared as given, so fold them the same way as the text.
+        """
+        # (state, token) -> state
+        self._goto: Dict[Tuple[int, str], int] = {}
+        self._fail: List[int] = [0]
+        # state -> [(pattern length in tokens, value)] for every pattern ending there
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self.size = 0
+        self.max_tokens = 0
+        children: List[List[str]] = [[]]
+        for tokens, value in patterns:
+            tokens = tuple(tokens)
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                nxt = self._goto.get((state, token))
+                if nxt is None:
+                    nxt = len(self._fail)
+                    self._goto[(state, token)] = nxt
+                    children[state].append(token)
+                    children.append([])
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state] = [o for o in self._out[state] if o[0] != len(tokens)] + [(len(tokens), value)]
+            self.size += 1
+            self.max_tokens = max(self.max_tokens, len(tokens))
+        self._link(children)
+
+    def _link(self, children: List[List[str]]) -> None:
+        goto = self._goto
+        queue = deque(goto[(0, t)] for t in children[0])
+        while queue:
+            state = queue.popleft()
+            for token in children[state]:
+                nxt = goto[(state, token)]
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and (f, token) not in goto:
+                    f = self._fail[f]
+                target = goto.get((f, token), 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, tokens: Iterable[str]) -> Iterator[Match]:
+        """Yield (first token, last token + 1, value) for every occurrence."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, token in enumerate(tokens):
+            nxt = goto.get((state, token))
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto.get((state, token))
+            state = nxt or 0
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
@@ -0,0 +1,12 @@
+"""
+Drug catalogue package for MediGuideAI
+"""
+
+from .catalogue import (Catalogue, CatalogueUpdateError, build_default_catalogue,
+                        catalogue_version, get_catalogue)
+from .facets import FacetIndex, iter_bits, popcount
+from .fields import FieldParser
+from .interactions import InteractionGraph, parse_interactions
+
+__all__ = ['Catalogue', 'CatalogueUpdateError', 'build_default_catalogue', 'catalogue_version',
+           'get_catalogue', 'FacetIndex', 'FieldParser', 'iter_bits', 'popcount', 'InteractionGraph', 'parse_interactions']
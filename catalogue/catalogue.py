@@ -0,0 +1,336 @@
+# catalogue/catalogue.py
+"""
+Drug catalogue with its derived indexes.
+
+A `Catalogue` owns the list of drug records and every index built from them.
+Indexes are built once per catalogue version; `get_catalogue()` keeps one
+instance per process so Streamlit reruns reuse it.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from aho_corasick import AhoCorasick
+from rules import load_rules, RulesLoadError
+
+from .conditions import ConditionIndex
+from .facets import FacetIndex, iter_bits, normalize_term, popcount
+from .interactions import InteractionGraph
+from .spelling import SpellingIndex
+
+SEARCH_CACHE_SIZE = 128
+CATALOGUE_PATH_ENV = "MEDIGUIDE_CATALOGUE"
+SNAPSHOT_PATH_ENV = "MEDIGUIDE_SNAPSHOT"
+
+
+def catalogue_version(drugs: Iterable[Dict]) -> str:
+    """Stable content hash of the drug records."""
+    h = hashlib.sha1()
+    for d in drugs:
+        h.update(json.dumps(d, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()[:12]
+
+
+class CatalogueUpdateError(Exception):
+    pass
+
+
+def _matches(drug: Dict, term: str) -> bool:
+    return term in drug["name"].lower() or term in drug["class"].lower() or term in drug["indications"].lower()
+
+
+class Catalogue:
+    def __init__(self, drugs: Iterable[Dict], version: Optional[str] = None,
+                 groups: Optional[Dict[str, Dict]] = None, aliases: Optional[Dict[str, List[str]]] = None,
+                 conditions: Iterable[str] = (), condition_synonyms: Optional[Dict[str, List[str]]] = None,
+                 primary_drugs: Optional[Dict[str, List[str]]] = None,
+                 vocabulary: Optional[Dict[str, Dict[str, List[str]]]] = None):
+        self.drugs: List[Dict] = [dict(d) for d in drugs]
+        self.version = version or catalogue_version(self.drugs)
+        self.facets = FacetIndex(vocabulary=vocabulary)
+        self.interactions = InteractionGraph(groups, aliases)
+        self.conditions = ConditionIndex(conditions, condition_synonyms, primary_drugs, aliases)
+        self._search_cache: "OrderedDict[str, int]" = OrderedDict()
+        self._names: Optional[List[str]] = None
+        self._ids: Optional[Dict[str, int]] = None
+        self._spelling: Optional[SpellingIndex] = None
+        self._mentions: Optional[AhoCorasick] = None
+        self.revision = 0
+        for doc_id, drug in enumerate(self.drugs):
+            self._index(doc_id, drug)
+
+    def __len__(self) -> int:
+        return popcount(self.facets.all_ids)
+
+    def _index(self, doc_id: int, drug: Dict) -> None:
+        self.facets.add(doc_id, drug)
+        self.interactions.add(drug)
+        self.conditions.add(doc_id, drug)
+
+    def _unindex(self, doc_id: int, drug: Dict) -> None:
+        self.facets.remove(doc_id, drug)
+        self.interactions.remove(drug)
+        self.conditions.remove(doc_id, drug)
+
+    def names(self) -> List[str]:
+        """Names of the live (not retired) drugs in catalogue order."""
+        if self._names is None:
+            self._names = [d["name"] for d in self.drugs if d is not None]
+        return self._names
+
+    def _id_map(self) -> Dict[str, int]:
+        if self._ids is None:
+            self._ids = {normalize_term(d["name"]): i for i, d in enumerate(self.drugs) if d is not None}
+        return self._ids
+
+    def get(self, name: str) -> Optional[Dict]:
+        doc_id = self._id_map().get(normalize_term(name))
+        return None if doc_id is None else self.drugs[doc_id]
+
+    # -- incremental updates ----------------------------------------------
+    def upsert(self, record: Dict) -> int:
+        """Insert a new drug or replace the entry with the same name; returns its id.
+
+        Only this drug's postings are touched. An edit keeps the drug's id, so
+        bitmaps held by callers stay valid.
+        """
+        from .ingest import validate_record
+        clean, error = validate_record(record)
+        if error:
+            raise CatalogueUpdateError(f"Invalid drug record: {error}")
+        key = normalize_term(clean["name"])
+        ids = self._id_map()
+        doc_id = ids.get(key)
+        if doc_id is None:
+            doc_id = len(self.drugs)
+            self.drugs.append(clean)
+            ids[key] = doc_id
+            if self._names is not None:
+                self._names.append(clean["name"])
+        else:
+            self._unindex(doc_id, self.drugs[doc_id])
+            self.drugs[doc_id] = clean
+            self._names = None
+        self._index(doc_id, clean)
+        self._touch(doc_id, clean)
+        if self._spelling is not None:
+            self._spell(self._spelling, key, doc_id)
+        return doc_id
+
+    def retire(self, name: str) -> bool:
+        """Remove a drug from every index. Its id is left unused."""
+        key = normalize_term(name)
+        doc_id = self._id_map().pop(key, None)
+        if doc_id is None:
+            return False
+        self._unindex(doc_id, self.drugs[doc_id])
+        self.drugs[doc_id] = None
+        self._names = None
+        self._touch(doc_id, None)
+        if self._spelling is not None:
+            self._spelling.remove(key)
+        return True
+
+    def _touch(self, doc_id: int, drug: Optional[Dict]) -> None:
+        # patch cached search results for this one id instead of dropping the cache
+        bit = 1 << doc_id
+        for term, bits in self._search_cache.items():
+            if drug is not None and _matches(drug, term):
+                self._search_cache[term] = bits | bit
+            else:
+                self._search_cache[term] = bits & ~bit
+        self._mentions = None
+        self.revision += 1
+        self.version = f"{self.version.split('+')[0]}+{self.revision}"
+
+    def search(self, term: str) -> int:
+        """Bitmap of drugs whose name, class or indications contain `term`."""
+        term = term.strip().lower()
+        if not term:
+            return self.facets.all_ids
+        bits = self._search_cache.get(term)
+        if bits is None:
+            bits = 0
+            for doc_id, d in enumerate(self.drugs):
+                if d is not None and _matches(d, term):
+                    bits |= 1 << doc_id
+            if len(self._search_cache) >= SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+            self._search_cache[term] = bits
+        else:
+            self._search_cache.move_to_end(term)
+        return bits
+
+    # -- spelling ---------------------------------------------------------
+    @property
+    def spelling(self) -> SpellingIndex:
+        """Spelling index over names, synonyms and brand names, built on first use."""
+        if self._spelling is None:
+            # popularity: how many conditions a drug is indicated for
+            popularity: Dict[int, int] = {}
+            for bits in self.conditions.indicated.values():
+                for doc_id in iter_bits(bits):
+                    popularity[doc_id] = popularity.get(doc_id, 0) + 1
+            aliases: Dict[str, List[str]] = {}
+            for alias, canonical in self.interactions.alias_keys.items():
+                aliases.setdefault(canonical, []).append(alias)
+            index = SpellingIndex()
+            for key, doc_id in self._id_map().items():
+                index.add(self.drugs[doc_id]["name"], key, popularity.get(doc_id, 0))
+                for alias in aliases.get(key, ()):
+                    index.add(alias, key)
+            self._spelling = index
+        return self._spelling
+
+    def _spell(self, index: SpellingIndex, key: str, doc_id: int) -> None:
+        popularity = sum(1 for bits in self.conditions.indicated.values() if bits >> doc_id & 1)
+        index.add(self.drugs[doc_id]["name"], key, popularity)
+        for alias, canonical in self.interactions.alias_keys.items():
+            if canonical == key:
+                index.add(alias, key)
+
+    def suggest(self, term: str, limit: int = 5) -> List[Dict]:
+        """Drugs whose name, synonym or brand name is within a couple of typos of `term`.
+
+        Returns {"name", "term", "distance", "popularity", "doc_id"} dicts, closest first.
+        """
+        ids = self._id_map()
+        out = []
+        for s in self.spelling.lookup(term, limit):
+            doc_id = ids.get(s["target"])
+            if doc_id is not None:
+                out.append({"name": self.drugs[doc_id]["name"], "term": s["term"], "distance": s["distance"],
+                            "popularity": s["popularity"], "doc_id": doc_id})
+        return out
+
+    # -- mentions in free text -------------------------------------------
+    @property
+    def mentions(self) -> AhoCorasick:
+        """Automaton over every drug name and alias, compiled on first use.
+
+        Drugs that only appear in interaction text ("Warfarin", "Alcohol")
+        are included too, with their label in place of a doc id.
+        """
+        if self._mentions is None:
+            ids = self._id_map()
+            graph = self.interactions
+            patterns = [(label, label) for key, label in graph.labels.items()
+                        if key not in graph.drug_keys and not graph.is_group(key)]
+            patterns += [(key, doc_id) for key, doc_id in ids.items()]
+            patterns += [(alias, ids[canonical]) for alias, canonical in graph.alias_keys.items()
+                         if canonical in ids]
+            self._mentions = AhoCorasick(patterns)
+        return self._mentions
+
+    def find_mentions(self, text: str) -> List[Dict]:
+        """Drug names and aliases mentioned in `text` ("I'm on warfarin and metformin").
+
+        One pass over the text; returns {"name", "matched", "start", "end",
+        "doc_id"} for each mention in order. `doc_id` is None for drugs that
+        are not in the catalogue but appear in its interaction data.
+        """
+        out = []
+        for start, end, target in self.mentions.find(text or ""):
+            external = isinstance(target, str)
+            out.append({"name": target if external else self.drugs[target]["name"], "matched": text[start:end],
+                        "start": start, "end": end, "doc_id": None if external else target})
+        return out
+
+    def medication_report(self, text: str, conditions: Iterable[str] = ()) -> Dict:
+        """Catalogue data for the medications mentioned in `text`.
+
+        Returns the mentioned catalogue records ("drugs"), other mentioned
+        drugs known from interaction data ("external"), the interactions
+        among all of them, and (drug, condition) pairs where a drug is
+        contraindicated in one of `conditions` — all from the indexes,
+        without scanning the catalogue.
+        """
+        mentions = self.find_mentions(text)
+        doc_ids = list(dict.fromkeys(m["doc_id"] for m in mentions if m["doc_id"] is not None))
+        external = list(dict.fromkeys(m["name"] for m in mentions if m["doc_id"] is None))
+        drugs = [self.drugs[i] for i in doc_ids]
+        names = [d["name"] for d in drugs] + external
+        contraindicated = []
+        for cond in conditions:
+            bits = self.conditions.contraindicated.get(cond, 0)
+            contraindicated += [(self.drugs[i]["name"], cond) for i in doc_ids if bits >> i & 1]
+        return {
+            "drugs": drugs,
+            "external": external,
+            "interactions": self.interactions.check(names) if len(names) > 1 else [],
+            "contraindicated": contraindicated,
+        }
+
+    def medications_for(self, condition: str) -> Dict[str, List[Dict]]:
+        """Drug records indicated for / contraindicated in a rules.json condition."""
+        ids = self.conditions.drugs_for(condition)
+        return {k: [self.drugs[i] for i in v] for k, v in ids.items()}
+
+    def select(self, bitmap: int, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Drug records for the ids in `bitmap`, in catalogue order."""
+        out = []
+        for i, doc_id in enumerate(iter_bits(bitmap)):
+            if i < offset:
+                continue
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(self.drugs[doc_id])
+        return out
+
+
+_DEFAULT: Optional[Catalogue] = None
+_WATCHER = None
+
+
+def _rule_conditions() -> Set[str]:
+    """Canonical condition names from rules.json (empty if the rules can't be loaded)."""
+    try:
+        rules = load_rules()
+    except RulesLoadError:
+        return set()
+    return {cond for mapping in rules.values() for cond in mapping}
+
+
+def build_default_catalogue() -> Catalogue:
+    """Build the catalogue from `medical_data` (or MEDIGUIDE_CATALOGUE) and rules.json."""
+    from medical_data import (SAMPLE_DRUGS, SAMPLE_DISEASES, INTERACTION_GROUPS,
+                              DRUG_ALIASES, CONDITION_SYNONYMS, FIELD_VOCABULARY)
+    from .ingest import iter_catalogue
+    path = os.getenv(CATALOGUE_PATH_ENV)
+    return Catalogue(
+        iter_catalogue(path) if path else SAMPLE_DRUGS,
+        groups=INTERACTION_GROUPS,
+        aliases=DRUG_ALIASES,
+        conditions=_rule_conditions() | {d["name"] for d in SAMPLE_DISEASES},
+        condition_synonyms=CONDITION_SYNONYMS,
+        primary_drugs={d["name"]: d.get("primary_drugs", []) for d in SAMPLE_DISEASES},
+        vocabulary=FIELD_VOCABULARY,
+    )
+
+
+def get_catalogue() -> Catalogue:
+    """Process-wide catalogue.
+
+    With MEDIGUIDE_SNAPSHOT set, every worker maps that snapshot file (see
+    `catalogue.snapshot`) and picks up a new one as soon as it is swapped in.
+    Otherwise the catalogue is built once from `medical_data.SAMPLE_DRUGS`, or
+    from the ingested JSONL catalogue named by MEDIGUIDE_CATALOGUE (see
+    `catalogue.ingest`), and the MEDIGUIDE_CATALOGUE_UPDATES journal is
+    replayed on top (see `catalogue.updates`).
+    """
+    global _DEFAULT, _WATCHER
+    snapshot_path = os.getenv(SNAPSHOT_PATH_ENV)
+    if snapshot_path:
+        if _WATCHER is None or _WATCHER.path != snapshot_path:
+            from .snapshot import SnapshotWatcher
+            _WATCHER = SnapshotWatcher(snapshot_path)
+        return _WATCHER.get()
+    if _DEFAULT is None:
+        from .updates import replay
+        _DEFAULT = build_default_catalogue()
+        replay(_DEFAULT)
+    return _DEFAULT
@@ -0,0 +1,164 @@
+# catalogue/conditions.py
+"""
+Reverse index from conditions to drugs.
+
+Condition names come from rules.json (the same names `score_symptoms` ranks).
+Each drug's `indications` text is scanned once, with a longest-match over
+word n-grams, for condition names and their synonyms. `contraindications`
+is stricter: it is split into comma/semicolon entries and a condition only
+counts when it heads an entry (after modifiers such as "severe", "history
+of" or "recent"), so "respiratory depression" is not Depression, and
+entries qualified by "requiring ...", "after ...", "due to ..." are skipped
+("Severe dehydration requiring IV" does not contraindicate ORS in
+Dehydration).
+
+The result is two bitmaps per condition (drugs indicated / drugs
+contraindicated), so the Symptom Checker can look up medications for its top
+results without scanning any text.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from .facets import iter_bits
+
+_WORD = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_POSSESSIVE = re.compile(r"'s\b|'")
+_ENTRY_SPLIT = re.compile(r"[,;]")
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+# words that may precede a condition at the head of a contraindication entry
+ENTRY_MODIFIERS = frozenset("""
+severe moderate mild active acute chronic recent untreated uncorrected known history of caution in
+first second third trimester
+""".split())
+# words after a condition that make the entry about something narrower
+ENTRY_QUALIFIERS = frozenset("requiring after due secondary following caused induced related".split())
+# findings named like a condition that are not that condition
+QUALIFIED_PHRASES = ("respiratory depression", "bone marrow depression", "marrow depression",
+                     "cns depression", "myocardial depression")
+
+
+def condition_key(text: str) -> str:
+    return " ".join(_WORD.findall(_POSSESSIVE.sub("s", str(text).lower())))
+
+
+class ConditionIndex:
+    def __init__(self, conditions: Iterable[str], synonyms: Optional[Dict[str, List[str]]] = None,
+                 primary_drugs: Optional[Dict[str, List[str]]] = None,
+                 aliases: Optional[Dict[str, List[str]]] = None):
+        # phrase key -> canonical condition names it refers to
+        self.phrases: Dict[str, Set[str]] = {}
+        self.conditions: Set[str] = set()
+        for name in conditions:
+            self._add_phrase(name, name)
+        for name, words in (synonyms or {}).items():
+            if name in self.conditions:
+                for w in words:
+                    self._add_phrase(w, name)
+        self.max_words = max((len(p.split()) for p in self.phrases), default=0)
+
+        alias_of = {}
+        for canonical, names in (aliases or {}).items():
+            for a in names:
+                alias_of[condition_key(a)] = condition_key(canonical)
+        # drug key -> conditions listing it as a primary drug
+        self.primary: Dict[str, Set[str]] = {}
+        for cond, drugs in (primary_drugs or {}).items():
+            if cond not in self.conditions:
+                continue
+            for d in drugs:
+                key = condition_key(d)
+                self.primary.setdefault(alias_of.get(key, key), set()).add(cond)
+
+        self.indicated: Dict[str, int] = {}
+        self.contraindicated: Dict[str, int] = {}
+
+    def _add_phrase(self, phrase: str, condition: str) -> None:
+        key = condition_key(phrase)
+        if key:
+            self.conditions.add(condition)
+            self.phrases.setdefault(key, set()).add(condition)
+
+    def match(self, text: str) -> Set[str]:
+        """Conditions named in `text`, preferring the longest phrase at each position."""
+        words = condition_key(text).split()
+        found: Set[str] = set()
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                hit = self.phrases.get(" ".join(words[i:i + n]))
+                if hit:
+                    found |= hit
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    def match_entries(self, text: str) -> Set[str]:
+        """Conditions heading the comma/semicolon entries of a contraindications text."""
+        found: Set[str] = set()
+        for entry in _ENTRY_SPLIT.split(_PARENTHETICAL.sub(" ", str(text))):
+            key = condition_key(entry)
+            if any(f" {p} " in f" {key} " for p in QUALIFIED_PHRASES):
+                continue
+            words = key.split()
+            i = 0
+            while i < len(words) and words[i] in ENTRY_MODIFIERS:
+                i += 1
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                hit = self.phrases.get(" ".join(words[i:i + n]))
+                if hit:
+                    if ENTRY_QUALIFIERS.isdisjoint(words[i + n:]):
+                        found |= hit
+                    break
+        return found
+
+    def _conditions_for(self, drug: Dict):
+        indicated = self.match(drug.get("indications", "")) | self.primary.get(condition_key(drug["name"]), set())
+        contraindicated = self.match_entries(drug.get("contraindications", ""))
+        return indicated, contraindicated
+
+    def add(self, doc_id: int, drug: Dict) -> None:
+        bit = 1 << doc_id
+        indicated, contraindicated = self._conditions_for(drug)
+        for cond in indicated:
+            self.indicated[cond] = self.indicated.get(cond, 0) | bit
+        for cond in contraindicated:
+            self.contraindicated[cond] = self.contraindicated.get(cond, 0) | bit
+
+    def remove(self, doc_id: int, drug: Dict) -> None:
+        mask = ~(1 << doc_id)
+        indicated, contraindicated = self._conditions_for(drug)
+        for table, conds in ((self.indicated, indicated), (self.contraindicated, contraindicated)):
+            for cond in conds:
+                if cond in table:
+                    table[cond] &= mask
+                    if not table[cond]:
+                        del table[cond]
+
+    def drugs_for(self, condition: str) -> Dict[str, List[int]]:
+        """Doc ids of drugs indicated for / contraindicated in a condition."""
+        return {
+            "indicated": list(iter_bits(self.indicated.get(condition, 0))),
+            "contraindicated": list(iter_bits(self.contraindicated.get(condition, 0))),
+        }
+
+    def to_state(self) -> Dict:
+        return {
+            "phrases": {k: sorted(v) for k, v in self.phrases.items()},
+            "primary": {k: sorted(v) for k, v in self.primary.items()},
+            "indicated": {k: format(b, "x") for k, b in self.indicated.items()},
+            "contraindicated": {k: format(b, "x") for k, b in self.contraindicated.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ConditionIndex":
+        index = cls(())
+        index.phrases = {k: set(v) for k, v in state["phrases"].items()}
+        index.conditions = {c for v in index.phrases.values() for c in v}
+        index.max_words = max((len(p.split()) for p in index.phrases), default=0)
+        index.primary = {k: set(v) for k, v in state["primary"].items()}
+        index.indicated = {k: int(b, 16) for k, b in state["indicated"].items()}
+        index.contraindicated = {k: int(b, 16) for k, b in state["contraindicated"].items()}
+        return index
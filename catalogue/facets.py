@@ -0,0 +1,164 @@
+# catalogue/facets.py
+"""
+Facet index for the drug browser.
+
+Each drug gets a dense integer id (its position in the catalogue) and every
+facet value keeps a bitmap of the ids that carry it, stored as a plain Python
+int. Counts are popcounts and multi-facet filters are bitwise AND/OR, so the
+Drugs page never has to rescan the catalogue on a rerun.
+
+Facets:
+  "category"     - drug class with any parenthetical removed
+                   ("Antibiotic (Macrolide)" -> "Antibiotic")
+  "indication"   - comma/semicolon separated terms from `indications`
+  "side_effect"  - normalized terms from `common_side_effects` (see `fields`)
+  "contraindication" - normalized terms from `contraindications`
+"""
+
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .fields import FieldParser, split_terms
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_term(text: str) -> str:
+    return _SPACES.sub(" ", str(text)).strip().lower()
+
+
+def category_of(drug: Dict) -> List[str]:
+    label = str(drug.get("class", "")).split("(")[0].strip()
+    return [label] if label else []
+
+
+# facets parsed with `FieldParser` -> the drug field they come from
+PARSED_FIELDS = {"side_effect": "common_side_effects", "contraindication": "contraindications"}
+
+
+def facet_fields(parsers: Dict[str, FieldParser]) -> Dict[str, Callable[[Dict], List[str]]]:
+    fields: Dict[str, Callable[[Dict], List[str]]] = {
+        "category": category_of,
+        "indication": lambda d: split_terms(d.get("indications", "")),
+    }
+    for facet, column in PARSED_FIELDS.items():
+        fields[facet] = lambda d, p=parsers[facet], c=column: p.terms(d.get(c, ""))
+    return fields
+
+
+def popcount(bitmap: int) -> int:
+    return bin(bitmap).count("1")
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """Yield the set bit positions of `bitmap` in ascending order."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class FacetIndex:
+    """Bitmap postings for every facet value, maintained per drug id."""
+
+    def __init__(self, fields: Optional[Dict[str, Callable[[Dict], List[str]]]] = None,
+                 vocabulary: Optional[Dict[str, Dict[str, List[str]]]] = None):
+        self.vocabulary = vocabulary or {}
+        self.parsers = {f: FieldParser(self.vocabulary.get(f)) for f in PARSED_FIELDS}
+        self.fields = dict(facet_fields(self.parsers) if fields is None else fields)
+        self.postings: Dict[str, Dict[str, int]] = {f: {} for f in self.fields}
+        self.labels: Dict[str, Dict[str, str]] = {f: {} for f in self.fields}
+        self.all_ids = 0
+
+    def add(self, doc_id: int, drug: Dict) -> None:
+        bit = 1 << doc_id
+        self.all_ids |= bit
+        for facet, extract in self.fields.items():
+            postings, labels = self.postings[facet], self.labels[facet]
+            for label in extract(drug):
+                key = normalize_term(label)
+                if not key:
+                    continue
+                postings[key] = postings.get(key, 0) | bit
+                labels.setdefault(key, label[:1].upper() + label[1:])
+
+    def remove(self, doc_id: int, drug: Dict) -> None:
+        mask = ~(1 << doc_id)
+        self.all_ids &= mask
+        for facet, extract in self.fields.items():
+            postings, labels = self.postings[facet], self.labels[facet]
+            for label in extract(drug):
+                key = normalize_term(label)
+                if key not in postings:
+                    continue
+                postings[key] &= mask
+                if not postings[key]:
+                    del postings[key]
+                    labels.pop(key, None)
+
+    def bitmap(self, facet: str, value: str) -> int:
+        postings = self.postings.get(facet, {})
+        key = normalize_term(value)
+        if key not in postings and facet in self.parsers:
+            # a synonym of a vocabulary concept ("drowsiness" -> "Sedation")
+            concepts = self.parsers[facet].match(value)
+            if concepts:
+                key = normalize_term(concepts[0])
+        return postings.get(key, 0)
+
+    def count(self, facet: str, value: str) -> int:
+        return popcount(self.bitmap(facet, value))
+
+    def values(self, facet: str, within: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Facet values with their counts, most common first then alphabetical.
+
+        When `within` is given, counts are restricted to that bitmap and values
+        with no matching drugs are dropped.
+        """
+        out = []
+        for key, bits in self.postings.get(facet, {}).items():
+            if within is not None:
+                bits &= within
+            n = popcount(bits)
+            if n:
+                out.append((self.labels[facet][key], n))
+        out.sort(key=lambda x: (-x[1], x[0].lower()))
+        return out
+
+    def query(self, selections: Dict[str, Iterable[str]], base: Optional[int] = None,
+              exclude: Optional[Dict[str, Iterable[str]]] = None) -> int:
+        """Intersect facets: values within one facet are OR-ed, facets are AND-ed.
+
+        Drugs carrying any value in `exclude` are removed from the result
+        ("not contraindicated in pregnancy").
+        """
+        result = self.all_ids if base is None else base
+        for facet, values in selections.items():
+            values = [v for v in values if v]
+            if not values:
+                continue
+            union = 0
+            for v in values:
+                union |= self.bitmap(facet, v)
+            result &= union
+        for facet, values in (exclude or {}).items():
+            for v in values:
+                if v:
+                    result &= ~self.bitmap(facet, v)
+        return result
+
+    def to_state(self) -> Dict:
+        return {
+            "postings": {f: {k: format(b, "x") for k, b in p.items()} for f, p in self.postings.items()},
+            "labels": self.labels,
+            "all_ids": format(self.all_ids, "x"),
+            "vocabulary": self.vocabulary,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "FacetIndex":
+        index = cls(vocabulary=state.get("vocabulary"))
+        index.postings = {f: {k: int(b, 16) for k, b in p.items()} for f, p in state["postings"].items()}
+        index.labels = state["labels"]
+        index.all_ids = int(state["all_ids"], 16)
+        return index
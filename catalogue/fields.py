@@ -0,0 +1,105 @@
+# catalogue/fields.py
+"""
+Structured parsing of the free-text drug fields.
+
+`common_side_effects` and `contraindications` are comma/semicolon separated
+entries with qualifiers mixed in ("Hypotension (low blood pressure)",
+"pregnancy (>20 weeks)", "serious: QT prolongation"). `FieldParser` turns one
+field into a list of normalized terms:
+
+  - every concept of the vocabulary (`medical_data.FIELD_VOCABULARY`) named in
+    an entry, longest phrase first, so synonyms land on one term
+    ("drowsiness" -> "Sedation", "AV block" -> "Heart block");
+  - otherwise the entry itself with parentheticals and leading qualifiers
+    ("history of", "severe", ...) removed.
+
+The terms are what the "side_effect" and "contraindication" facets index.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+_WORD = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_TERM_SPLIT = re.compile(r"[,;]")
+_PARENS = re.compile(r"\([^)]*\)?")
+_QUALIFIER = re.compile(
+    r"^(?:or|and|rare|but|severe|serious|active|acute|untreated|uncorrected|recent|"
+    r"history of|use with|co-administration with|caution in|caution|long term)\b[\s:]*", re.I)
+_NOTHING = re.compile(r"^(?:none|minimal)\b", re.I)
+
+
+def split_terms(text: str) -> List[str]:
+    """Split a free-text field on commas/semicolons, ignoring separators in parentheses."""
+    terms, depth, start = [], 0, 0
+    text = str(text or "")
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0 and _TERM_SPLIT.match(ch):
+            terms.append(text[start:i])
+            start = i + 1
+    terms.append(text[start:])
+    return [t.strip() for t in terms if t.strip()]
+
+
+def term_key(text: str) -> str:
+    return " ".join(_WORD.findall(str(text).lower()))
+
+
+def clean_entry(entry: str) -> str:
+    """An entry without parentheticals or leading qualifiers, e.g.
+    "History of malignant hyperthermia" -> "malignant hyperthermia"."""
+    text = " ".join(_PARENS.sub(" ", entry).split())
+    while True:
+        stripped = _QUALIFIER.sub("", text)
+        if stripped == text:
+            return text.strip(" :-")
+        text = stripped
+
+
+class FieldParser:
+    """Maps one free-text field to vocabulary concepts and cleaned entries."""
+
+    def __init__(self, concepts: Optional[Dict[str, List[str]]] = None):
+        self.concepts = dict(concepts or {})
+        # phrase key -> concept label
+        self.phrases: Dict[str, str] = {}
+        for label, synonyms in self.concepts.items():
+            for phrase in [label] + list(synonyms):
+                key = term_key(phrase)
+                if key:
+                    self.phrases[key] = label
+        self.max_words = max((len(p.split()) for p in self.phrases), default=0)
+
+    def match(self, text: str) -> List[str]:
+        """Concepts named in `text`, in order of appearance."""
+        words = term_key(text).split()
+        found: List[str] = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                label = self.phrases.get(" ".join(words[i:i + n]))
+                if label:
+                    if label not in found:
+                        found.append(label)
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    def terms(self, text: str) -> List[str]:
+        out: List[str] = []
+        for entry in split_terms(text):
+            found = self.match(entry)
+            if not found:
+                if _NOTHING.match(entry):
+                    continue
+                cleaned = clean_entry(entry)
+                found = [cleaned] if cleaned else []
+            for term in found:
+                if term not in out:
+                    out.append(term)
+        return out
@@ -0,0 +1,204 @@
+# catalogue/ingest.py
+"""
+Streaming bulk ingest of drug exports (e.g. Essential Medicines List dumps).
+
+Reads CSV or JSONL one row at a time, validates the SAMPLE_DRUGS schema,
+drops duplicates by normalized name and appends accepted records to a JSONL
+catalogue. A sidecar `<output>.idx` maps each normalized name to the byte
+offset of its record so single entries can be read back without loading the
+file. Memory use is bounded by the dedupe set (8 bytes of digest per name),
+not by the size of the input.
+
+Usage:
+    python -m catalogue.ingest drugs.csv -o data/catalogue.jsonl
+    python -m catalogue.ingest export.jsonl -o data/catalogue.jsonl --rejects rejects.jsonl
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+REQUIRED_FIELDS = ("name", "class", "indications", "common_side_effects",
+                   "major_interactions", "contraindications")
+NON_EMPTY_FIELDS = ("name", "class")
+PROGRESS_EVERY = 50000
+
+
+class IngestError(Exception):
+    pass
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(str(name).lower().split())
+
+
+def validate_record(row: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """Return (clean record, None) or (None, reason)."""
+    if not isinstance(row, dict):
+        return None, "row is not an object"
+    record = {}
+    for field in REQUIRED_FIELDS:
+        value = row.get(field)
+        if value is None:
+            return None, f"missing field '{field}'"
+        if not isinstance(value, str):
+            return None, f"field '{field}' must be a string"
+        value = " ".join(value.split())
+        if field in NON_EMPTY_FIELDS and not value:
+            return None, f"field '{field}' is empty"
+        record[field] = value
+    return record, None
+
+
+class _ByteCounter:
+    """Iterate a binary file as decoded lines while counting bytes read."""
+
+    def __init__(self, fb):
+        self.fb = fb
+        self.bytes_read = 0
+
+    def __iter__(self) -> Iterator[str]:
+        encoding = "utf-8-sig"  # strip a BOM from the first line only
+        for raw in self.fb:
+            self.bytes_read += len(raw)
+            yield raw.decode(encoding)
+            encoding = "utf-8"
+
+
+def iter_rows(counter: _ByteCounter, fmt: str) -> Iterator[Tuple[Optional[Dict], Optional[str]]]:
+    """Yield (row, parse error) pairs from a CSV or JSONL stream."""
+    if fmt == "csv":
+        for row in csv.DictReader(counter):
+            yield row, None
+    elif fmt == "jsonl":
+        for line in counter:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                yield None, f"invalid JSON: {e}"
+    else:
+        raise IngestError(f"Unsupported format '{fmt}' (expected csv or jsonl)")
+
+
+def ingest(source: str, output: str, fmt: Optional[str] = None, rejects: Optional[str] = None,
+           append: bool = False, progress=None) -> Dict:
+    """Stream `source` into the JSONL catalogue at `output` and return run statistics."""
+    src = Path(source)
+    if not src.exists():
+        raise IngestError(f"Input file not found at {src.resolve()}")
+    fmt = (fmt or src.suffix.lstrip(".")).lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    out = Path(output)
+    idx = out.with_name(out.name + ".idx")
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    seen = set()
+    if append and idx.exists():
+        with idx.open("r", encoding="utf-8") as f:
+            for line in f:
+                key = line.rsplit("\t", 1)[0]
+                seen.add(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest())
+
+    stats = {"rows": 0, "accepted": 0, "duplicates": 0, "rejected": 0, "bytes": 0, "seconds": 0.0}
+    mode = "ab" if append else "wb"
+    started = time.perf_counter()
+    with src.open("rb") as fb, out.open(mode) as fout, idx.open(mode) as fidx:
+        reject_f = open(rejects, "w", encoding="utf-8") if rejects else None
+        try:
+            counter = _ByteCounter(fb)
+            offset = fout.tell()
+            for row, error in iter_rows(counter, fmt):
+                stats["rows"] += 1
+                record = None
+                if error is None:
+                    record, error = validate_record(row)
+                if error:
+                    stats["rejected"] += 1
+                    if reject_f:
+                        reject_f.write(json.dumps({"row": stats["rows"], "error": error}) + "\n")
+                    continue
+                key = normalize_name(record["name"])
+                digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+                if digest in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(digest)
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                fout.write(line)
+                fidx.write(f"{key}\t{offset}\n".encode("utf-8"))
+                offset += len(line)
+                stats["accepted"] += 1
+                if progress and stats["rows"] % PROGRESS_EVERY == 0:
+                    stats["bytes"] = counter.bytes_read
+                    stats["seconds"] = time.perf_counter() - started
+                    progress(_throughput(stats))
+            stats["bytes"] = counter.bytes_read
+        finally:
+            if reject_f:
+                reject_f.close()
+    stats["seconds"] = time.perf_counter() - started
+    return _throughput(stats)
+
+
+def _throughput(stats: Dict) -> Dict:
+    secs = max(stats["seconds"], 1e-9)
+    stats["rows_per_sec"] = round(stats["rows"] / secs, 1)
+    stats["mb_per_sec"] = round(stats["bytes"] / secs / 1e6, 2)
+    return stats
+
+
+def iter_catalogue(path: str) -> Iterator[Dict]:
+    """Stream drug records back out of an ingested JSONL catalogue."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_record(path: str, name: str) -> Optional[Dict]:
+    """Read one record by name using the `.idx` sidecar."""
+    key = normalize_name(name)
+    idx = Path(path).with_name(Path(path).name + ".idx")
+    with idx.open("r", encoding="utf-8") as f:
+        for line in f:
+            k, _, off = line.rstrip("\n").rpartition("\t")
+            if k == key:
+                with open(path, "rb") as fr:
+                    fr.seek(int(off))
+                    return json.loads(fr.readline())
+    return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Stream a CSV/JSONL drug export into the catalogue")
+    parser.add_argument("source", help="input .csv or .jsonl file")
+    parser.add_argument("-o", "--output", default="data/catalogue.jsonl", help="catalogue JSONL to write")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="override format detection")
+    parser.add_argument("--rejects", help="write rejected rows and reasons to this JSONL file")
+    parser.add_argument("--append", action="store_true", help="append to an existing catalogue")
+    args = parser.parse_args(argv)
+
+    def report(s):
+        print(f"... {s['rows']} rows, {s['rows_per_sec']} rows/s, {s['mb_per_sec']} MB/s", file=sys.stderr)
+
+    try:
+        stats = ingest(args.source, args.output, args.format, args.rejects, args.append, progress=report)
+    except IngestError as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    print(f"Ingested {stats['accepted']} drugs from {stats['rows']} rows "
+          f"({stats['duplicates']} duplicates, {stats['rejected']} rejected) "
+          f"in {stats['seconds']:.2f}s: {stats['rows_per_sec']} rows/s, {stats['mb_per_sec']} MB/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+# catalogue/interactions.py
+"""
+Drug-drug interaction graph parsed from `major_interactions`.
+
+Each entry of the free-text field ("Warfarin/Heparin (bleeding)",
+"QT prolonging drugs (Erythromycin, Ketoconazole)", ...) becomes an edge from
+the catalogue drug to a target node. Targets are resolved, in order, to a
+catalogue drug (by name or alias), an interaction group from
+`medical_data.INTERACTION_GROUPS`, or an external drug name.
+
+Edges to a group are stored once against the group, and membership is kept
+per drug, so checking a pair of medications is a direct-edge lookup plus one
+lookup per group either drug belongs to. Adding, editing or retiring a drug
+touches only that drug's edges and memberships.
+"""
+
+import re
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .fields import split_terms
+
+_SPACES = re.compile(r"\s+")
+_QUALIFIERS = re.compile(r"^(?:other|strong|potent|moderate|some)\s+", re.I)
+_LEADING_WORDS = re.compile(r"^(?:[a-z][\w-]*\s+)+(?=[A-Z])")
+_NO_INTERACTION = re.compile(r"^(?:none|minimal)\b", re.I)
+# a head this long is a description rather than a drug or class name
+_DESCRIPTIVE_WORDS = 4
+
+
+def node_key(name: str) -> str:
+    key = _SPACES.sub(" ", str(name)).strip().lower()
+    while True:
+        stripped = _QUALIFIERS.sub("", key)
+        if stripped == key:
+            return key
+        key = stripped
+
+
+def parse_interactions(text: str) -> List[Tuple[List[str], str, List[str]]]:
+    """Split an interaction field into (targets, note, examples) entries.
+
+    `targets` come from the text before the parenthesis ("A/B" gives two
+    targets), `note` from the parenthetical and any trailing text, and
+    `examples` from a comma separated parenthetical such as
+    "QT prolonging drugs (Erythromycin, Ketoconazole)". When the head is a
+    description rather than a name, the parenthetical names the targets.
+    """
+    entries = []
+    for item in split_terms(text):
+        if _NO_INTERACTION.match(item):
+            continue
+        head, _, rest = item.partition("(")
+        inner, _, tail = rest.partition(")")
+        head, inner, tail = head.strip(), inner.strip(), tail.strip()
+        targets = [t.strip() for t in head.split("/") if t.strip()]
+        examples = []
+        if len(head.split()) >= _DESCRIPTIVE_WORDS and inner:
+            # "May alter absorption of pH-dependent drugs (Ketoconazole)"
+            targets, note = [], " ".join(p for p in (head, tail) if p)
+            examples = [_LEADING_WORDS.sub("", e.strip()) for e in inner.split(",") if e.strip()]
+        elif "," in inner:
+            examples = [_LEADING_WORDS.sub("", e.strip()) for e in inner.split(",") if e.strip()]
+            note = tail
+        else:
+            note = " ".join(p for p in (inner, tail) if p)
+        entries.append((targets, note, examples))
+    return entries
+
+
+class InteractionGraph:
+    """Interaction edges keyed by drug and by drug class."""
+
+    def __init__(self, groups: Optional[Dict[str, Dict]] = None, aliases: Optional[Dict[str, List[str]]] = None):
+        self.labels: Dict[str, str] = {}
+        self.alias_keys: Dict[str, str] = {}
+        self.drug_keys: Set[str] = set()
+        self.group_keys: Dict[str, str] = {}
+        self.group_defs: Dict[str, Dict] = {}
+        # node key -> group keys it belongs to
+        self.groups_of: Dict[str, Set[str]] = {}
+        # node key -> groups it is listed in by name (kept when the drug is retired)
+        self.explicit: Dict[str, Set[str]] = {}
+        # node key -> node key -> [edge dicts]; drug-to-drug edges, stored both ways
+        self.direct: Dict[str, Dict[str, List[Dict]]] = {}
+        # drug key -> group key -> [edge dicts]
+        self.group_edges: Dict[str, Dict[str, List[Dict]]] = {}
+
+        for canonical, names in (aliases or {}).items():
+            for alias in names:
+                self.alias_keys[node_key(alias)] = node_key(canonical)
+        for label, spec in (groups or {}).items():
+            gkey = node_key(label)
+            self.labels[gkey] = label
+            self.group_defs[gkey] = spec
+            for name in [label] + list(spec.get("aliases", [])):
+                self.group_keys[node_key(name)] = gkey
+            for member in spec.get("members", []):
+                mkey = self.resolve(member, member)
+                self.explicit.setdefault(mkey, set()).add(gkey)
+                self.groups_of.setdefault(mkey, set()).add(gkey)
+
+    # -- node resolution --------------------------------------------------
+    def resolve(self, name: str, label: Optional[str] = None, register: bool = True) -> str:
+        """Node key for a drug name, alias, group name or external drug."""
+        key = node_key(name)
+        key = self.alias_keys.get(key, key)
+        if key not in self.drug_keys:
+            gkey = self.group_keys.get(key) or (self.group_keys.get(key[:-1]) if key.endswith("s") else None)
+            if gkey:
+                return gkey
+        if register:
+            self.labels.setdefault(key, label or str(name).strip())
+        return key
+
+    def is_group(self, key: str) -> bool:
+        return key in self.group_defs
+
+    def _groups_for(self, drug: Dict) -> Set[str]:
+        drug_class = str(drug.get("class", "")).lower()
+        side_effects = str(drug.get("common_side_effects", "")).lower()
+        found = set()
+        for gkey, spec in self.group_defs.items():
+            if any(c.lower() in drug_class for c in spec.get("classes", [])) or \
+               any(s.lower() in side_effects for s in spec.get("side_effects", [])):
+                found.add(gkey)
+        return found
+
+    def members(self, group: str) -> Set[str]:
+        """Node keys currently in a group (a scan; not used on the check path)."""
+        gkey = self.resolve(group, register=False)
+        return {k for k, gs in self.groups_of.items() if gkey in gs}
+
+    # -- construction -----------------------------------------------------
+    def add(self, drug: Dict) -> None:
+        key = node_key(drug["name"])
+        self.drug_keys.add(key)
+        self.labels[key] = drug["name"]
+        groups = self._groups_for(drug)
+        if groups:
+            self.groups_of.setdefault(key, set()).update(groups)
+        for targets, note, examples in parse_interactions(drug.get("major_interactions", "")):
+            for name in targets + examples:
+                target = self.resolve(name)
+                if target == key:
+                    continue
+                if self.is_group(target):
+                    entry = {"source": key, "via": self.labels[target], "note": note}
+                    self.group_edges.setdefault(key, {}).setdefault(target, []).append(entry)
+                else:
+                    entry = {"source": key, "via": "", "note": note}
+                    self.direct.setdefault(key, {}).setdefault(target, []).append(entry)
+                    self.direct.setdefault(target, {}).setdefault(key, []).append(entry)
+
+    def remove(self, drug: Dict) -> None:
+        """Drop a drug's own edges and its class-derived group memberships.
+
+        Edges other drugs list against it by name stay, so it still shows up
+        as an external medication in `check`.
+        """
+        key = node_key(drug["name"])
+        self.drug_keys.discard(key)
+        explicit = self.explicit.get(key, set())
+        if explicit:
+            self.groups_of[key] = set(explicit)
+        else:
+            self.groups_of.pop(key, None)
+        self.group_edges.pop(key, None)
+        for other in list(self.direct.get(key, {})):
+            for a, b in ((key, other), (other, key)):
+                entries = [e for e in self.direct[a][b] if e["source"] != key]
+                if entries:
+                    self.direct[a][b] = entries
+                else:
+                    del self.direct[a][b]
+            if not self.direct[other]:
+                del self.direct[other]
+        if not self.direct.get(key):
+            self.direct.pop(key, None)
+
+    # -- queries ----------------------------------------------------------
+    def _pair(self, a: str, b: str) -> List[Dict]:
+        found = list(self.direct.get(a, {}).get(b, ()))
+        for x, y in ((a, b), (b, a)):
+            edges = self.group_edges.get(x)
+            if edges:
+                for gkey in self.groups_of.get(y, ()):
+                    found.extend(edges.get(gkey, ()))
+        return found
+
+    def interactions_for(self, name: str) -> Dict[str, List[Dict]]:
+        """Direct and group edges listed by the named drug, keyed by target."""
+        key = self.resolve(name, register=False)
+        out = {self.labels.get(t, t): list(v) for t, v in self.direct.get(key, {}).items()}
+        for gkey, entries in self.group_edges.get(key, {}).items():
+            out.setdefault(self.labels[gkey], []).extend(entries)
+        return out
+
+    def check(self, medications: Iterable[str]) -> List[Dict]:
+        """All pairwise interactions in a medication list.
+
+        Returns one dict per interacting pair with the display names and the
+        reasons, e.g. {"drugs": ("Azithromycin", "Haloperidol"),
+        "reasons": [{"via": "QT prolonging drugs", "note": ""}]}.
+        """
+        keys, shown = [], {}
+        for med in medications:
+            if med and str(med).strip():
+                key = self.resolve(med, register=False)
+                if key not in shown:
+                    keys.append(key)
+                    shown[key] = self.labels.get(key, str(med).strip())
+        results = []
+        for a, b in combinations(keys, 2):
+            found = self._pair(a, b)
+            if not found:
+                continue
+            reasons, seen = [], set()
+            for entry in found:
+                sig = (entry["source"], entry["via"], entry["note"])
+                if sig in seen:
+                    continue
+                seen.add(sig)
+                reasons.append({
+                    "listed_under": self.labels.get(entry["source"], entry["source"]),
+                    "via": entry["via"],
+                    "note": entry["note"],
+                })
+            results.append({"drugs": (shown[a], shown[b]), "reasons": reasons})
+        return results
+
+    # -- persistence ------------------------------------------------------
+    def to_state(self) -> Dict:
+        return {
+            "labels": self.labels,
+            "alias_keys": self.alias_keys,
+            "drug_keys": sorted(self.drug_keys),
+            "group_keys": self.group_keys,
+            "group_defs": self.group_defs,
+            "groups_of": {k: sorted(v) for k, v in self.groups_of.items()},
+            "explicit": {k: sorted(v) for k, v in self.explicit.items()},
+            "direct": self.direct,
+            "group_edges": self.group_edges,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "InteractionGraph":
+        graph = cls()
+        graph.labels = state["labels"]
+        graph.alias_keys = state["alias_keys"]
+        graph.drug_keys = set(state["drug_keys"])
+        graph.group_keys = state["group_keys"]
+        graph.group_defs = state["group_defs"]
+        graph.groups_of = {k: set(v) for k, v in state["groups_of"].items()}
+        graph.explicit = {k: set(v) for k, v in state["explicit"].items()}
+        graph.direct = state["direct"]
+        graph.group_edges = state["group_edges"]
+        return graph
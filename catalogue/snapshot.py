@@ -0,0 +1,246 @@
+# catalogue/snapshot.py
+"""
+Read-only memory-mapped catalogue snapshots shared across worker processes.
+
+A snapshot file holds the drug records and the serialized indexes of a built
+`Catalogue`:
+
+    b"MGCAT1\\n" | header length (8 bytes, little endian) | header JSON | sections
+
+The header lists each section's byte range. "records" is the concatenated
+JSON of every drug, "offsets" the native uint64 start of each record,
+"names" the drug names in order, and "facets" / "interactions" /
+"conditions" the index states.
+
+Workers `mmap` the file read-only, so the pages live once in the OS page
+cache however many processes map it. Records are decoded only when a page of
+the drug browser asks for them, and each index section is decoded the first
+time it is used rather than rebuilt from the drug text. Publishing writes a
+temporary file and `os.replace`s it over the old one; readers that already
+mapped the previous inode keep working, and `SnapshotWatcher` remaps the new
+one on the next call.
+
+Usage:
+    python -m catalogue.snapshot data/catalogue.snap
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .catalogue import Catalogue
+from .conditions import ConditionIndex
+from .facets import FacetIndex
+from .interactions import InteractionGraph
+
+MAGIC = b"MGCAT1\n"
+_LEN = struct.Struct("<Q")
+INDEX_SECTIONS = {"facets": FacetIndex, "interactions": InteractionGraph, "conditions": ConditionIndex}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def write_snapshot(catalogue: Catalogue, path: str) -> str:
+    """Serialize `catalogue` to `path` atomically and return the path."""
+    sections: "OrderedDict[str, bytes]" = OrderedDict()
+    offsets = array("Q")
+    records = bytearray()
+    for drug in catalogue.drugs:
+        offsets.append(len(records))
+        records += json.dumps(drug, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    offsets.append(len(records))
+    sections["records"] = bytes(records)
+    sections["offsets"] = offsets.tobytes()
+    sections["names"] = json.dumps(catalogue.names(), ensure_ascii=False).encode("utf-8")
+    for name in INDEX_SECTIONS:
+        state = getattr(catalogue, name).to_state()
+        sections[name] = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    header = {"version": catalogue.version, "count": len(catalogue.drugs),
+              "byteorder": sys.byteorder, "sections": {}}
+    pos = 0
+    for name, blob in sections.items():
+        header["sections"][name] = [pos, pos + len(blob)]
+        pos += len(blob)
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    tmp = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LEN.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for blob in sections.values():
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+class MappedRecords(Sequence):
+    """Lazy, read-only list of drug records backed by the snapshot mmap."""
+
+    def __init__(self, mm: mmap.mmap, offsets: memoryview, start: int, count: int):
+        self._mm = mm
+        self._offsets = offsets
+        self._start = start
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        a, b = self._offsets[i], self._offsets[i + 1]
+        return json.loads(self._mm[self._start + a:self._start + b])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._count):
+            yield self[i]
+
+
+class SnapshotCatalogue(Catalogue):
+    """A `Catalogue` served from a memory-mapped snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise SnapshotError(f"Cannot map empty snapshot at {path}: {e}")
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"Not a catalogue snapshot: {path}")
+        (hlen,) = _LEN.unpack_from(self._mm, len(MAGIC))
+        body = len(MAGIC) + _LEN.size
+        try:
+            header = json.loads(self._mm[body:body + hlen])
+        except ValueError as e:
+            raise SnapshotError(f"Corrupt snapshot header in {path}: {e}")
+        if header.get("byteorder") != sys.byteorder:
+            raise SnapshotError(f"Snapshot {path} was written on a {header.get('byteorder')}-endian host")
+        self._base = body + hlen
+        self._sections = header["sections"]
+        self.version = header["version"]
+        a, b = self._section_range("offsets")
+        offsets = memoryview(self._mm)[a:b].cast("Q")
+        start, _ = self._section_range("records")
+        self.drugs = MappedRecords(self._mm, offsets, start, header["count"])
+        self._indexes: Dict[str, object] = {}
+        self._search_cache = OrderedDict()
+        self._names = None
+        self._ids = None
+        self._spelling = None
+        self._mentions = None
+        self.revision = int(self.version.split("+")[1]) if "+" in self.version else 0
+
+    def names(self) -> List[str]:
+        if self._names is None:
+            a, b = self._section_range("names")
+            self._names = json.loads(self._mm[a:b])
+        return self._names
+
+    def _section_range(self, name: str):
+        a, b = self._sections[name]
+        return self._base + a, self._base + b
+
+    def _section_index(self, name: str):
+        index = self._indexes.get(name)
+        if index is None:
+            a, b = self._section_range(name)
+            index = INDEX_SECTIONS[name].from_state(json.loads(self._mm[a:b]))
+            self._indexes[name] = index
+        return index
+
+    def upsert(self, record: Dict) -> int:
+        raise SnapshotError("Snapshots are read-only; apply updates to thaw() and publish a new snapshot")
+
+    def retire(self, name: str) -> bool:
+        raise SnapshotError("Snapshots are read-only; apply updates to thaw() and publish a new snapshot")
+
+    def thaw(self) -> Catalogue:
+        """A mutable in-memory copy that reuses the serialized indexes."""
+        catalogue = Catalogue.__new__(Catalogue)
+        catalogue.drugs = list(self.drugs)
+        catalogue.version = self.version
+        catalogue.facets = self.facets
+        catalogue.interactions = self.interactions
+        catalogue.conditions = self.conditions
+        catalogue._search_cache = OrderedDict()
+        catalogue._names = None
+        catalogue._ids = None
+        catalogue._spelling = self._spelling
+        catalogue._mentions = self._mentions
+        catalogue.revision = self.revision
+        self._indexes = {}  # the copy owns these now
+        return catalogue
+
+    @property
+    def facets(self) -> FacetIndex:
+        return self._section_index("facets")
+
+    @property
+    def interactions(self) -> InteractionGraph:
+        return self._section_index("interactions")
+
+    @property
+    def conditions(self) -> ConditionIndex:
+        return self._section_index("conditions")
+
+
+def open_snapshot(path: str) -> SnapshotCatalogue:
+    if not os.path.exists(path):
+        raise SnapshotError(f"Snapshot file not found at {os.path.abspath(path)}")
+    return SnapshotCatalogue(path)
+
+
+class SnapshotWatcher:
+    """Returns the current snapshot, remapping after an atomic swap of the file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._current: Optional[SnapshotCatalogue] = None
+
+    def get(self) -> SnapshotCatalogue:
+        current = self._current
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            if current is None:
+                raise SnapshotError(f"Snapshot file not found at {os.path.abspath(self.path)}")
+            return current  # keep serving the mapped copy if the file is briefly missing
+        if current is None or (st.st_ino, st.st_mtime_ns) != (current.stat.st_ino, current.stat.st_mtime_ns):
+            # the previous map is released once no rerun holds a reference to it
+            self._current = current = open_snapshot(self.path)
+        return current
+
+
+def main(argv=None) -> int:
+    import argparse
+    from .catalogue import build_default_catalogue
+
+    parser = argparse.ArgumentParser(description="Publish the catalogue as a memory-mapped snapshot")
+    parser.add_argument("path", nargs="?", default="data/catalogue.snap", help="snapshot file to (re)write")
+    args = parser.parse_args(argv)
+    catalogue = build_default_catalogue()
+    write_snapshot(catalogue, args.path)
+    print(f"Wrote snapshot {catalogue.version} with {len(catalogue)} drugs to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
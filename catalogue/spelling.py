@@ -0,0 +1,127 @@
+# catalogue/spelling.py
+"""
+SymSpell-style spelling correction for drug names.
+
+Every term (catalogue name, generic synonym or brand name) is indexed under
+all strings reachable from its first `prefix_length` characters by deleting
+up to `max_distance` characters. A query generates the same deletes of its own
+prefix, so candidate terms come from a handful of dict lookups instead of a
+scan of the vocabulary; each candidate is then verified with the
+optimal-string-alignment (Damerau-Levenshtein) distance on the full strings.
+
+Suggestions are ranked by edit distance, then by popularity, so
+"paracetmol" -> "Paracetamol" and "lidocaine" -> "Lignocaine" (an alias, at
+distance 0).
+"""
+
+from typing import Dict, List, Optional, Set
+
+from .facets import normalize_term
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """`word` and every string reachable from it by up to `max_distance` deletions."""
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or `max_distance + 1` once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def max_distance_for(term: str, limit: int = MAX_EDIT_DISTANCE) -> int:
+    # one typo in a short word already makes most of it up
+    return min(limit, 1 if len(term) <= 5 else 2)
+
+
+class SpellingIndex:
+    """Deletion-neighbourhood index from terms to canonical drug keys."""
+
+    def __init__(self, max_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        # term -> canonical drug key, and the display form of each term
+        self.targets: Dict[str, str] = {}
+        self.labels: Dict[str, str] = {}
+        # delete -> terms it was generated from
+        self.deletes: Dict[str, Set[str]] = {}
+        self.popularity: Dict[str, int] = {}
+
+    def add(self, term: str, target: str, popularity: Optional[int] = None) -> None:
+        key = normalize_term(term)
+        if not key:
+            return
+        if popularity is not None:
+            self.popularity[target] = popularity
+        if key in self.targets:
+            self.targets[key] = target
+            return
+        self.targets[key] = target
+        self.labels[key] = str(term).strip()
+        for d in _deletes(key[:self.prefix_length], self.max_distance):
+            self.deletes.setdefault(d, set()).add(key)
+
+    def remove(self, target: str) -> None:
+        """Drop every term pointing at `target`."""
+        for key in [k for k, t in self.targets.items() if t == target]:
+            del self.targets[key]
+            del self.labels[key]
+            for d in _deletes(key[:self.prefix_length], self.max_distance):
+                terms = self.deletes.get(d)
+                if terms is not None:
+                    terms.discard(key)
+                    if not terms:
+                        del self.deletes[d]
+        self.popularity.pop(target, None)
+
+    def lookup(self, text: str, limit: int = 5) -> List[Dict]:
+        """Closest terms to `text`, one per drug.
+
+        Each suggestion is {"target", "term", "distance", "popularity"}, ranked
+        by distance, then popularity, then term.
+        """
+        query = normalize_term(text)
+        if not query:
+            return []
+        max_distance = max_distance_for(query, self.max_distance)
+        candidates: Set[str] = set()
+        for d in _deletes(query[:self.prefix_length], max_distance):
+            candidates |= self.deletes.get(d, set())
+        best: Dict[str, Dict] = {}
+        for key in candidates:
+            distance = edit_distance(query, key, max_distance)
+            if distance > max_distance:
+                continue
+            target = self.targets[key]
+            if target in best and best[target]["distance"] <= distance:
+                continue
+            best[target] = {
+                "target": target,
+                "term": self.labels[key],
+                "distance": distance,
+                "popularity": self.popularity.get(target, 0),
+            }
+        ranked = sorted(best.values(), key=lambda s: (s["distance"], -s["popularity"], s["term"].lower()))
+        return ranked[:limit]
@@ -0,0 +1,134 @@
+# catalogue/updates.py
+"""
+Clinician edits to the live catalogue.
+
+`Catalogue.upsert` and `Catalogue.retire` maintain the facet, search,
+interaction and condition indexes for the single drug being changed. This
+module records each change in a JSONL journal so it survives a restart, and
+replays the journal on top of the base catalogue at startup.
+
+Journal lines look like:
+    {"op": "upsert", "record": {"name": "...", "class": "...", ...}}
+    {"op": "retire", "name": "Ranitidine"}
+
+Usage:
+    python -m catalogue.updates upsert drug.json
+    python -m catalogue.updates retire "Ranitidine"
+
+The journal path comes from MEDIGUIDE_CATALOGUE_UPDATES. When
+MEDIGUIDE_SNAPSHOT is also set, the command line tool republishes the
+snapshot so running workers pick up the edit.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+from .catalogue import Catalogue, CatalogueUpdateError
+
+UPDATES_PATH_ENV = "MEDIGUIDE_CATALOGUE_UPDATES"
+
+
+def apply_update(catalogue: Catalogue, op: Dict) -> None:
+    kind = op.get("op")
+    if kind == "upsert":
+        catalogue.upsert(op.get("record") or {})
+    elif kind == "retire":
+        if not catalogue.retire(str(op.get("name", ""))):
+            raise CatalogueUpdateError(f"No drug named '{op.get('name')}' to retire")
+    else:
+        raise CatalogueUpdateError(f"Unknown update op '{kind}'")
+
+
+def record_update(op: Dict, path: Optional[str] = None) -> None:
+    path = path or os.getenv(UPDATES_PATH_ENV)
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(op, ensure_ascii=False) + "\n")
+
+
+def replay(catalogue: Catalogue, path: Optional[str] = None) -> int:
+    """Apply every journaled update to `catalogue`; returns how many were applied."""
+    path = path or os.getenv(UPDATES_PATH_ENV)
+    if not path or not os.path.exists(path):
+        return 0
+    applied = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                apply_update(catalogue, json.loads(line))
+                applied += 1
+            except (ValueError, CatalogueUpdateError):
+                continue  # a bad or stale line must not block startup
+    return applied
+
+
+def upsert_drug(catalogue: Catalogue, record: Dict, journal: Optional[str] = None) -> int:
+    doc_id = catalogue.upsert(record)
+    record_update({"op": "upsert", "record": catalogue.drugs[doc_id]}, journal)
+    return doc_id
+
+
+def retire_drug(catalogue: Catalogue, name: str, journal: Optional[str] = None) -> bool:
+    retired = catalogue.retire(name)
+    if retired:
+        record_update({"op": "retire", "name": name}, journal)
+    return retired
+
+
+def main(argv=None) -> int:
+    import argparse
+    from .catalogue import SNAPSHOT_PATH_ENV, build_default_catalogue
+
+    parser = argparse.ArgumentParser(description="Insert, edit or retire catalogue entries")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_up = sub.add_parser("upsert", help="insert or replace a drug from a JSON file")
+    p_up.add_argument("record", help="JSON file holding one drug record")
+    p_ret = sub.add_parser("retire", help="retire a drug by name")
+    p_ret.add_argument("name")
+    parser.add_argument("--journal", default=os.getenv(UPDATES_PATH_ENV), help="update journal (JSONL)")
+    args = parser.parse_args(argv)
+    if not args.journal:
+        print(f"Error: set {UPDATES_PATH_ENV} or pass --journal", file=sys.stderr)
+        return 1
+
+    snapshot_path = os.getenv(SNAPSHOT_PATH_ENV)
+    if snapshot_path and os.path.exists(snapshot_path):
+        from .snapshot import open_snapshot
+        catalogue = open_snapshot(snapshot_path).thaw()
+    else:
+        catalogue = build_default_catalogue()
+        replay(catalogue, args.journal)
+
+    started = time.perf_counter()
+    try:
+        if args.command == "upsert":
+            with open(args.record, "r", encoding="utf-8") as f:
+                doc_id = upsert_drug(catalogue, json.load(f), args.journal)
+            message = f"Saved '{catalogue.drugs[doc_id]['name']}'"
+        else:
+            if not retire_drug(catalogue, args.name, args.journal):
+                print(f"Error: no drug named '{args.name}'", file=sys.stderr)
+                return 1
+            message = f"Retired '{args.name}'"
+    except (OSError, ValueError, CatalogueUpdateError) as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{message} in {elapsed_ms:.1f} ms (catalogue {catalogue.version})")
+
+    if snapshot_path:
+        from .snapshot import write_snapshot
+        write_snapshot(catalogue, snapshot_path)
+        print(f"Published snapshot to {snapshot_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,142 @@
+import hashlib
 import os
+import threading
+import time
 import openai
-from typing import Dict, Generator
+from typing import Dict, Generator, List, Optional, Tuple
 import streamlit as st
 
-def get_client() -> Dict:
-    """Get OpenRouter client configuration with proper error handling"""
+from llm import MetricsError, count_tokens, get_openai_client, get_router, message_tokens, record_call
+from privacy import StreamRedactor
+
+DEFAULT_MODEL = "anthropic/claude-3.5-sonnet"
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Where Streamlit looks for secrets.toml; a change to either re-resolves the config
+SECRETS_PATHS = (
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+    os.path.join(os.getcwd(), ".streamlit", "secrets.toml"),
+)
+
+# Resolved once per process: {"fingerprint", "config", "status": [(level, message)]}
+_CLIENT_CACHE: Dict = {}
+_CLIENT_LOCK = threading.Lock()
+
+
+def _config_fingerprint() -> Tuple:
+    """Secrets file mtimes/sizes and a digest of the key env var."""
+    files = []
+    for path in SECRETS_PATHS:
+        try:
+            info = os.stat(path)
+            files.append((path, info.st_mtime_ns, info.st_size))
+        except OSError:
+            files.append((path, None, None))
+    env = hashlib.sha256(os.getenv("OPENROUTER_API_KEY", "").encode("utf-8")).hexdigest()
+    return tuple(files), env, os.getenv("MEDIGUIDE_LLM_MODELS", ""), os.getenv("MEDIGUIDE_LLM_BASE_URL", "")
+
+
+def _configured_models() -> List[str]:
+    """Primary model and fallbacks, in order, from MEDIGUIDE_LLM_MODELS (comma-separated)."""
+    models = [m.strip() for m in os.getenv("MEDIGUIDE_LLM_MODELS", "").split(",") if m.strip()]
+    return models or [DEFAULT_MODEL]
+
+
+def _resolve_client() -> Tuple[Dict, List[Tuple[str, str]]]:
+    """Read secrets and environment; returns (config, sidebar status messages)."""
     api_key = ""
+    status = []
+    models = _configured_models()
+    # e.g. the local stand-in from loadtest.stub_server
+    base_url = os.getenv("MEDIGUIDE_LLM_BASE_URL", "").strip() or DEFAULT_BASE_URL
     
     # Priority 1: Try Streamlit secrets (for cloud deployment)
     try:
         if hasattr(st, 'secrets') and 'OPENROUTER_API_KEY' in st.secrets:
             api_key = st.secrets["OPENROUTER_API_KEY"]
-            st.sidebar.success("✓ Using API key from Streamlit secrets")
+            status.append(("success", "✓ Using API key from Streamlit secrets"))
     except Exception as e:
-        st.sidebar.warning(f"Could not read Streamlit secrets: {e}")
+        status.append(("warning", f"Could not read Streamlit secrets: {e}"))
     
     # Priority 2: Try environment variable (for local development)
     if not api_key:
         api_key = os.getenv("OPENROUTER_API_KEY", "")
         if api_key:
-            st.sidebar.info("✓ Using API key from environment variable")
+            status.append(("info", "✓ Using API key from environment variable"))
     
     # Priority 3: Check for placeholder
     if not api_key or api_key == "YOUR_API_KEY_HERE":
-        st.sidebar.error("❌ API key not configured")
+        status.append(("error", "❌ API key not configured"))
         return {
             "api_key": "",
-            "base_url": "https://openrouter.ai/api/v1",
-            "model": "anthropic/claude-3.5-sonnet",
+            "base_url": base_url,
+            "model": models[0],
+            "models": models,
             "headers": {}
-        }
+        }, status
     
     return {
         "api_key": api_key,
-        "base_url": "https://openrouter.ai/api/v1",
-        "model": "anthropic/claude-3.5-sonnet",
+        "base_url": base_url,
+        "model": models[0],
+        "models": models,
         "headers": {
             "HTTP-Referer": "https://mediguideai.streamlit.app",
             "X-Title": "MediGuideAI"
         }
-    }
+    }, status
+
+
+def _cached_client() -> Dict:
+    fingerprint = _config_fingerprint()
+    with _CLIENT_LOCK:
+        if _CLIENT_CACHE.get("fingerprint") != fingerprint:
+            config, status = _resolve_client()
+            _CLIENT_CACHE.update(fingerprint=fingerprint, config=config, status=status)
+        return dict(_CLIENT_CACHE)
 
-def send_chat_stream(messages, client_config=None, **kwargs) -> Generator[str, None, None]:
-    """Send chat stream with better error handling"""
+
+def get_client() -> Dict:
+    """Get OpenRouter client configuration, resolved once per process.
+
+    Secrets and environment are only re-read when a secrets.toml or
+    OPENROUTER_API_KEY changes; status is shown by `render_client_status`.
+    """
+    config = _cached_client()["config"]
+    return {**config, "headers": dict(config["headers"]), "models": list(config["models"])}
+
+
+def render_client_status(container=None) -> None:
+    """Show the cached API key status (in the sidebar by default)."""
+    container = container or st.sidebar
+    for level, message in _cached_client()["status"]:
+        getattr(container, level)(message)
+
+def _record_call(page: str, messages, call: Dict, started: float, ttft: Optional[float], output: List[str]) -> None:
+    """Report one upstream call to llm.metrics; never raises."""
+    try:
+        record_call(page, call.get("model", ""), time.perf_counter() - started, ttft=ttft,
+                    input_tokens=message_tokens(messages), output_tokens=count_tokens("".join(output)),
+                    retries=max(0, call.get("attempts", 0) - 1), error=call.get("error"),
+                    cancelled=not call.get("ok") and not call.get("error"))
+    except MetricsError:
+        pass
+
+def send_chat_stream(messages, client_config=None, redact: bool = True, status: Optional[Dict] = None,
+                     page: str = "", **kwargs) -> Generator[str, None, None]:
+    """Send chat stream with better error handling
+
+    With `redact`, PHI the model echoes back (emails, phone numbers, IDs...)
+    is masked as the chunks stream, holding back only a possibly unfinished tail.
+    A `status` dict gets "ok": True only when the model's answer streamed to
+    the end, so error and demo text can be told apart from a real response,
+    "model": the model that answered and, on failure, "error": the exception
+    class. Transient errors are retried and fall back across
+    `client_config["models"]` (see llm.resilience). Every upstream call is
+    recorded in llm.metrics under `page` ("Symptom Checker", "AI Chat").
+    """
+    if status is not None:
+        status["ok"] = False
     if not client_config:
         client_config = get_client()
     
@@ -61,28 +155,51 @@ def send_chat_stream(messages, client_config=None, **kwargs) -> Generator[str, N
         yield "For proper diagnosis and treatment, consult a sleep specialist or healthcare provider."
         return
     
+    call = status if status is not None else {}
+    started = time.perf_counter()
+    ttft = None
+    output: List[str] = []
     try:
-        # Initialize OpenAI client with OpenRouter
-        client = openai.OpenAI(
-            api_key=api_key,
-            base_url=client_config.get("base_url", "https://openrouter.ai/api/v1")
+        # Shared OpenRouter client; its keep-alive connections outlive this call
+        client = get_openai_client(
+            api_key,
+            client_config.get("base_url", DEFAULT_BASE_URL),
+            client_config.get("headers"),
         )
         
-        # Make API call
-        response = client.chat.completions.create(
-            model=client_config.get("model", "anthropic/claude-3.5-sonnet"),
-            messages=messages,
-            stream=True,
-            max_tokens=500,  # Limit tokens to reduce cost
-            **kwargs
-        )
+        def open_stream(model):
+            call["model"] = model
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                max_tokens=500,  # Limit tokens to reduce cost
+                **kwargs
+            )
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        models = client_config.get("models") or [client_config.get("model", DEFAULT_MODEL)]
         
-        # Stream the response
-        for chunk in response:
-            if chunk.choices and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        # Stream the response from the best available model
+        redactor = StreamRedactor() if redact else None
+        for text in get_router().stream(open_stream, models, stats=call):
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            output.append(text)
+            if redactor:
+                text = redactor.feed(text)
+            if text:
+                yield text
+        if redactor:
+            tail = redactor.flush()
+            if tail:
+                yield tail
+        call["ok"] = True
                 
     except openai.AuthenticationError as e:
+        call["error"] = type(e).__name__
         yield f"❌ **Authentication Error (401):**\n\n"
         yield "Your API key is invalid or expired.\n\n"
         yield "**Please check:**\n"
@@ -92,10 +209,15 @@ def send_chat_stream(messages, client_config=None, **kwargs) -> Generator[str, N
         yield "Get a new key from: https://openrouter.ai/keys"
         
     except openai.APIError as e:
+        call["error"] = type(e).__name__
         yield f"❌ **API Error:**\n\n"
         yield f"{str(e)}\n\n"
         yield "Please try again or check your OpenRouter account."
         
     except Exception as e:
+        call["error"] = type(e).__name__
         yield f"❌ **Error:** {str(e)}\n\n"
         yield "Please try again later or contact support."
+
+    finally:
+        _record_call(page, messages, call, started, ttft, output)
@@ -0,0 +1,22 @@
+"""
+LLM access package for MediGuideAI
+"""
+
+from .client import (ClientConfigError, close_clients, connection_stats, get_openai_client,
+                     pool_settings)
+from .cache import CacheError, ResponseCache, get_response_cache, prompt_key
+from .gateway import GatewayError, LLMGateway, get_gateway
+from .context import (ChatContext, ContextError, count_tokens, extractive_summary, get_chat_context,
+                      message_tokens)
+from .metrics import LLMMetrics, MetricsError, get_metrics, record_call
+from .prompts import analysis_messages, chat_system_prompt, medication_context, summary_messages
+from .similar import SimilarCacheError, SimilarQuestionCache, get_similar_cache
+from .resilience import ModelRouter, ModelsUnavailableError, get_router
+
+__all__ = ['ClientConfigError', 'close_clients', 'connection_stats', 'get_openai_client',
+           'pool_settings', 'CacheError', 'ResponseCache', 'get_response_cache', 'prompt_key',
+           'GatewayError', 'LLMGateway', 'get_gateway', 'ModelRouter', 'ModelsUnavailableError',
+           'get_router', 'ChatContext', 'ContextError', 'count_tokens', 'extractive_summary',
+           'get_chat_context', 'analysis_messages', 'chat_system_prompt', 'medication_context',
+           'summary_messages', 'SimilarCacheError', 'SimilarQuestionCache', 'get_similar_cache',
+           'message_tokens', 'LLMMetrics', 'MetricsError', 'get_metrics', 'record_call']
@@ -0,0 +1,207 @@
+# llm/cache.py
+"""
+Disk-backed LRU/TTL cache of LLM responses.
+
+The Symptom Checker's AI analysis depends only on its prompt (symptoms,
+severity, top conditions, redacted details), the model and the rules that
+ranked the conditions, so identical inputs can reuse an earlier answer. Each
+entry lives in one SQLite row keyed by a SHA-256 of the canonicalized
+messages, model and rules version, with its size, timestamps, hit count and
+JSON metadata (the rules version; never the user's input, which only
+reaches the cache redacted and hashed). Entries expire after their TTL; beyond the entry or
+byte limit the least recently used are evicted.
+
+Configuration:
+  MEDIGUIDE_LLM_CACHE              - SQLite file (default data/llm_cache.sqlite3 in the
+                                     project directory), "off" to disable
+  MEDIGUIDE_LLM_CACHE_TTL          - seconds an entry stays valid (default 7 days)
+  MEDIGUIDE_LLM_CACHE_MAX_ENTRIES  - default 5000
+  MEDIGUIDE_LLM_CACHE_MAX_MB       - default 50
+
+Usage:
+    python -m llm.cache stats
+    python -m llm.cache clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_PATH = str(Path(__file__).resolve().parent.parent / "data" / "llm_cache.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_MB = 50.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    model TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    expires REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires);
+"""
+
+
+class CacheError(Exception):
+    pass
+
+
+def canonical_messages(messages: List[Dict]) -> List[Dict]:
+    """Messages with whitespace collapsed, so formatting differences share a key."""
+    return [{"role": m.get("role", ""), "content": " ".join(str(m.get("content", "")).split())}
+            for m in messages]
+
+
+def prompt_key(messages: List[Dict], model: str, rules_version: str = "") -> str:
+    payload = json.dumps({"messages": canonical_messages(messages), "model": model,
+                          "rules": rules_version}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite response cache, safe to share between Streamlit sessions."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = int(DEFAULT_MAX_MB * 1e6)):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise CacheError(f"Cannot open response cache at {path}: {e}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """The entry for `key` ({"response", "model", "metadata", "created", "hits"}) or None."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, model, metadata, created, hits, expires FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None or row[5] <= now:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.hits += 1
+        return {"response": row[0], "model": row[1], "metadata": json.loads(row[2]),
+                "created": row[3], "hits": row[4] + 1}
+
+    def put(self, key: str, response: str, model: str, metadata: Optional[Dict] = None,
+            ttl: Optional[float] = None) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, model, metadata, size, created, accessed, expires, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, response, model, json.dumps(metadata or {}, ensure_ascii=False), size, now, now,
+                 now + (self.ttl if ttl is None else ttl)))
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        db = self._db
+        db.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # walk from the least recently used until both limits hold
+        drop = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            drop.append((key,))
+            count -= 1
+            total -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", drop)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count, total, hits = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total, "stored_hits": hits,
+                "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache from the environment; None when disabled."""
+    global _CACHE
+    path = os.getenv("MEDIGUIDE_LLM_CACHE", DEFAULT_CACHE_PATH).strip()
+    if path.lower() in ("", "off", "0", "false"):
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None or _CACHE.path != path:
+            try:
+                _CACHE = ResponseCache(
+                    path,
+                    ttl=float(os.getenv("MEDIGUIDE_LLM_CACHE_TTL", DEFAULT_TTL)),
+                    max_entries=int(os.getenv("MEDIGUIDE_LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                    max_bytes=int(float(os.getenv("MEDIGUIDE_LLM_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1e6),
+                )
+            except ValueError as e:
+                raise CacheError(f"Invalid response cache setting: {e}")
+        return _CACHE
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--path", help="cache file (default: MEDIGUIDE_LLM_CACHE or data/llm_cache.sqlite3)")
+    args = parser.parse_args(argv)
+
+    try:
+        cache = ResponseCache(args.path) if args.path else get_response_cache()
+    except CacheError as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    if cache is None:
+        print("Response cache is disabled (MEDIGUIDE_LLM_CACHE=off)")
+        return 0
+    if args.command == "clear":
+        cache.clear()
+        print(f"Cleared {cache.path}")
+    else:
+        s = cache.stats()
+        print(f"{cache.path}: {s['entries']} entries, {s['bytes'] / 1e6:.2f} MB, {s['stored_hits']} hits served")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
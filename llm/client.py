@@ -0,0 +1,172 @@
+# llm/client.py
+"""
+Process-wide, long-lived OpenRouter clients.
+
+`send_chat_stream` used to build a new `openai.OpenAI` client per message,
+paying for a fresh connection pool, TCP connect and TLS handshake on every
+analysis and chat turn. `get_openai_client` instead keeps one client per
+(API key, base URL, headers, pool settings) for the life of the process. Its
+httpx transport keeps connections alive (HTTP/2 when the `h2` package is
+installed, so concurrent streams share one connection) and counts how many
+requests reused a pooled connection.
+
+Pool settings come from the environment:
+  MEDIGUIDE_LLM_MAX_CONNECTIONS    - connections per client (default 20)
+  MEDIGUIDE_LLM_MAX_KEEPALIVE      - idle connections kept open (default 10)
+  MEDIGUIDE_LLM_KEEPALIVE_EXPIRY   - seconds an idle connection is kept (default 120)
+  MEDIGUIDE_LLM_CONNECT_TIMEOUT    - seconds (default 5)
+  MEDIGUIDE_LLM_READ_TIMEOUT       - seconds between streamed chunks (default 60)
+  MEDIGUIDE_LLM_HTTP2              - "0" to force HTTP/1.1
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+import openai
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+_DEFAULTS = {
+    "max_connections": ("MEDIGUIDE_LLM_MAX_CONNECTIONS", 20),
+    "max_keepalive": ("MEDIGUIDE_LLM_MAX_KEEPALIVE", 10),
+    "keepalive_expiry": ("MEDIGUIDE_LLM_KEEPALIVE_EXPIRY", 120.0),
+    "connect_timeout": ("MEDIGUIDE_LLM_CONNECT_TIMEOUT", 5.0),
+    "read_timeout": ("MEDIGUIDE_LLM_READ_TIMEOUT", 60.0),
+}
+
+
+class ClientConfigError(Exception):
+    pass
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pool_settings() -> Dict:
+    """Pool limits and timeouts from the environment."""
+    settings = {}
+    for name, (env, default) in _DEFAULTS.items():
+        raw = os.getenv(env, "").strip()
+        try:
+            settings[name] = type(default)(raw) if raw else default
+        except ValueError:
+            raise ClientConfigError(f"{env} must be a number, got '{raw}'")
+    settings["http2"] = os.getenv("MEDIGUIDE_LLM_HTTP2", "1").strip() != "0" and _http2_available()
+    return settings
+
+
+class ConnectionStats:
+    """Thread-safe counters of requests, new connections and reuse."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.connect_seconds = 0.0
+
+    def record(self, connections: int, tls: int, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.connections += connections
+            self.tls_handshakes += tls
+            self.connect_seconds += seconds
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "reused": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "tls_handshakes": self.tls_handshakes,
+                "connect_seconds": round(self.connect_seconds, 4),
+            }
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """HTTP transport that reports, per request, whether it opened a connection."""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        seen = {"connections": 0, "tls": 0, "started": None, "seconds": 0.0}
+        outer = request.extensions.get("trace")
+
+        # httpcore reports connection setup through the "trace" extension
+        def trace(name, info):
+            if name == "connection.connect_tcp.started":
+                seen["started"] = time.perf_counter()
+            elif name == "connection.connect_tcp.complete":
+                seen["connections"] += 1
+            elif name == "connection.start_tls.complete":
+                seen["tls"] += 1
+            if name.endswith(".complete") and name.startswith("connection.") and seen["started"]:
+                seen["seconds"] = time.perf_counter() - seen["started"]
+            if outer:
+                outer(name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return super().handle_request(request)
+        finally:
+            self.stats.record(seen["connections"], seen["tls"], seen["seconds"])
+
+
+_STATS = ConnectionStats()
+_CLIENTS: Dict[Tuple, openai.OpenAI] = {}
+_LOCK = threading.Lock()
+
+
+def get_openai_client(api_key: str, base_url: str = DEFAULT_BASE_URL,
+                      headers: Optional[Dict[str, str]] = None) -> openai.OpenAI:
+    """The shared client for these credentials, created on first use."""
+    settings = pool_settings()
+    key = (api_key, base_url, tuple(sorted((headers or {}).items())), tuple(sorted(settings.items())))
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            transport = _CountingTransport(
+                _STATS,
+                http2=settings["http2"],
+                limits=httpx.Limits(max_connections=settings["max_connections"],
+                                    max_keepalive_connections=settings["max_keepalive"],
+                                    keepalive_expiry=settings["keepalive_expiry"]),
+            )
+            http_client = httpx.Client(
+                transport=transport,
+                timeout=httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"]),
+            )
+            # retries and fallback are handled per model by llm.resilience
+            client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                   default_headers=dict(headers or {}), http_client=http_client)
+            _CLIENTS[key] = client
+        return client
+
+
+def connection_stats() -> Dict:
+    """Requests, new connections, reused connections and handshake time so far."""
+    stats = _STATS.snapshot()
+    with _LOCK:
+        stats["clients"] = len(_CLIENTS)
+    return stats
+
+
+def close_clients() -> None:
+    """Close every pooled client (e.g. at shutdown or after a key change)."""
+    with _LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,151 @@
+# llm/context.py
+"""
+Token-budgeted conversation context for AI Chat.
+
+`page_ai_chat` used to resend the whole chat history every turn, so prompts
+grew without bound. `ChatContext.build` fits a conversation into a token
+budget instead:
+
+  - the system prompt is always sent verbatim;
+  - the most recent turns are sent verbatim for as long as they fit;
+  - older turns are folded into a rolling summary that is kept in the
+    caller's per-conversation `state` dict. The summary is only recomputed
+    when turns fall out of the verbatim window, and each time it is, the
+    window is cut back to `low_water` of the budget so the next few turns
+    reuse it as is.
+
+Tokens are counted with `tiktoken` when it is installed and estimated from
+word pieces otherwise.
+
+Configuration:
+  MEDIGUIDE_CHAT_CONTEXT_TOKENS  - prompt budget in tokens (default 3000)
+  MEDIGUIDE_CHAT_SUMMARY_TOKENS  - budget reserved for the summary (default 300)
+"""
+
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_BUDGET = 3000
+DEFAULT_SUMMARY_TOKENS = 300
+MESSAGE_OVERHEAD = 4  # role and separators per chat message
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_SENTENCE = re.compile(r"(.+?[.!?])(?:\s|$)", re.S)
+_ENCODING = None
+
+
+class ContextError(Exception):
+    pass
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text` (exact with tiktoken, a close estimate without)."""
+    global _ENCODING
+    if tiktoken is not None:
+        if _ENCODING is None:
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        return len(_ENCODING.encode(text))
+    # long words split into several BPE tokens
+    return sum(1 + len(p) // 6 for p in _PIECES.findall(text))
+
+
+def message_tokens(messages: List[Dict]) -> int:
+    return sum(count_tokens(str(m.get("content", ""))) + MESSAGE_OVERHEAD for m in messages)
+
+
+def _first_sentence(text: str, limit: int = 200) -> str:
+    text = " ".join(text.split())
+    m = _SENTENCE.match(text)
+    first = m.group(1) if m else text
+    return first if len(first) <= limit else first[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def extractive_summary(previous: str, turns: List[Dict], max_tokens: int) -> str:
+    """Local summary: the opening sentence of each turn, oldest dropped first."""
+    lines = previous.splitlines() if previous else []
+    for m in turns:
+        speaker = "User" if m.get("role") == "user" else "Assistant"
+        lines.append(f"- {speaker}: {_first_sentence(str(m.get('content', '')))}")
+    return fit_tokens("\n".join(lines), max_tokens)
+
+
+def fit_tokens(text: str, max_tokens: int) -> str:
+    """`text` cut to `max_tokens`, dropping its oldest (first) lines, then trailing words."""
+    lines = text.splitlines()
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    words = "\n".join(lines).split(" ")
+    while len(words) > 1 and count_tokens(" ".join(words)) > max_tokens:
+        words = words[:max(1, len(words) * 9 // 10)]
+    return " ".join(words)
+
+
+class ChatContext:
+    def __init__(self, budget: int = DEFAULT_BUDGET, summary_tokens: int = DEFAULT_SUMMARY_TOKENS,
+                 low_water: float = 0.6,
+                 summarize: Optional[Callable[[str, List[Dict], int], str]] = None):
+        """`summarize(previous_summary, turns, max_tokens)` folds turns into the summary."""
+        if summary_tokens >= budget or not 0 < low_water <= 1:
+            raise ContextError("Summary budget must be below the context budget and low_water in (0, 1]")
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.low_water = low_water
+        self.summarize = summarize or extractive_summary
+
+    def build(self, system: str, history: List[Dict], state: Dict) -> List[Dict]:
+        """Messages for the next request.
+
+        `history` is [{"role", "content"}] ending with the new user message;
+        `state` persists across turns of one conversation ("upto", "summary",
+        "summaries" recomputed so far) and is reset when the history shrinks.
+        """
+        upto = state.get("upto", 0)
+        if upto > len(history):
+            state.clear()
+            upto = 0
+        available = self.budget - count_tokens(system) - MESSAGE_OVERHEAD - self.summary_tokens
+        recent = history[upto:]
+
+        if message_tokens(recent) > available:
+            # keep turns from the newest back down to the low-water mark
+            target = available * self.low_water
+            cut, used = len(history), 0
+            while cut > upto + 1:
+                cost = message_tokens(history[cut - 1:cut])
+                if used + cost > target:
+                    break
+                used += cost
+                cut -= 1
+            cut = min(max(cut, upto + 1), len(history) - 1) if len(history) > 1 else 0
+            # start the verbatim window on a user turn
+            while cut < len(history) - 1 and history[cut].get("role") != "user":
+                cut += 1
+            if cut > upto:
+                summary = self.summarize(state.get("summary", ""), history[upto:cut], self.summary_tokens)
+                state["summary"] = fit_tokens(summary, self.summary_tokens)
+                state["upto"] = cut
+                state["summaries"] = state.get("summaries", 0) + 1
+                recent = history[cut:]
+
+        content = system
+        if state.get("summary"):
+            content += "\n\nSummary of the earlier conversation:\n" + state["summary"]
+        return [{"role": "system", "content": content}] + [dict(m) for m in recent]
+
+
+def get_chat_context(summarize: Optional[Callable[[str, List[Dict], int], str]] = None) -> ChatContext:
+    """A `ChatContext` with the budget from the environment."""
+    try:
+        return ChatContext(
+            budget=int(os.getenv("MEDIGUIDE_CHAT_CONTEXT_TOKENS", DEFAULT_BUDGET)),
+            summary_tokens=int(os.getenv("MEDIGUIDE_CHAT_SUMMARY_TOKENS", DEFAULT_SUMMARY_TOKENS)),
+            summarize=summarize,
+        )
+    except ValueError as e:
+        raise ContextError(f"Invalid chat context setting: {e}")
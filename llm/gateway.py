@@ -0,0 +1,297 @@
+# llm/gateway.py
+"""
+Asyncio gateway in front of `send_chat_stream`.
+
+Every Streamlit session used to open its own blocking stream, even when many
+of them asked for the same common symptom analysis at once. The gateway runs
+one event loop in a background thread and routes every request through it:
+
+  - a global cap and a per-key cap (by default per API key) on concurrent
+    upstream streams; requests over the cap wait in a queue;
+  - identical in-flight prompts (same canonical messages, model and options)
+    are coalesced: the first caller starts one upstream stream and every
+    later caller subscribes to it, replaying the chunks already received;
+  - a stream whose callers have all gone away is cancelled: its upstream is
+    closed at the next chunk and its concurrency slots freed, and one still
+    waiting in the queue leaves it at once;
+  - `metrics()` reports queue depth, active streams, subscribers and how many
+    requests were coalesced.
+
+The upstream is a blocking generator, so each stream is pumped on a worker
+thread and its chunks are handed back to the loop. Streamlit code calls
+`stream_sync`, a plain iterator over the same chunks.
+
+Configuration:
+  MEDIGUIDE_LLM_MAX_CONCURRENCY  - upstream streams at once (default 8)
+  MEDIGUIDE_LLM_MAX_PER_KEY      - upstream streams per key (default 4)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from .cache import prompt_key
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_PER_KEY = 4
+
+_END = object()
+
+
+class GatewayError(Exception):
+    pass
+
+
+class _Flight:
+    """One upstream stream and the callers subscribed to it."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[str] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.done = False
+        # set once the last subscriber leaves before the stream is done
+        self.cancelled = False
+        # the task running the stream, and whether it still waits for its slots
+        self.task: Optional[asyncio.Task] = None
+        self.queued = True
+        self.ok = False
+        self.model: Optional[str] = None
+        self.upstream_error: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+    def publish(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        for q in self.subscribers:
+            q.put_nowait(chunk)
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        if q in self.subscribers:
+            self.subscribers.remove(q)
+        if not self.subscribers and not self.done:
+            self.cancelled = True
+
+    def finish(self) -> None:
+        self.done = True
+        for q in self.subscribers:
+            q.put_nowait(_END)
+
+
+class LLMGateway:
+    def __init__(self, upstream: Optional[Callable[..., Iterator[str]]] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_per_key: int = DEFAULT_MAX_PER_KEY):
+        """`upstream` is a `send_chat_stream`-compatible generator function."""
+        if max_concurrency < 1 or max_per_key < 1:
+            raise GatewayError("Concurrency limits must be at least 1")
+        self._upstream = upstream
+        self.max_concurrency = max_concurrency
+        self.max_per_key = max_per_key
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-gateway")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        # created on the loop: global semaphore, per-key semaphores
+        self._global: Optional[asyncio.Semaphore] = None
+        self._per_key: Dict[str, asyncio.Semaphore] = {}
+        self._flights: Dict[str, _Flight] = {}
+        self._tasks = set()
+        # per key: {"queued", "active"}
+        self._load: Dict[str, Dict[str, int]] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+
+    @property
+    def upstream(self) -> Callable[..., Iterator[str]]:
+        if self._upstream is None:
+            from config import send_chat_stream
+            self._upstream = send_chat_stream
+        return self._upstream
+
+    @staticmethod
+    def coalesce_key(messages: List[Dict], client_config: Optional[Dict], options: Dict) -> str:
+        config = client_config or {}
+        extra = json.dumps({"base_url": config.get("base_url", ""), "models": config.get("models", []),
+                            "options": options},
+                           sort_keys=True, default=str)
+        return prompt_key(messages, config.get("model", ""), extra)
+
+    @staticmethod
+    def default_key(client_config: Optional[Dict]) -> str:
+        """Concurrency key for a config: a digest of its API key, never the key itself."""
+        api_key = (client_config or {}).get("api_key", "")
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+    async def stream(self, messages: List[Dict], client_config: Optional[Dict] = None,
+                     key: Optional[str] = None, status: Optional[Dict] = None,
+                     **kwargs) -> AsyncIterator[str]:
+        """Chunks of the response, shared with identical requests already in flight.
+
+        `status` gets "ok", "model" and "error" (see `send_chat_stream`) and "coalesced".
+        """
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        key = key or self.default_key(client_config)
+        ckey = self.coalesce_key(messages, client_config, kwargs)
+        self.requests += 1
+        flight = self._flights.get(ckey)
+        coalesced = flight is not None
+        if flight is None:
+            flight = _Flight(key)
+            self._flights[ckey] = flight
+            flight.task = asyncio.ensure_future(self._run(ckey, flight, messages, client_config, kwargs))
+            self._tasks.add(flight.task)
+            flight.task.add_done_callback(self._tasks.discard)
+        else:
+            self.coalesced += 1
+        if status is not None:
+            status.update(ok=False, coalesced=coalesced)
+
+        q: asyncio.Queue = asyncio.Queue()
+        for chunk in flight.chunks:
+            q.put_nowait(chunk)
+        if flight.done:
+            q.put_nowait(_END)
+        else:
+            flight.subscribers.append(q)
+        try:
+            while True:
+                item = await q.get()
+                if item is _END:
+                    break
+                yield item
+            if flight.error is not None:
+                raise flight.error
+            if status is not None:
+                status.update(ok=flight.ok, model=flight.model)
+                if flight.upstream_error:
+                    status["error"] = flight.upstream_error
+        finally:
+            flight.unsubscribe(q)
+            if flight.cancelled:
+                # a stream nobody waits for any more gives up its place in the queue
+                if flight.queued:
+                    flight.task.cancel()
+                # later identical requests start afresh rather than join a cancelled stream
+                if self._flights.get(ckey) is flight:
+                    del self._flights[ckey]
+
+    async def _run(self, ckey: str, flight: _Flight, messages, client_config, options) -> None:
+        load = self._load.setdefault(flight.key, {"queued": 0, "active": 0})
+        per_key = self._per_key.setdefault(flight.key, asyncio.Semaphore(self.max_per_key))
+        load["queued"] += 1
+        try:
+            async with self._global, per_key:
+                load["queued"] -= 1
+                flight.queued = False
+                if flight.cancelled:
+                    return
+                load["active"] += 1
+                self.upstream_calls += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    upstream_status: Dict = {}
+
+                    def pump():
+                        chunks = self.upstream(messages, client_config, status=upstream_status, **options)
+                        try:
+                            for chunk in chunks:
+                                if flight.cancelled:
+                                    break
+                                loop.call_soon_threadsafe(flight.publish, chunk)
+                        finally:
+                            # ends the upstream call (recorded as cancelled) when nobody is listening
+                            chunks.close()
+
+                    await loop.run_in_executor(self._executor, pump)
+                    flight.ok = bool(upstream_status.get("ok"))
+                    flight.model = upstream_status.get("model")
+                    flight.upstream_error = upstream_status.get("error")
+                finally:
+                    load["active"] -= 1
+        except Exception as e:
+            flight.error = e
+        finally:
+            if flight.queued:
+                load["queued"] -= 1
+            if self._flights.get(ckey) is flight:
+                del self._flights[ckey]
+            flight.finish()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-gateway-loop", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def stream_sync(self, messages: List[Dict], client_config: Optional[Dict] = None,
+                    key: Optional[str] = None, status: Optional[Dict] = None, **kwargs) -> Iterator[str]:
+        """`stream` for synchronous callers such as Streamlit pages."""
+        loop = self._ensure_loop()
+        out: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self.stream(messages, client_config, key, status, **kwargs):
+                    out.put(("chunk", chunk))
+                out.put(("done", None))
+            except Exception as e:
+                out.put(("error", e))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                kind, value = out.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            # a caller that stops early only unsubscribes; the stream goes on for the
+            # others, or is cancelled if it was the last one
+            future.cancel()
+
+    def metrics(self) -> Dict:
+        """Queue depth and load, overall and per key."""
+        per_key = {k: dict(v) for k, v in list(self._load.items())}
+        flights = list(self._flights.values())
+        return {
+            "queued": sum(v["queued"] for v in per_key.values()),
+            "active": sum(v["active"] for v in per_key.values()),
+            "in_flight_prompts": len(flights),
+            "subscribers": sum(len(f.subscribers) for f in flights),
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "upstream_calls": self.upstream_calls,
+            "max_concurrency": self.max_concurrency,
+            "max_per_key": self.max_per_key,
+            "per_key": per_key,
+        }
+
+
+_GATEWAY: Optional[LLMGateway] = None
+_GATEWAY_LOCK = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway configured from the environment."""
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        if _GATEWAY is None:
+            try:
+                _GATEWAY = LLMGateway(
+                    max_concurrency=int(os.getenv("MEDIGUIDE_LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                    max_per_key=int(os.getenv("MEDIGUIDE_LLM_MAX_PER_KEY", DEFAULT_MAX_PER_KEY)),
+                )
+            except ValueError as e:
+                raise GatewayError(f"Invalid gateway setting: {e}")
+        return _GATEWAY
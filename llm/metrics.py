@@ -0,0 +1,327 @@
+# llm/metrics.py
+"""
+Instrumentation of LLM calls in Prometheus text format.
+
+`send_chat_stream` reports every upstream call here: calling page, model,
+time to first token, total duration, input/output tokens, tokens/sec,
+retries, error class and estimated cost. `LLMMetrics.render()` exposes:
+
+  - cumulative histograms per page and model (`_bucket`/`_sum`/`_count`),
+    the Prometheus-native form, for rates and quantiles over any range;
+  - rolling-window summaries (p50/p95/p99 over the last
+    MEDIGUIDE_LLM_METRICS_WINDOW seconds) per page, readable without a
+    Prometheus server;
+  - counters of calls by outcome, errors by class, retries, tokens and cost;
+  - gauges of the gateway queue and of each model's circuit and p95.
+
+Output tokens are counted locally (see `llm.context.count_tokens`); cost is
+estimated from per-million-token prices (input, output) in USD, overridable
+with MEDIGUIDE_LLM_PRICES='{"model": [input, output]}'.
+
+Export, both optional:
+  MEDIGUIDE_LLM_METRICS_PORT  - serve GET /metrics on this port (on
+                                MEDIGUIDE_LLM_METRICS_HOST, default 127.0.0.1)
+  MEDIGUIDE_LLM_METRICS_FILE  - rewrite this file (atomically, at most every
+                                MEDIGUIDE_LLM_METRICS_INTERVAL seconds, default 10)
+                                for a node_exporter textfile collector
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# USD per million tokens (input, output)
+DEFAULT_PRICES = {
+    "anthropic/claude-3.5-sonnet": (3.0, 15.0),
+    "anthropic/claude-3-haiku": (0.25, 1.25),
+    "openai/gpt-4o": (2.5, 10.0),
+    "openai/gpt-4o-mini": (0.15, 0.6),
+}
+DEFAULT_WINDOW = 300.0
+
+HISTOGRAMS = {
+    "ttft_seconds": ("Time to first token", (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32)),
+    "duration_seconds": ("Total call duration", (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)),
+    "output_tokens": ("Output tokens per call", (16, 32, 64, 128, 256, 512, 1024)),
+    "tokens_per_second": ("Output tokens per second after the first token", (5, 10, 20, 40, 80, 160)),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class MetricsError(Exception):
+    pass
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def load_prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(DEFAULT_PRICES)
+    raw = os.getenv("MEDIGUIDE_LLM_PRICES", "").strip()
+    if raw:
+        try:
+            prices.update({model: (float(p[0]), float(p[1])) for model, p in json.loads(raw).items()})
+        except (ValueError, TypeError, IndexError, AttributeError) as e:
+            raise MetricsError(f"MEDIGUIDE_LLM_PRICES must map models to [input, output] prices: {e}")
+    return prices
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class _Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class LLMMetrics:
+    def __init__(self, window: float = DEFAULT_WINDOW, prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.window = window
+        self.prices = prices if prices is not None else dict(DEFAULT_PRICES)
+        self._lock = threading.Lock()
+        # (metric, page, model) -> histogram
+        self._histograms: Dict[Tuple[str, str, str], _Histogram] = {}
+        # counters keyed by label tuples
+        self._calls: Dict[Tuple[str, str, str], int] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._retries: Dict[Tuple[str, str], int] = {}
+        self._tokens: Dict[Tuple[str, str, str], int] = {}
+        self._cost: Dict[Tuple[str, str], float] = {}
+        # (time, page, metric, value) for the rolling window
+        self._recent: deque = deque()
+
+    def estimate_cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        price_in, price_out = self.prices.get(model, (0.0, 0.0))
+        return (input_tokens * price_in + output_tokens * price_out) / 1e6
+
+    def observe(self, page: str, model: str, duration: float, ttft: Optional[float] = None,
+                input_tokens: int = 0, output_tokens: int = 0, retries: int = 0,
+                error: Optional[str] = None, cancelled: bool = False) -> Dict:
+        """Record one call; returns the derived values (tokens/sec, cost, outcome)."""
+        page = page or "unknown"
+        model = model or "unknown"
+        outcome = "error" if error else "cancelled" if cancelled else "ok"
+        tps = None
+        if ttft is not None and output_tokens > 1 and duration > ttft:
+            tps = (output_tokens - 1) / (duration - ttft)
+        cost = self.estimate_cost(model, input_tokens, output_tokens)
+        values = {"duration_seconds": duration, "ttft_seconds": ttft, "output_tokens": output_tokens,
+                  "tokens_per_second": tps}
+        now = time.time()
+        with self._lock:
+            for metric, value in values.items():
+                if value is None or (metric == "output_tokens" and outcome != "ok"):
+                    continue
+                key = (metric, page, model)
+                if key not in self._histograms:
+                    self._histograms[key] = _Histogram(HISTOGRAMS[metric][1])
+                self._histograms[key].observe(value)
+                self._recent.append((now, page, metric, value))
+            self._calls[(page, model, outcome)] = self._calls.get((page, model, outcome), 0) + 1
+            if error:
+                self._errors[(page, error)] = self._errors.get((page, error), 0) + 1
+            if retries:
+                self._retries[(page, model)] = self._retries.get((page, model), 0) + retries
+            for direction, n in (("input", input_tokens), ("output", output_tokens)):
+                self._tokens[(page, model, direction)] = self._tokens.get((page, model, direction), 0) + n
+            self._cost[(page, model)] = self._cost.get((page, model), 0.0) + cost
+            self._trim(now)
+        return {"tokens_per_second": tps, "cost_usd": cost, "outcome": outcome}
+
+    def _trim(self, now: float) -> None:
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            self._trim(time.time())
+            for metric, (help_text, _) in HISTOGRAMS.items():
+                name = f"mediguide_llm_{metric}"
+                lines += [f"# HELP {name} {help_text}.", f"# TYPE {name} histogram"]
+                for (m, page, model), h in sorted(self._histograms.items()):
+                    if m != metric:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip(h.bounds + (float("inf"),), h.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else _number(float(bound))
+                        lines.append(f"{name}_bucket{_labels(page=page, model=model, le=le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(page=page, model=model)} {_number(h.sum)}")
+                    lines.append(f"{name}_count{_labels(page=page, model=model)} {h.count}")
+
+                window = f"{name}_window"
+                lines += [f"# HELP {window} {help_text} over the last {int(self.window)}s.",
+                          f"# TYPE {window} summary"]
+                by_page: Dict[str, List[float]] = {}
+                for _, page, m, value in self._recent:
+                    if m == metric:
+                        by_page.setdefault(page, []).append(value)
+                for page, values in sorted(by_page.items()):
+                    for q in QUANTILES:
+                        lines.append(f"{window}{_labels(page=page, quantile=q)} {_number(float(percentile(values, q)))}")
+                    lines.append(f"{window}_sum{_labels(page=page)} {_number(float(sum(values)))}")
+                    lines.append(f"{window}_count{_labels(page=page)} {len(values)}")
+
+            counters = [
+                ("mediguide_llm_calls_total", "LLM calls by outcome", "counter",
+                 [(_labels(page=p, model=m, outcome=o), n) for (p, m, o), n in sorted(self._calls.items())]),
+                ("mediguide_llm_errors_total", "Failed LLM calls by error class", "counter",
+                 [(_labels(page=p, error=e), n) for (p, e), n in sorted(self._errors.items())]),
+                ("mediguide_llm_retries_total", "Retried upstream attempts", "counter",
+                 [(_labels(page=p, model=m), n) for (p, m), n in sorted(self._retries.items())]),
+                ("mediguide_llm_tokens_total", "Prompt and completion tokens", "counter",
+                 [(_labels(page=p, model=m, direction=d), n) for (p, m, d), n in sorted(self._tokens.items())]),
+                ("mediguide_llm_cost_usd_total", "Estimated cost in USD", "counter",
+                 [(_labels(page=p, model=m), _number(c)) for (p, m), c in sorted(self._cost.items())]),
+            ]
+        counters += self._live_gauges()
+        for name, help_text, kind, samples in counters:
+            lines += [f"# HELP {name} {help_text}.", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{labels} {value}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _live_gauges() -> List[Tuple[str, str, str, List]]:
+        from . import gateway, resilience
+
+        gauges = []
+        if gateway._GATEWAY is not None:
+            g = gateway._GATEWAY.metrics()
+            gauges += [
+                ("mediguide_llm_gateway_queued", "Requests waiting for an upstream slot", "gauge", [("", g["queued"])]),
+                ("mediguide_llm_gateway_active", "Upstream streams in progress", "gauge", [("", g["active"])]),
+                ("mediguide_llm_gateway_coalesced_total", "Requests served by another request's stream",
+                 "counter", [("", g["coalesced"])]),
+            ]
+        models = resilience.get_router().snapshot()
+        gauges += [
+            ("mediguide_llm_circuit_state", "Model circuit breaker (0 closed, 1 half-open, 2 open)", "gauge",
+             [(_labels(model=m), CIRCUIT_STATES[s["state"]]) for m, s in sorted(models.items())]),
+            ("mediguide_llm_model_p95_ttft_seconds", "Router's rolling p95 time to first token", "gauge",
+             [(_labels(model=m), _number(float(s["p95_first_token"]))) for m, s in sorted(models.items())
+              if s["p95_first_token"] is not None]),
+            ("mediguide_llm_model_error_rate", "Router's rolling error rate", "gauge",
+             [(_labels(model=m), _number(float(s["error_rate"]))) for m, s in sorted(models.items())]),
+        ]
+        return gauges
+
+    def write(self, path: str) -> None:
+        """Write `render()` to `path` atomically."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+class _Exporter:
+    """Serves /metrics and/or rewrites the metrics file after calls."""
+
+    def __init__(self, metrics: LLMMetrics, host: str, port: Optional[int], path: Optional[str],
+                 interval: float):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._written = 0.0
+        self._lock = threading.Lock()
+        if port:
+            server = ThreadingHTTPServer((host, port), self._handler())
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="llm-metrics", daemon=True).start()
+
+    def _handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def after_call(self) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._written < self.interval:
+                return
+            self._written = now
+        try:
+            self.metrics.write(self.path)
+        except OSError:
+            pass  # metrics must never break a chat
+
+
+_METRICS: Optional[LLMMetrics] = None
+_EXPORTER: Optional[_Exporter] = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_metrics() -> LLMMetrics:
+    """Process-wide metrics, with the exporters from the environment started."""
+    global _METRICS, _EXPORTER
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            try:
+                metrics = LLMMetrics(window=float(os.getenv("MEDIGUIDE_LLM_METRICS_WINDOW", DEFAULT_WINDOW)),
+                                     prices=load_prices())
+                port = int(os.getenv("MEDIGUIDE_LLM_METRICS_PORT", "0") or 0)
+                interval = float(os.getenv("MEDIGUIDE_LLM_METRICS_INTERVAL", 10))
+            except ValueError as e:
+                raise MetricsError(f"Invalid metrics setting: {e}")
+            host = os.getenv("MEDIGUIDE_LLM_METRICS_HOST", "127.0.0.1")
+            path = os.getenv("MEDIGUIDE_LLM_METRICS_FILE") or None
+            try:
+                _EXPORTER = _Exporter(metrics, host, port, path, interval)
+            except OSError:
+                # port taken (e.g. by this process before a module reload): keep recording
+                _EXPORTER = _Exporter(metrics, host, None, path, interval)
+            _METRICS = metrics
+        return _METRICS
+
+
+def record_call(page: str, model: str, duration: float, **values) -> Dict:
+    """`LLMMetrics.observe` on the process-wide metrics, then refresh the metrics file."""
+    result = get_metrics().observe(page, model, duration, **values)
+    if _EXPORTER is not None:
+        _EXPORTER.after_call()
+    return result
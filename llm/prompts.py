@@ -0,0 +1,72 @@
+# llm/prompts.py
+"""
+Prompts sent by the Symptom Checker and AI Chat pages.
+
+Kept free of Streamlit so the pages and the load-test harness build exactly
+the same messages.
+"""
+
+from typing import Dict, List, Tuple
+
+ANALYSIS_SYSTEM_PROMPT = ("You are an expert medical assistant. Provide detailed, evidence-based analysis "
+                          "with proper precautions and recommendations.")
+CHAT_SYSTEM_PROMPT = ("You are a cautious, evidence-based medical assistant. Provide helpful information "
+                      "but always remind users to consult healthcare professionals.")
+
+
+def medication_context(report: Dict) -> str:
+    """Database facts about mentioned medications, as plain text for an AI prompt."""
+    lines = []
+    for drug in report["drugs"]:
+        lines.append(
+            f"- {drug['name']} ({drug['class']}); major interactions: {drug['major_interactions'] or 'none listed'}; "
+            f"contraindications: {drug['contraindications'] or 'none listed'}"
+        )
+    for name in report["external"]:
+        lines.append(f"- {name} (not in the drug database)")
+    for hit in report["interactions"]:
+        lines.append(f"- Listed interaction: {hit['drugs'][0]} + {hit['drugs'][1]}")
+    for drug, cond in report["contraindicated"]:
+        lines.append(f"- {drug} is contraindicated in {cond}")
+    return "\n".join(lines)
+
+
+def analysis_messages(selected: List[str], severity_val: int, severity_label: str, details: str,
+                      ranked: List[Tuple[str, float]], med_context: str = "") -> List[Dict]:
+    """Messages for the Symptom Checker's AI analysis (`details` already sanitized)."""
+    prompt = f"""Provide a comprehensive medical analysis for:
+
+Symptoms: {', '.join(sorted(selected))}
+Severity: {severity_val}/10 ({severity_label})
+Additional Details: {details if details else 'None provided'}
+{f'Possible Conditions: {" ,".join([c for c, _ in ranked[:3]])}' if ranked else ''}
+{f"Current Medications (drug database entries):{chr(10)}{med_context}" if med_context else ''}
+
+Provide:
+1. Detailed symptom analysis
+2. Possible causes and risk factors
+3. Recommended precautions and self-care
+4. When to seek immediate medical attention
+5. Preventive measures
+
+Be thorough but remind users to consult healthcare professionals."""
+    return [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def chat_system_prompt(med_context: str = "") -> str:
+    system = CHAT_SYSTEM_PROMPT
+    if med_context:
+        system += "\n\nDrug database entries for medications the user mentioned:\n" + med_context
+    return system
+
+
+def summary_messages(previous: str, turns: List[Dict], max_tokens: int) -> List[Dict]:
+    """Messages asking the model to fold older chat turns into the rolling summary."""
+    transcript = "\n".join(f"{'User' if t['role'] == 'user' else 'Assistant'}: {t['content']}" for t in turns)
+    return [
+        {"role": "system", "content": f"Summarize this medical chat for context in under {int(max_tokens * 0.7)} words. Keep symptoms, medications, conditions discussed and advice given. No greetings."},
+        {"role": "user", "content": (f"Earlier summary:\n{previous}\n\n" if previous else "") + f"New turns:\n{transcript}"},
+    ]
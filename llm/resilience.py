@@ -0,0 +1,246 @@
+# llm/resilience.py
+"""
+Retries, circuit breakers and model fallback for OpenRouter streams.
+
+`ModelRouter.stream` opens a stream on the best available model from a
+configured list and moves down the list when one fails:
+
+  - retryable errors (timeouts, connection errors, 429, 5xx, and connections
+    dropped while a stream is being read) are retried with
+    bounded exponential backoff and jitter, honouring Retry-After; a stream
+    is only retried before its first chunk, never halfway through;
+  - each model has a circuit breaker: after `failure_threshold` consecutive
+    failures it opens for `cooldown` seconds and the model is skipped, then a
+    single trial request decides whether it closes again;
+  - healthy models keep their configured order. A model whose rolling p95
+    time-to-first-token exceeds `slow_seconds` or whose error rate exceeds
+    `MAX_ERROR_RATE` drops behind them, and degraded models are ranked by
+    p95 x (1 + error rate), so one slow upstream cannot stall every session;
+  - authentication and permission errors are raised at once; other client
+    errors (unknown model, bad request) move on to the next model.
+
+Configuration:
+  MEDIGUIDE_LLM_MAX_ATTEMPTS       - attempts per model (default 2)
+  MEDIGUIDE_LLM_BREAKER_FAILURES   - consecutive failures that open a circuit (default 3)
+  MEDIGUIDE_LLM_BREAKER_COOLDOWN   - seconds a circuit stays open (default 30)
+  MEDIGUIDE_LLM_SLOW_SECONDS       - p95 time-to-first-token counted as slow (default 10)
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+import openai
+
+# the SDK only wraps errors raised while opening a stream; reading one raises httpx's own
+RETRYABLE_ERRORS = (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                    openai.InternalServerError, httpx.TransportError)
+FATAL_ERRORS = (openai.AuthenticationError, openai.PermissionDeniedError)
+
+WINDOW = 50
+MIN_SAMPLES = 5
+MAX_ERROR_RATE = 0.25
+
+
+class ModelsUnavailableError(Exception):
+    pass
+
+
+class ModelHealth:
+    """Rolling latency/error window and circuit breaker of one model."""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0, window: int = WINDOW):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        # time to first token of streams that produced one, and True/False per attempt
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trial = False
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def error_rate(self) -> float:
+        if len(self.outcomes) < MIN_SAMPLES:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def allow(self, now: float) -> bool:
+        """Whether a request may go to this model now (claims the half-open trial)."""
+        if self.state == "open":
+            if now - self.opened_at < self.cooldown:
+                return False
+            self.state = "half_open"
+            self.trial = False
+        if self.state == "half_open":
+            if self.trial:
+                return False
+            self.trial = True
+        return True
+
+    def first_token(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def success(self) -> None:
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.trial = False
+
+    def failure(self, now: float) -> None:
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = now
+        self.trial = False
+
+    def release(self) -> None:
+        """End an attempt that says nothing about the model's health."""
+        self.trial = False
+        if self.state == "half_open":
+            self.state = "open"
+            self.opened_at = 0.0  # let the next request try again straight away
+
+    def snapshot(self) -> Dict:
+        p95 = self.p95()
+        return {"state": self.state, "p95_first_token": round(p95, 3) if p95 is not None else None,
+                "error_rate": round(self.error_rate(), 3), "samples": len(self.outcomes),
+                "consecutive_failures": self.consecutive_failures}
+
+
+class ModelRouter:
+    def __init__(self, max_attempts: int = 2, base_delay: float = 0.5, max_delay: float = 8.0,
+                 failure_threshold: int = 3, cooldown: float = 30.0, slow_seconds: float = 10.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.slow_seconds = slow_seconds
+        self._sleep = sleep
+        self._health: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model: str) -> ModelHealth:
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = ModelHealth(self.failure_threshold, self.cooldown)
+        return health
+
+    def ranked(self, models: Sequence[str]) -> List[str]:
+        """`models` in the order they should be tried (open circuits included, last)."""
+        with self._lock:
+            def key(item):
+                index, model = item
+                health = self._model(model)
+                p95, errors = health.p95(), health.error_rate()
+                degraded = errors > MAX_ERROR_RATE or (p95 is not None and p95 > self.slow_seconds)
+                score = (p95 or self.slow_seconds) * (1 + errors) if degraded else index
+                return health.state == "open", degraded, score
+            return [m for _, m in sorted(enumerate(dict.fromkeys(models)), key=key)]
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Delay before retry `attempt + 1`: exponential with jitter, or Retry-After."""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def stream(self, open_stream: Callable[[str], Iterator[str]], models: Sequence[str],
+               stats: Optional[Dict] = None) -> Iterator[str]:
+        """Chunks from `open_stream(model)` on the first model that answers.
+
+        `stats` gets "attempts": upstream requests made, retries included.
+        """
+        last_error: Optional[BaseException] = None
+        for model in self.ranked(models):
+            for attempt in range(self.max_attempts):
+                with self._lock:
+                    health = self._model(model)
+                    allowed = health.allow(time.monotonic())
+                    # this attempt holds the half-open trial until it reports an outcome
+                    claimed = allowed and health.state == "half_open"
+                if not allowed:
+                    break
+                if stats is not None:
+                    stats["attempts"] = stats.get("attempts", 0) + 1
+                started = time.monotonic()
+                first = True
+                try:
+                    for chunk in open_stream(model):
+                        if first:
+                            with self._lock:
+                                health.first_token(time.monotonic() - started)
+                            first = False
+                        yield chunk
+                    # one outcome per attempt, once the stream has run to its end
+                    with self._lock:
+                        if first:
+                            health.first_token(time.monotonic() - started)
+                        health.success()
+                    claimed = False
+                    return
+                except RETRYABLE_ERRORS as e:
+                    with self._lock:
+                        health.failure(time.monotonic())
+                    claimed = False
+                    if not first:
+                        raise  # part of the answer is already out
+                    last_error = e
+                    if attempt + 1 < self.max_attempts:
+                        self._sleep(self.backoff(attempt, e))
+                except FATAL_ERRORS:
+                    raise
+                except openai.APIStatusError as e:
+                    if not first:
+                        raise
+                    last_error = e
+                    break
+                finally:
+                    # a trial claimed by another request is not ours to release
+                    if claimed:
+                        with self._lock:
+                            health.release()
+        if last_error is not None:
+            raise last_error
+        raise ModelsUnavailableError("All configured models are temporarily unavailable; please try again shortly.")
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Circuit state, p95 time-to-first-token and error rate per model."""
+        with self._lock:
+            return {model: health.snapshot() for model, health in self._health.items()}
+
+
+_ROUTER: Optional[ModelRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Process-wide router configured from the environment."""
+    global _ROUTER
+    with _ROUTER_LOCK:
+        if _ROUTER is None:
+            _ROUTER = ModelRouter(
+                max_attempts=int(os.getenv("MEDIGUIDE_LLM_MAX_ATTEMPTS", 2)),
+                failure_threshold=int(os.getenv("MEDIGUIDE_LLM_BREAKER_FAILURES", 3)),
+                cooldown=float(os.getenv("MEDIGUIDE_LLM_BREAKER_COOLDOWN", 30)),
+                slow_seconds=float(os.getenv("MEDIGUIDE_LLM_SLOW_SECONDS", 10)),
+            )
+        return _ROUTER
@@ -0,0 +1,301 @@
+# llm/similar.py
+"""
+Near-duplicate question cache for single-turn AI Chat questions.
+
+"what causes migraines" and "What are the causes of migraine?" miss the
+exact-match response cache. Here each question is reduced to its content
+words (lowercased, stop words dropped, plurals folded; negations, modals,
+pronouns and question words kept). The word sets are indexed with MinHash
+signatures in LSH bands, so a lookup only compares against questions that
+share a band. Everything is computed locally; no embedding service is needed.
+
+By default an answer is only reused for the same set of content words. A
+lower Jaccard threshold can be opted into, but a candidate is still
+rejected when the words that differ include a negation, a number, a
+population word (child/adult, first/third trimester, he/she, ...) or a
+drug or condition name: "child dose of paracetamol" never gets the adult
+answer, and "should I not go to hospital" never gets the answer to
+"should I go".
+
+Entries live in process memory, shared by all sessions, with an LRU bound
+and a TTL. A namespace (e.g. a digest of model and system prompt) keeps
+answers given under different instructions apart.
+
+Configuration:
+  MEDIGUIDE_CHAT_SIMILAR              - "off" to disable
+  MEDIGUIDE_CHAT_SIMILAR_THRESHOLD    - Jaccard similarity to reuse an answer (default 1.0, same words only)
+  MEDIGUIDE_CHAT_SIMILAR_MAX_ENTRIES  - default 2000
+  MEDIGUIDE_CHAT_SIMILAR_TTL          - seconds (default 1 day)
+
+Hit-rate report for a corpus of questions (harness JSONL or one per line):
+    python -m llm.similar corpus.jsonl --threshold 0.7 0.8 0.9 1.0 --show 5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+DEFAULT_THRESHOLD = 1.0
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL = 24 * 3600
+
+_WORD = re.compile(r"[a-z0-9]+")
+_PRIME = (1 << 61) - 1
+STOPWORDS = frozenset("""
+a an the of for to in on at by about is are was were be been being am do does did done i me my we our
+you your it its this that these those and or so have has had get gets got from as there please tell
+know any some
+""".split())
+# words that change the answer when two questions differ by them
+NEGATIONS = frozenset("""
+no not never none nothing nobody without cannot cant dont doesnt didnt wont shouldnt isnt arent
+wasnt werent avoid stop
+""".split())
+POPULATION_WORDS = frozenset("""
+child children kid infant baby toddler newborn neonate teen teenager adolescent adult elderly senior
+older pregnant pregnancy trimester first second third breastfeeding nursing man men woman women male
+female boy girl son daughter he she his her him they them their
+""".split())
+NUMBER_WORDS = frozenset("one two three four five six seven eight nine ten twelve half double twice".split())
+
+
+class SimilarCacheError(Exception):
+    pass
+
+
+def _fold(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def question_terms(text: str) -> FrozenSet[str]:
+    """Content words of a question, normalized for comparison."""
+    return frozenset(_fold(w) for w in _WORD.findall(text.lower().replace("'", "")) if w not in STOPWORDS)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+_NAME_TERMS: Optional[FrozenSet[str]] = None
+
+
+def name_terms() -> FrozenSet[str]:
+    """Words of drug names, aliases and condition names from `medical_data` and rules.json."""
+    global _NAME_TERMS
+    if _NAME_TERMS is None:
+        names: List[str] = []
+        try:
+            from medical_data import CONDITION_SYNONYMS, DRUG_ALIASES, SAMPLE_DISEASES, SAMPLE_DRUGS
+            names += [d["name"] for d in SAMPLE_DRUGS] + [d["name"] for d in SAMPLE_DISEASES]
+            names += [n for aliases in DRUG_ALIASES.values() for n in aliases]
+            names += list(CONDITION_SYNONYMS) + [n for words in CONDITION_SYNONYMS.values() for n in words]
+        except ImportError:
+            pass
+        try:
+            from rules import RulesLoadError, load_rules
+            names += [cond for mapping in load_rules().values() for cond in mapping]
+        except (ImportError, RulesLoadError):
+            pass
+        _NAME_TERMS = frozenset(t for name in names for t in question_terms(name))
+    return _NAME_TERMS
+
+
+def changes_meaning(difference: FrozenSet[str]) -> bool:
+    """Whether questions differing by these terms may need different answers."""
+    return any(t in NEGATIONS or t in POPULATION_WORDS or t in NUMBER_WORDS or any(c.isdigit() for c in t)
+               for t in difference) or not name_terms().isdisjoint(difference)
+
+
+class MinHasher:
+    """MinHash signatures from `num_perm` universal hash functions."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, terms: FrozenSet[str]) -> Tuple[int, ...]:
+        hashes = [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "big")
+                  for t in terms]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self.params)
+
+
+class SimilarQuestionCache:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL, num_perm: int = 64, bands: int = 16):
+        if not 0 < threshold <= 1 or num_perm % bands:
+            raise SimilarCacheError("threshold must be in (0, 1] and num_perm a multiple of bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._hasher = MinHasher(num_perm)
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._buckets: Dict[Tuple, set] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.similarity_sum = 0.0
+
+    def _band_keys(self, namespace: str, signature: Tuple[int, ...]) -> List[Tuple]:
+        return [(namespace, i, signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for key in entry["bands"]:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def lookup(self, question: str, namespace: str = "") -> Optional[Dict]:
+        """Best stored answer at or above the threshold whose differing words don't change the meaning:
+        {"response", "similarity", "question", "model", "created"}."""
+        terms = question_terms(question)
+        if not terms:
+            return None
+        signature = self._hasher.signature(terms)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for key in self._band_keys(namespace, signature):
+                candidates |= self._buckets.get(key, set())
+            best, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry["expires"] <= now:
+                    self._remove(entry_id)
+                    continue
+                score = jaccard(terms, entry["terms"])
+                if score >= self.threshold and score > best_score and not changes_meaning(terms ^ entry["terms"]):
+                    best, best_score = entry_id, score
+            if best is None:
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            self.similarity_sum += best_score
+            entry = self._entries[best]
+            return {"response": entry["response"], "similarity": round(best_score, 3),
+                    "question": entry["question"], "model": entry["model"], "created": entry["created"]}
+
+    def put(self, question: str, response: str, namespace: str = "", model: str = "") -> None:
+        terms = question_terms(question)
+        if not terms:
+            return
+        signature = self._hasher.signature(terms)
+        now = time.time()
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            bands = self._band_keys(namespace, signature)
+            self._entries[entry_id] = {"terms": terms, "question": question, "response": response,
+                                       "model": model, "created": now, "expires": now + self.ttl,
+                                       "bands": bands}
+            for key in bands:
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "lookups": self.lookups, "hits": self.hits,
+                    "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                    "mean_similarity": round(self.similarity_sum / self.hits, 3) if self.hits else 0.0,
+                    "threshold": self.threshold}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+
+_CACHE: Optional[SimilarQuestionCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_similar_cache() -> Optional[SimilarQuestionCache]:
+    """Process-wide near-duplicate cache from the environment; None when disabled."""
+    global _CACHE
+    if os.getenv("MEDIGUIDE_CHAT_SIMILAR", "on").strip().lower() in ("off", "0", "false"):
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            try:
+                _CACHE = SimilarQuestionCache(
+                    threshold=float(os.getenv("MEDIGUIDE_CHAT_SIMILAR_THRESHOLD", DEFAULT_THRESHOLD)),
+                    max_entries=int(os.getenv("MEDIGUIDE_CHAT_SIMILAR_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                    ttl=float(os.getenv("MEDIGUIDE_CHAT_SIMILAR_TTL", DEFAULT_TTL)),
+                )
+            except ValueError as e:
+                raise SimilarCacheError(f"Invalid similar-question cache setting: {e}")
+        return _CACHE
+
+
+def _read_questions(path: str) -> List[str]:
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                req = json.loads(line)
+                # single-turn chat requests only, as in the app
+                if req.get("message") and not req.get("history"):
+                    questions.append(req["message"])
+            else:
+                questions.append(line)
+    return questions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report near-duplicate cache hit rates for a question corpus")
+    parser.add_argument("corpus", help="harness JSONL (single-turn chat requests) or one question per line")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[DEFAULT_THRESHOLD])
+    parser.add_argument("--show", type=int, default=0, help="print this many matched pairs per threshold")
+    args = parser.parse_args(argv)
+
+    try:
+        questions = _read_questions(args.corpus)
+    except (OSError, ValueError) as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    print(f"{len(questions)} single-turn questions")
+    for threshold in args.threshold:
+        try:
+            cache = SimilarQuestionCache(threshold=threshold, max_entries=max(1, len(questions)))
+        except SimilarCacheError as e:
+            print("Error:", e, file=sys.stderr)
+            return 1
+        pairs = []
+        for q in questions:
+            hit = cache.lookup(q)
+            if hit:
+                pairs.append((hit["similarity"], q, hit["question"]))
+            else:
+                cache.put(q, "")
+        s = cache.stats()
+        print(f"  threshold {threshold:.2f}: {s['hits']} hits / {s['lookups']} lookups "
+              f"({s['hit_rate']:.1%}), mean similarity {s['mean_similarity']:.2f}")
+        for similarity, q, matched in pairs[:args.show]:
+            print(f"    {similarity:.2f}  {q!r} -> {matched!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
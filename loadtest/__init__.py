@@ -0,0 +1,7 @@
+"""
+Offline load-testing tools for MediGuideAI
+"""
+
+from .stub_server import StubServer, StubServerError
+
+__all__ = ['StubServer', 'StubServerError']
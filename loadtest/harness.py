@@ -0,0 +1,357 @@
+# loadtest/harness.py
+"""
+End-to-end load test replaying a corpus of Symptom Checker and AI Chat requests.
+
+Each corpus line is one JSON request in the requests.jsonl style:
+
+    {"request_id": "sym-0001", "kind": "symptom", "symptoms": ["fever", "cough"],
+     "severity": 6, "details": "Started Monday, taking ibuprofen"}
+    {"request_id": "chat-0001", "kind": "chat", "message": "What causes migraines?",
+     "history": [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]}
+
+Requests run at a fixed concurrency through the same code as the pages: rule
+scoring, PHI sanitization, the medication matcher, prompt/context building
+and the LLM gateway (retries, fallback, stream redaction). The response cache
+is bypassed and chat summaries are extractive, so only the pipeline is
+measured. The report gives throughput, p50/p95/p99 per stage and error rates
+by class; `--budget` and `--max-error-rate` turn it into a release gate (exit
+status 1 when a budget is missed).
+
+With `--stub` the run is fully offline against `loadtest.stub_server`.
+
+Usage:
+    python -m loadtest.harness --generate 500 --stub --concurrency 16
+    python -m loadtest.harness corpus.jsonl --stub --stub-ttft 0.4 \\
+        --budget total:p95=4 --budget llm_ttft:p99=1.5 --max-error-rate 0.01
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from catalogue import get_catalogue
+from llm import (analysis_messages, chat_system_prompt, get_chat_context, get_gateway, get_router,
+                 medication_context)
+from medical_data import SAMPLE_DRUGS
+from privacy import sanitize_text
+from rules import RulesLoadError, detect_critical, load_rules, rank_conditions, severity_label
+
+from .stub_server import StubServer, StubServerError
+
+KINDS = ("symptom", "chat")
+PAGES = {"symptom": "Symptom Checker", "chat": "AI Chat"}
+STAGES = ("score", "sanitize", "medications", "prompt", "llm_ttft", "llm_total", "total")
+
+_QUESTIONS = [
+    "What causes {s}?",
+    "How long does {s} usually last?",
+    "Is it safe to take {d} for {s}?",
+    "Can {d} interact with other medications I take?",
+    "When should I see a doctor about {s}?",
+    "What home remedies help with {s}?",
+]
+_DETAILS = [
+    "", "Started two days ago.", "Getting worse at night, taking {d}.",
+    "Email me at jane.doe@example.com", "Call 555-201-7788 if needed, I take {d} daily.",
+    "Born March 3, 1980. Symptoms since Monday.",
+]
+
+
+class HarnessError(Exception):
+    pass
+
+
+def read_corpus(path: str) -> List[Dict]:
+    corpus = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                req = json.loads(line)
+                if req.get("kind") not in KINDS:
+                    raise HarnessError(f"{path}:{n}: kind must be one of {KINDS}")
+                corpus.append(req)
+    except (OSError, ValueError) as e:
+        raise HarnessError(f"Cannot read corpus {path}: {e}")
+    return corpus
+
+
+def make_corpus(size: int, rules: Dict[str, Dict[str, int]], chat_share: float = 0.5,
+                seed: int = 0) -> List[Dict]:
+    """Synthetic mix of symptom analyses and chat turns, some with PHI and drugs."""
+    rng = random.Random(seed)
+    symptoms = sorted(rules) or ["fever", "cough", "headache"]
+    drugs = [d["name"] for d in SAMPLE_DRUGS] or ["ibuprofen"]
+    corpus = []
+    for i in range(size):
+        s, d = rng.choice(symptoms), rng.choice(drugs)
+        if rng.random() < chat_share:
+            history = []
+            for _ in range(rng.choice([0, 0, 1, 3, 8])):
+                history += [{"role": "user", "content": rng.choice(_QUESTIONS).format(s=rng.choice(symptoms), d=d)},
+                            {"role": "assistant", "content": "It depends on the cause. " * rng.randint(5, 40)}]
+            corpus.append({"request_id": f"chat-{i:05d}", "kind": "chat",
+                           "message": rng.choice(_QUESTIONS).format(s=s, d=d), "history": history})
+        else:
+            corpus.append({"request_id": f"sym-{i:05d}", "kind": "symptom",
+                           "symptoms": rng.sample(symptoms, min(len(symptoms), rng.randint(1, 4))),
+                           "severity": rng.randint(1, 10), "details": rng.choice(_DETAILS).format(d=d)})
+    return corpus
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, `q` in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100.0 * len(ordered)) - 1))]
+
+
+class Recorder:
+    """Thread-safe per-stage timings and error counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, Dict[str, List[float]]] = {kind: {} for kind in KINDS}
+        self.errors: Counter = Counter()
+        self.requests: Counter = Counter()
+        self.failed: Counter = Counter()
+
+    def record(self, kind: str, stages: Dict[str, float], error: Optional[str]) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+            for stage, seconds in stages.items():
+                self.timings[kind].setdefault(stage, []).append(seconds)
+            if error:
+                self.errors[error] += 1
+                self.failed[kind] += 1
+
+
+def run_request(req: Dict, client_config: Dict, rules: Dict[str, Dict[str, int]]) -> Tuple[Dict[str, float], Optional[str]]:
+    """Run one request through the pipeline; returns (stage seconds, error class or None)."""
+    stages: Dict[str, float] = {}
+    start = t = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal t
+        now = time.perf_counter()
+        stages[stage] = now - t
+        t = now
+
+    catalogue = get_catalogue()
+    if req["kind"] == "symptom":
+        selected = [s.lower().strip() for s in req.get("symptoms", [])]
+        severity = int(req.get("severity", 3))
+        ranked, _ = rank_conditions(selected, rules)
+        detect_critical(ranked, severity)
+        lap("score")
+        details, _ = sanitize_text(req.get("details", ""))
+        lap("sanitize")
+        med_context = medication_context(catalogue.medication_report(details, [c for c, _ in ranked[:3]]))
+        lap("medications")
+        messages = analysis_messages(selected, severity, severity_label(severity), details, ranked, med_context)
+        lap("prompt")
+    else:
+        message, _ = sanitize_text(req.get("message", ""))
+        lap("sanitize")
+        med_context = medication_context(catalogue.medication_report(message))
+        lap("medications")
+        history = list(req.get("history", [])) + [{"role": "user", "content": message}]
+        messages = get_chat_context().build(chat_system_prompt(med_context), history, {})
+        lap("prompt")
+
+    status: Dict = {}
+    error = None
+    first = None
+    try:
+        for _ in get_gateway().stream_sync(messages, client_config, status=status, page=PAGES[req["kind"]]):
+            if first is None:
+                first = time.perf_counter()
+    except Exception as e:
+        error = type(e).__name__
+    end = time.perf_counter()
+    if first is not None:
+        stages["llm_ttft"] = first - t
+    stages["llm_total"] = end - t
+    stages["total"] = end - start
+    if error is None and not status.get("ok"):
+        error = status.get("error") or "NotOk"
+    return stages, error
+
+
+def summarize(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    out = {}
+    for stage in STAGES:
+        values = timings.get(stage)
+        if values:
+            out[stage] = {"count": len(values), "mean": sum(values) / len(values),
+                          "p50": percentile(values, 50), "p95": percentile(values, 95),
+                          "p99": percentile(values, 99)}
+    return out
+
+
+def run(corpus: List[Dict], client_config: Dict, concurrency: int = 8,
+        rules: Optional[Dict[str, Dict[str, int]]] = None, progress=None) -> Dict:
+    """Replay `corpus` with `concurrency` requests in flight; returns the report."""
+    if concurrency < 1:
+        raise HarnessError("Concurrency must be at least 1")
+    rules = rules if rules is not None else load_rules()
+    recorder = Recorder()
+    get_catalogue()  # build indexes before the clock starts
+    started = time.perf_counter()
+
+    def one(req):
+        try:
+            stages, error = run_request(req, client_config, rules)
+        except Exception as e:
+            stages, error = {}, type(e).__name__
+        recorder.record(req["kind"], stages, error)
+        if progress:
+            progress(sum(recorder.requests.values()))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest") as pool:
+        list(pool.map(one, corpus))
+    seconds = time.perf_counter() - started
+
+    combined: Dict[str, List[float]] = {}
+    for per_kind in recorder.timings.values():
+        for stage, values in per_kind.items():
+            combined.setdefault(stage, []).extend(values)
+    total = sum(recorder.requests.values())
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "throughput": total / seconds if seconds else 0.0,
+        "error_rate": sum(recorder.failed.values()) / total if total else 0.0,
+        "errors": dict(recorder.errors),
+        "stages": summarize(combined),
+        "kinds": {kind: {"requests": recorder.requests[kind],
+                         "error_rate": recorder.failed[kind] / recorder.requests[kind] if recorder.requests[kind] else 0.0,
+                         "stages": summarize(recorder.timings[kind])}
+                  for kind in KINDS if recorder.requests[kind]},
+        "gateway": get_gateway().metrics(),
+        "models": get_router().snapshot(),
+    }
+
+
+def parse_budget(spec: str) -> Tuple[str, Optional[str], str, float]:
+    """"[kind.]stage:pXX=seconds" -> (stage, kind or None, "pXX", seconds)."""
+    try:
+        target, limit = spec.split("=")
+        name, stat = target.split(":")
+        kind, _, stage = name.rpartition(".")
+        seconds = float(limit)
+    except ValueError:
+        raise HarnessError(f"Invalid budget '{spec}', expected e.g. total:p95=3 or chat.llm_ttft:p99=1.5")
+    if stage not in STAGES or stat not in ("p50", "p95", "p99", "mean") or (kind and kind not in KINDS):
+        raise HarnessError(f"Invalid budget '{spec}': stages are {', '.join(STAGES)}; stats p50/p95/p99/mean")
+    return stage, kind or None, stat, seconds
+
+
+def check_budgets(report: Dict, budgets: List[str], max_error_rate: Optional[float] = None) -> List[str]:
+    """Human-readable list of missed budgets (empty when the run passes)."""
+    missed = []
+    for spec in budgets:
+        stage, kind, stat, limit = parse_budget(spec)
+        stages = report["kinds"].get(kind, {}).get("stages", {}) if kind else report["stages"]
+        value = stages.get(stage, {}).get(stat)
+        if value is not None and value > limit:
+            missed.append(f"{spec}: measured {value:.3f}s")
+    if max_error_rate is not None and report["error_rate"] > max_error_rate:
+        missed.append(f"error rate {report['error_rate']:.2%} > {max_error_rate:.2%}")
+    return missed
+
+
+def print_report(report: Dict) -> None:
+    print(f"{report['requests']} requests in {report['seconds']:.2f}s at concurrency {report['concurrency']}: "
+          f"{report['throughput']:.1f} req/s, error rate {report['error_rate']:.2%}")
+    for label, stages in [("all", report["stages"])] + [(k, v["stages"]) for k, v in report["kinds"].items()]:
+        print(f"\n  {label:<12} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for stage, s in stages.items():
+            print(f"  {stage:<12} {s['count']:>6} {s['p50'] * 1000:>7.1f}ms {s['p95'] * 1000:>7.1f}ms {s['p99'] * 1000:>7.1f}ms")
+    if report["errors"]:
+        print("\n  errors: " + ", ".join(f"{k}={v}" for k, v in sorted(report["errors"].items())))
+    g = report["gateway"]
+    print(f"  gateway: {g['upstream_calls']} upstream streams, {g['coalesced']} coalesced requests")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a request corpus through the MediGuideAI pipeline")
+    parser.add_argument("corpus", nargs="?", help="JSONL corpus (see module docs)")
+    parser.add_argument("--generate", type=int, help="use N synthetic requests instead of a corpus")
+    parser.add_argument("--save-corpus", help="write the generated corpus to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-url", default=os.getenv("MEDIGUIDE_LLM_BASE_URL", ""),
+                        help="OpenAI-compatible endpoint (ignored with --stub)")
+    parser.add_argument("--models", nargs="+", default=["stub/default"], help="model list, primary first")
+    parser.add_argument("--stub", action="store_true", help="run against an in-process loadtest.stub_server")
+    parser.add_argument("--stub-ttft", type=float, default=0.3)
+    parser.add_argument("--stub-tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--budget", action="append", default=[], metavar="[KIND.]STAGE:STAT=SECONDS",
+                        help="latency budget, e.g. total:p95=3 (repeatable)")
+    parser.add_argument("--max-error-rate", type=float, help="fail when the error rate is above this")
+    parser.add_argument("--json", help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    server = None
+    try:
+        for spec in args.budget:
+            parse_budget(spec)
+        rules = load_rules()
+        if args.generate:
+            corpus = make_corpus(args.generate, rules, seed=args.seed)
+            if args.save_corpus:
+                with open(args.save_corpus, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(r) + "\n" for r in corpus)
+        elif args.corpus:
+            corpus = read_corpus(args.corpus)
+        else:
+            raise HarnessError("Give a corpus file or --generate N")
+        if args.stub:
+            server = StubServer(port=0, ttft=args.stub_ttft, tokens_per_sec=args.stub_tokens_per_sec,
+                                error_rate=args.stub_error_rate, seed=args.seed)
+            base_url = server.start()
+        elif args.base_url:
+            base_url = args.base_url
+        else:
+            raise HarnessError("Give --stub or --base-url (refusing to load-test the real OpenRouter by default)")
+        client_config = {"api_key": os.getenv("OPENROUTER_API_KEY", "") or "stub", "base_url": base_url,
+                         "model": args.models[0], "models": args.models, "headers": {}}
+
+        def progress(done):
+            if done % 100 == 0:
+                print(f"... {done}/{len(corpus)} requests", file=sys.stderr)
+
+        report = run(corpus, client_config, args.concurrency, rules, progress)
+        missed = check_budgets(report, args.budget, args.max_error_rate)
+    except (HarnessError, RulesLoadError, StubServerError) as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    finally:
+        if server:
+            server.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if missed:
+        print("\nBudgets missed:\n  " + "\n  ".join(missed))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# loadtest/stub_server.py
+"""
+Local OpenAI/OpenRouter-compatible stand-in for offline load testing.
+
+Serves `POST /v1/chat/completions` (streamed as server-sent events, or as one
+JSON body) and `GET /v1/models` with deterministic answers: the same messages
+always produce the same text, so runs are comparable. Latency and failures
+are configurable:
+
+  --ttft             seconds before the first token
+  --tokens-per-sec   streaming speed after the first token
+  --error-rate       fraction of requests answered with --error-status (5xx)
+  --rate-limit       requests per second per API key (429 with Retry-After
+                     beyond it; --burst sets the bucket size)
+  --fail-models      models that always answer 503, to exercise fallback
+
+`GET /stats` reports requests, errors, rate-limited requests and tokens sent.
+Point the app at it with:
+
+    OPENROUTER_API_KEY=stub MEDIGUIDE_LLM_BASE_URL=http://127.0.0.1:8765/v1 streamlit run app.py
+
+Usage:
+    python -m loadtest.stub_server --port 8765 --ttft 0.4 --tokens-per-sec 60
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+_SENTENCES = [
+    "Based on the symptoms described, several common conditions could be considered.",
+    "Mild cases often improve with rest, fluids and over-the-counter pain relief.",
+    "Keep track of when the symptoms started and whether they are getting worse.",
+    "A high or persistent fever deserves a prompt medical review.",
+    "Stay hydrated and avoid known triggers such as poor sleep or skipped meals.",
+    "Seek urgent care if you notice chest pain, difficulty breathing or confusion.",
+    "Your doctor may suggest blood tests or imaging to confirm the cause.",
+    "Medication should only be taken as directed on the label or by a pharmacist.",
+    "Lifestyle changes like regular exercise and a balanced diet can help prevention.",
+    "Please consult a qualified healthcare professional for a proper diagnosis.",
+]
+
+
+class StubServerError(Exception):
+    pass
+
+
+def stub_reply(messages: List[Dict], max_tokens: int, length: int) -> List[str]:
+    """Deterministic answer for `messages` as a list of word tokens."""
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).digest()
+    rng = random.Random(digest)
+    words: List[str] = []
+    while len(words) < min(length, max_tokens):
+        words.extend(rng.choice(_SENTENCES).split(" "))
+    words = words[:min(length, max_tokens)]
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """0 when a request may go now, else seconds until it may."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class StubServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, ttft: float = 0.3,
+                 tokens_per_sec: float = 50.0, response_tokens: int = 120, error_rate: float = 0.0,
+                 error_status: int = 500, rate_limit: float = 0.0, burst: int = 5,
+                 fail_models: Sequence[str] = (), seed: int = 0):
+        if tokens_per_sec <= 0 or not 0 <= error_rate <= 1 or error_status < 500:
+            raise StubServerError("tokens_per_sec must be positive, error_rate in [0, 1], error_status 5xx")
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.burst = max(1, burst)
+        self.fail_models = set(fail_models)
+        self._rng = random.Random(seed)
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "streams": 0, "errors": 0, "rate_limited": 0, "tokens": 0, "active": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += n
+
+    def _admit(self, api_key: str, model: str) -> Optional[tuple]:
+        """None to serve the request, else (status, message, retry_after)."""
+        with self._lock:
+            if self.rate_limit > 0:
+                bucket = self._buckets.setdefault(api_key, _TokenBucket(self.rate_limit, self.burst))
+                wait = bucket.take()
+                if wait:
+                    self.stats["rate_limited"] += 1
+                    return 429, "Rate limit exceeded", wait
+            if model in self.fail_models:
+                self.stats["errors"] += 1
+                return 503, f"Model {model} is unavailable", None
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return self.error_status, "Injected upstream error", None
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _json(self, status: int, body: Dict, headers: Optional[Dict] = None) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _chunk(self, data: bytes) -> None:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    models = sorted(server.fail_models | {"stub/default"})
+                    self._json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in models]})
+                elif self.path.rstrip("/").endswith("/stats"):
+                    with server._lock:
+                        self._json(200, dict(server.stats))
+                else:
+                    self._json(404, {"error": {"message": "Not found", "code": 404}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._json(404, {"error": {"message": "Not found", "code": 404}})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    messages = body["messages"]
+                except (ValueError, KeyError) as e:
+                    self._json(400, {"error": {"message": f"Invalid request: {e}", "code": 400}})
+                    return
+                server._count("requests")
+                model = body.get("model", "stub/default")
+                api_key = self.headers.get("Authorization", "")
+                rejected = server._admit(api_key, model)
+                if rejected:
+                    status, message, retry_after = rejected
+                    headers = {"Retry-After": f"{retry_after:.2f}"} if retry_after else None
+                    self._json(status, {"error": {"message": message, "code": status}}, headers)
+                    return
+
+                max_tokens = int(body.get("max_tokens") or server.response_tokens)
+                words = stub_reply(messages, max_tokens, server.response_tokens)
+                finish = "length" if len(words) >= max_tokens else "stop"
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+                created = int(time.time())
+                usage = {"prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in messages),
+                         "completion_tokens": len(words)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                server._count("active")
+                try:
+                    time.sleep(server.ttft)
+                    if not body.get("stream"):
+                        self._json(200, {
+                            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                            "choices": [{"index": 0, "finish_reason": finish,
+                                         "message": {"role": "assistant", "content": "".join(words)}}],
+                            "usage": usage,
+                        })
+                        server._count("tokens", len(words))
+                        return
+                    self._stream(words, finish, completion_id, created, model, usage, body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    server._count("active", -1)
+
+            def _stream(self, words, finish, completion_id, created, model, usage, body) -> None:
+                server._count("streams")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(delta: Dict, finish_reason=None, extra: Optional[Dict] = None) -> None:
+                    payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                               "model": model,
+                               "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                    payload.update(extra or {})
+                    self._chunk(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+
+                interval = 1.0 / server.tokens_per_sec
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(interval)
+                    event({"role": "assistant", "content": word} if i == 0 else {"content": word})
+                    server._count("tokens")
+                include_usage = (body.get("stream_options") or {}).get("include_usage")
+                event({}, finish, {"usage": usage} if include_usage else None)
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+        return Handler
+
+    def start(self) -> str:
+        """Serve on a background thread; returns the base URL."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve an OpenRouter-compatible stand-in for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=120, help="tokens per answer (max_tokens permitting)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/s per API key (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--fail-models", nargs="+", default=[], help="models that always answer 503")
+    parser.add_argument("--seed", type=int, default=0, help="seed for error injection")
+    args = parser.parse_args(argv)
+
+    try:
+        server = StubServer(args.host, args.port, args.ttft, args.tokens_per_sec, args.response_tokens,
+                            args.error_rate, args.error_status, args.rate_limit, args.burst,
+                            args.fail_models, args.seed)
+    except (StubServerError, OSError) as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    print(f"Stub OpenRouter listening on {server.base_url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -465,4 +465,211 @@ SAMPLE_DRUGS = [
         "major_interactions": "Strong CYP3A4 inhibitors (Ketoconazole) increase systemic exposure",
         "contraindications": "Status asthmaticus (acute episodes)"
     }
-]
\ No newline at end of file
+]
+
+# Alternative names used in interaction text and by users: generic synonyms and
+# common brand names (canonical name -> aliases)
+DRUG_ALIASES = {
+    "Acetylsalicylic acid": ["Aspirin", "ASA", "Disprin", "Ecotrin"],
+    "Adrenaline": ["Epinephrine", "EpiPen"],
+    "Lignocaine": ["Lidocaine", "Xylocaine"],
+    "Paracetamol": ["Acetaminophen", "Tylenol", "Panadol", "Calpol", "Crocin"],
+    "Glyceryl trinitrate": ["Nitroglycerin", "GTN"],
+    "Salbutamol": ["Albuterol", "Ventolin", "Asthalin"],
+    "Ferrous salts": ["Iron", "Ferrous sulfate"],
+    "Insulin (Soluble)": ["Insulin", "Regular insulin", "Actrapid", "Humulin R"],
+    "Sodium valproate": ["Valproate", "Valproic acid", "Depakote", "Epilim"],
+    "Acyclovir": ["Aciclovir", "Zovirax"],
+    "Furosemide": ["Frusemide", "Lasix"],
+    "Diclofenac": ["Voltaren", "Voveran"],
+    "Morphine": ["MS Contin"],
+    "Allopurinol": ["Zyloprim"],
+    "Cetirizine": ["Zyrtec"],
+    "Dexamethasone": ["Decadron"],
+    "Carbamazepine": ["Tegretol"],
+    "Diazepam": ["Valium"],
+    "Amoxicillin": ["Amoxil", "Mox"],
+    "Ceftriaxone": ["Rocephin"],
+    "Azithromycin": ["Zithromax", "Azithral"],
+    "Ciprofloxacin": ["Cipro", "Ciplox"],
+    "Metronidazole": ["Flagyl"],
+    "Fluconazole": ["Diflucan"],
+    "Amlodipine": ["Norvasc"],
+    "Atenolol": ["Tenormin"],
+    "Enalapril": ["Vasotec"],
+    "Atorvastatin": ["Lipitor"],
+    "Digoxin": ["Lanoxin"],
+    "Clotrimazole": ["Canesten"],
+    "Omeprazole": ["Prilosec", "Omez"],
+    "Ranitidine": ["Zantac"],
+    "Domperidone": ["Motilium"],
+    "Prednisolone": ["Omnacortil"],
+    "Metformin": ["Glucophage"],
+    "Levothyroxine": ["Synthroid", "Eltroxin", "Thyronorm"],
+    "Haloperidol": ["Haldol"],
+    "Amitriptyline": ["Elavil"],
+    "Fluoxetine": ["Prozac"],
+    "Budesonide": ["Pulmicort"],
+}
+
+# Drug classes named in `major_interactions`. A catalogue drug belongs to a group
+# when its `class` contains one of `classes`, its side effects mention one of
+# `side_effects`, or it is listed in `members` (which may name non-catalogue drugs).
+INTERACTION_GROUPS = {
+    "CNS depressants": {
+        "aliases": ["CNS depressant", "Sedatives"],
+        "classes": ["General Anesthetic", "Benzodiazepine", "Opioid", "Antihistamine", "Antipsychotic"],
+        "members": ["Alcohol"],
+    },
+    "QT prolonging drugs": {
+        "aliases": ["QT prolonging drug", "QT prolonging agents"],
+        "side_effects": ["QT prolongation"],
+        "members": ["Azithromycin", "Fluconazole", "Chloroquine", "Amitriptyline", "Fluoxetine", "Erythromycin", "Ketoconazole"],
+    },
+    "CYP3A4 inhibitors": {
+        "aliases": ["CYP3A4 inhibitor"],
+        "members": ["Fluconazole", "Ketoconazole", "Erythromycin", "Clarithromycin"],
+    },
+    "CYP3A4 inducers": {
+        "aliases": ["CYP3A4 inducer", "CYP inducers"],
+        "members": ["Carbamazepine", "Rifampicin", "Phenytoin"],
+    },
+    "NSAIDs": {
+        "aliases": ["NSAID"],
+        "classes": ["NSAID"],
+        "members": ["Acetylsalicylic acid", "Ibuprofen"],
+    },
+    "Benzodiazepines": {"aliases": ["Benzodiazepine"], "classes": ["Benzodiazepine"]},
+    "Opioids": {"aliases": ["Opioid"], "classes": ["Opioid"]},
+    "Beta-blockers": {"aliases": ["Beta blockers", "Beta-blocker"], "classes": ["Beta-blocker"]},
+    "Steroids": {"aliases": ["Corticosteroids", "Corticosteroid"], "classes": ["Corticosteroid"]},
+    "ACE inhibitors": {"aliases": ["ACE inhibitor"], "classes": ["ACE Inhibitor"]},
+    "TCAs": {"aliases": ["Tricyclic antidepressants", "TCA"], "classes": ["TCA"]},
+    "SSRIs": {"aliases": ["SSRI"], "classes": ["SSRI"]},
+    "Antihistamines": {"aliases": ["Antihistamine"], "classes": ["Antihistamine"]},
+    "Antipsychotics": {"aliases": ["Antipsychotic"], "classes": ["Antipsychotic"]},
+    "Anticholinergics": {"aliases": ["Anticholinergic"], "classes": ["Anticholinergic", "TCA"]},
+    "Diuretics": {"aliases": ["Diuretic"], "classes": ["Diuretic"]},
+    "Antidiabetics": {"aliases": ["Antidiabetic"], "classes": ["Antidiabetic"]},
+    "Macrolides": {"aliases": ["Macrolide"], "classes": ["Macrolide"]},
+    "Antifungals": {"aliases": ["Antifungal"], "classes": ["Antifungal"]},
+    "Thyroid hormones": {"aliases": ["Thyroid hormone"], "classes": ["Thyroid Hormone"]},
+    "Tetracyclines": {"aliases": ["Tetracycline"], "members": ["Doxycycline", "Tetracycline"]},
+    "MAOIs": {"aliases": ["MAOI"], "members": ["Phenelzine", "Selegiline"]},
+    "Antacids": {"aliases": ["Antacid"], "members": ["Aluminium hydroxide", "Magnesium hydroxide"]},
+    "Oral contraceptives": {"aliases": ["OCPs", "OCP", "Oral contraceptive"]},
+    "Nephrotoxic drugs": {"aliases": ["Nephrotoxic drug"], "members": ["Acyclovir"]},
+    "Aminoglycosides": {"aliases": ["Aminoglycoside"], "members": ["Gentamicin", "Amikacin"]},
+    "Potassium supplements": {"aliases": ["Potassium supplement", "sparing diuretics"], "members": ["Potassium chloride", "Spironolactone"]},
+}
+
+# Wording used in drug indications/contraindications for rules.json conditions
+CONDITION_SYNONYMS = {
+    "Hypertension": ["high blood pressure"],
+    "High Blood Pressure": ["hypertension"],
+    "Hypotension": ["low blood pressure"],
+    "Myocardial Infarction": ["MI", "heart attack"],
+    "Heart Attack": ["MI", "myocardial infarction"],
+    "Heart Arrhythmia": ["arrhythmia", "arrhythmias", "ventricular arrhythmias"],
+    "Urinary Tract Infection": ["UTI"],
+    "UTI": ["urinary tract infection"],
+    "Kidney Disease": ["renal impairment", "renal disease", "renal failure"],
+    "Liver Disease": ["hepatic disease", "liver impairment", "hepatic impairment", "liver failure"],
+    "Peptic Ulcer": ["peptic ulcer disease", "gastric ulcers", "active peptic ulcer"],
+    "GERD": ["heartburn", "reflux"],
+    "Stroke": ["ischemic stroke"],
+    "Diabetes": ["diabetes mellitus"],
+    "Iron Deficiency": ["iron deficiency anaemia", "iron deficiency anemia"],
+    "Anemia": ["anaemia", "severe anemia"],
+    "Herpes Simplex": ["herpes"],
+    "Fungal Infection": ["fungal skin infections", "candidiasis", "tinea"],
+    "Yeast Infection": ["candidiasis", "thrush"],
+    "Allergic Reaction": ["allergy", "allergic conditions"],
+    "Deep Vein Thrombosis": ["DVT"],
+    "Pulmonary Embolism": ["PE"],
+    "Anxiety": ["panic disorder"],
+    "Seizure": ["seizures", "status epilepticus"],
+}
+
+# Concept vocabulary for the side-effect and contraindication facets
+# (concept -> wordings used in `common_side_effects` / `contraindications`)
+FIELD_VOCABULARY = {
+    "side_effect": {
+        "QT prolongation": ["QT interval prolongation", "QT issues"],
+        "Arrhythmia": ["arrhythmias"],
+        "Tachycardia": ["increased heart rate"],
+        "Bradycardia": [],
+        "Palpitations": [],
+        "Hypotension": ["low blood pressure", "orthostatic hypotension"],
+        "Hypertension": ["increased blood pressure", "high blood pressure"],
+        "Cardiovascular events": ["MI/stroke risk"],
+        "Bleeding": ["GI bleeding", "hemorrhage"],
+        "GI ulcers": ["GI ulcer", "peptic ulcer"],
+        "GI upset": ["GI disturbance", "GI irritation"],
+        "Nausea": [],
+        "Vomiting": [],
+        "Diarrhea": [],
+        "Constipation": [],
+        "Abdominal pain": ["abdominal cramps"],
+        "Headache": [],
+        "Cough": ["dry cough"],
+        "Dizziness": [],
+        "Sedation": ["drowsiness"],
+        "Insomnia": [],
+        "Respiratory depression": ["apnea", "stopped breathing"],
+        "Bronchospasm": [],
+        "Seizures": ["seizure"],
+        "Tremor": [],
+        "Hepatotoxicity": ["liver damage", "liver toxicity", "hepatitis", "liver enzyme elevation"],
+        "Renal impairment": ["renal toxicity", "nephrotoxicity"],
+        "Rash": ["skin rash"],
+        "Severe skin reactions": ["SJS", "TEN", "Stevens-Johnson syndrome"],
+        "Injection site reactions": ["injection site pain"],
+        "Burning": ["burning sensation"],
+        "Dry mouth": [],
+        "Blurred vision": [],
+        "Visual disturbances": ["retinopathy", "halos"],
+        "Tinnitus": [],
+        "Hypoglycemia": [],
+        "Hyperglycemia": [],
+        "Hypokalemia": [],
+        "Hyperkalemia": [],
+        "Hyponatremia": [],
+        "Weight gain": [],
+        "Fluid retention": ["peripheral edema", "swelling ankles"],
+        "Dehydration": [],
+        "Fatigue": [],
+        "Anxiety": [],
+        "Thrombocytopenia": [],
+        "Dependence": [],
+        "Gout": ["gout flares"],
+    },
+    "contraindication": {
+        "Pregnancy": ["first trimester of pregnancy", "pregnancy near term"],
+        "Breastfeeding": ["lactation"],
+        "Children": ["children <16 yrs", "neonates", "premature infants"],
+        "Hypersensitivity": ["allergy"],
+        "Egg or soy allergy": ["eggs", "egg products", "soybeans", "soy products"],
+        "Liver disease": ["liver impairment", "liver failure", "hepatic impairment", "jaundice", "cholestatic jaundice"],
+        "Renal impairment": ["renal failure", "end-stage renal disease", "anuria"],
+        "Heart failure": [],
+        "Heart block": ["AV block", "second/third-degree heart block"],
+        "Arrhythmia": ["arrhythmias", "ventricular fibrillation"],
+        "QT prolongation": ["QT issues"],
+        "Ischemic heart disease": ["recent MI", "cardiac disease"],
+        "Hypotension": ["cardiogenic shock"],
+        "Hypertension": [],
+        "Stroke": [],
+        "Bleeding": ["active bleeding", "bleeding disorders", "GI bleeding", "GI hemorrhage"],
+        "Peptic ulcer": ["active peptic ulcer"],
+        "Asthma": ["status asthmaticus"],
+        "Respiratory depression": ["respiratory insufficiency", "sleep apnea"],
+        "Raised intracranial pressure": [],
+        "Myasthenia gravis": [],
+        "Glaucoma": [],
+        "Systemic fungal infections": [],
+        "MAOIs": ["use with MAOIs"],
+        "Hypoglycemia": [],
+        "Bone marrow depression": [],
+    },
+}
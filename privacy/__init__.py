@@ -0,0 +1,11 @@
+"""
+Privacy package for MediGuideAI
+"""
+
+from .redactor import (Redactor, Span, REDACTION_TYPES, get_redactor, placeholder,
+                       sanitize_text)
+from .stream import StreamRedactor, redact_stream
+from .dictionary import DictionaryError, DictionaryRedactor, load_dictionary
+
+__all__ = ['Redactor', 'Span', 'REDACTION_TYPES', 'get_redactor', 'placeholder', 'sanitize_text',
+           'StreamRedactor', 'redact_stream', 'DictionaryError', 'DictionaryRedactor', 'load_dictionary']
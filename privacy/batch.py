@@ -0,0 +1,194 @@
+# privacy/batch.py
+"""
+Parallel batch redaction of transcript and note exports.
+
+Streams a JSONL (or plain text) file in blocks of lines, redacts each block
+in a process pool and writes the blocks back in input order. In JSONL every
+string value is redacted, however deeply nested (chat transcripts keep their
+`messages[].content` shape), or only the top-level `--fields` given; keys and
+non-string values are left alone. A line that is not valid JSON is redacted
+as plain text rather than copied through.
+
+At most `2 * workers` blocks are in flight, so memory is bounded by the
+block size, not the size of the input.
+
+Usage:
+    python -m privacy.batch transcripts.jsonl -o transcripts.redacted.jsonl
+    python -m privacy.batch notes.jsonl -o clean.jsonl --fields notes extra --workers 8
+    python -m privacy.batch app.log -o app.redacted.log --format text
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .redactor import REDACTION_TYPES, apply_spans, get_redactor
+
+BLOCK_BYTES = 1 << 20
+PROGRESS_EVERY = 64  # blocks
+
+
+class BatchError(Exception):
+    pass
+
+
+def _redact_value(value: Any, counts: Dict[str, int]) -> Any:
+    if isinstance(value, str):
+        spans = get_redactor().find(value)
+        for span in spans:
+            counts[span.type] = counts.get(span.type, 0) + 1
+        return apply_spans(value, spans)
+    if isinstance(value, list):
+        return [_redact_value(v, counts) for v in value]
+    if isinstance(value, dict):
+        return {k: _redact_value(v, counts) for k, v in value.items()}
+    return value
+
+
+def redact_record(record: Any, fields: Optional[Sequence[str]] = None,
+                  counts: Optional[Dict[str, int]] = None) -> Any:
+    """`record` with PHI masked in every string, or only in the top-level `fields`."""
+    counts = {} if counts is None else counts
+    if fields and isinstance(record, dict):
+        return {k: _redact_value(v, counts) if k in fields else v for k, v in record.items()}
+    return _redact_value(record, counts)
+
+
+def redact_block(lines: List[bytes], fmt: str = "jsonl",
+                 fields: Optional[Sequence[str]] = None) -> Tuple[bytes, Dict[str, int], int]:
+    """Redact one block of raw lines; returns (output bytes, counts by type, invalid JSON lines)."""
+    counts: Dict[str, int] = {}
+    invalid = 0
+    out = []
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace")
+        body = line.rstrip("\r\n")
+        newline = line[len(body):]
+        if fmt == "jsonl" and body.strip():
+            try:
+                record = json.loads(body)
+            except ValueError:
+                invalid += 1
+            else:
+                out.append(json.dumps(redact_record(record, fields, counts), ensure_ascii=False) + newline)
+                continue
+        out.append(_redact_value(body, counts) + newline)
+    return "".join(out).encode("utf-8"), counts, invalid
+
+
+def iter_blocks(fb, block_bytes: int = BLOCK_BYTES) -> Iterator[List[bytes]]:
+    """Group the lines of a binary file into blocks of about `block_bytes`."""
+    block, size = [], 0
+    for raw in fb:
+        block.append(raw)
+        size += len(raw)
+        if size >= block_bytes:
+            yield block
+            block, size = [], 0
+    if block:
+        yield block
+
+
+class _InProcess(Executor):
+    """Runs submitted work immediately; used for --workers 1."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def redact_file(source: str, output: str, fmt: Optional[str] = None,
+                fields: Optional[Sequence[str]] = None, workers: Optional[int] = None,
+                block_bytes: int = BLOCK_BYTES, progress=None) -> Dict:
+    """Redact `source` into `output` and return run statistics."""
+    src = Path(source)
+    if not src.exists():
+        raise BatchError(f"Input file not found at {src.resolve()}")
+    fmt = (fmt or ("jsonl" if src.suffix.lower() in (".jsonl", ".json") else "text")).lower()
+    if fmt not in ("jsonl", "text"):
+        raise BatchError(f"Unsupported format '{fmt}' (expected jsonl or text)")
+    if src.resolve() == Path(output).resolve():
+        raise BatchError("Output must not overwrite the input")
+    workers = max(1, workers or os.cpu_count() or 1)
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+
+    stats: Dict[str, Any] = {"lines": 0, "blocks": 0, "invalid_json": 0, "bytes": 0,
+                             "counts": {kind: 0 for kind in REDACTION_TYPES}, "seconds": 0.0}
+    started = time.perf_counter()
+
+    def collect(future, n_lines, n_bytes, fout):
+        data, counts, invalid = future.result()
+        fout.write(data)
+        stats["lines"] += n_lines
+        stats["bytes"] += n_bytes
+        stats["blocks"] += 1
+        stats["invalid_json"] += invalid
+        for kind, n in counts.items():
+            stats["counts"][kind] = stats["counts"].get(kind, 0) + n
+        if progress and stats["blocks"] % PROGRESS_EVERY == 0:
+            stats["seconds"] = time.perf_counter() - started
+            progress(_throughput(stats))
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InProcess()
+    with pool, src.open("rb") as fb, open(output, "wb") as fout:
+        pending = deque()
+        for block in iter_blocks(fb, block_bytes):
+            pending.append((pool.submit(redact_block, block, fmt, fields),
+                            len(block), sum(len(raw) for raw in block)))
+            # ordered output with a bounded number of blocks in flight
+            while len(pending) >= 2 * workers:
+                collect(*pending.popleft(), fout)
+        while pending:
+            collect(*pending.popleft(), fout)
+    stats["seconds"] = time.perf_counter() - started
+    return _throughput(stats)
+
+
+def _throughput(stats: Dict) -> Dict:
+    secs = max(stats["seconds"], 1e-9)
+    stats["lines_per_sec"] = round(stats["lines"] / secs, 1)
+    stats["mb_per_sec"] = round(stats["bytes"] / secs / 1e6, 2)
+    stats["redactions"] = sum(stats["counts"].values())
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Redact PHI from JSONL or text exports in parallel")
+    parser.add_argument("source", help="input .jsonl (or text) file")
+    parser.add_argument("-o", "--output", required=True, help="file to write the redacted copy to")
+    parser.add_argument("--format", choices=["jsonl", "text"], help="override format detection")
+    parser.add_argument("--fields", nargs="+", help="only redact these top-level JSON fields")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--block-mb", type=float, default=BLOCK_BYTES / 1e6, help="lines per task, in MB")
+    args = parser.parse_args(argv)
+
+    def report(s):
+        print(f"... {s['lines']} lines, {s['redactions']} redactions, {s['mb_per_sec']} MB/s", file=sys.stderr)
+
+    try:
+        stats = redact_file(args.source, args.output, args.format, args.fields, args.workers,
+                            max(1, int(args.block_mb * 1e6)), progress=report)
+    except BatchError as e:
+        print("Error:", e, file=sys.stderr)
+        return 1
+    print(f"Redacted {stats['lines']} lines ({stats['bytes'] / 1e6:.1f} MB) in {stats['seconds']:.2f}s: "
+          f"{stats['lines_per_sec']} lines/s, {stats['mb_per_sec']} MB/s")
+    for kind, n in stats["counts"].items():
+        print(f"  {kind:<8} {n}")
+    if stats["invalid_json"]:
+        print(f"  {stats['invalid_json']} lines were not valid JSON and were redacted as text")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
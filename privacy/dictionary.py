@@ -0,0 +1,150 @@
+# privacy/dictionary.py
+"""
+Dictionary redaction of person and place names.
+
+Names, hospitals and streets have no shape a regex can see, so they are
+looked up in word lists instead: one phrase per line in local text files
+(optionally .gz, tab-separated files use their first column), e.g. a first
+and last name list and a gazetteer of hospitals, streets and towns. All
+phrases are compiled into one word-level Aho-Corasick automaton, so a text is
+matched in a single pass over its words whatever the size of the lists.
+
+Configuration (paths separated by os.pathsep):
+  MEDIGUIDE_PHI_NAMES   - name lists, redacted as NAME
+  MEDIGUIDE_PHI_PLACES  - place lists, redacted as PLACE
+
+To keep ordinary words out ("Will", "May", "Bath"), a match must start and end
+with a capitalised word, and a single word at the start of a sentence is not
+redacted. Single words that are drug or condition names ("Parkinson",
+"Addison") are never redacted.
+"""
+
+import gzip
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from aho_corasick import TokenAhoCorasick
+
+from .redactor import Span
+
+NAMES_ENV = "MEDIGUIDE_PHI_NAMES"
+PLACES_ENV = "MEDIGUIDE_PHI_PLACES"
+
+_WORD = re.compile(r"[^\W\d_](?:[\w'’.-]*\w)?")
+_UPPER = "A-ZÀ-ÖØ-Þ"
+# capitalised words, with up to two short lowercase words between them
+# ("Isle of Wight", "Hospital de la Santa Creu")
+_CAPITAL_RUN = re.compile(rf"[{_UPPER}](?:[\w'’.-]*\w)?(?:\s+(?:[a-z]{{1,4}}\s+){{0,2}}[{_UPPER}](?:[\w'’.-]*\w)?)*")
+_POSSESSIVE = re.compile(r"['’]s$")
+_SENTENCE_END = re.compile(r"(?:^|[.!?:\n])[\s\"'(]*\Z")
+
+
+class DictionaryError(Exception):
+    pass
+
+
+def word_key(word: str) -> str:
+    """Match key of a word: lowercase, without a possessive "'s"."""
+    return _POSSESSIVE.sub("", word.lower())
+
+
+def phrase_keys(phrase: str) -> Tuple[str, ...]:
+    return tuple(word_key(w) for w in _WORD.findall(phrase))
+
+
+def read_entries(path: str) -> Iterator[str]:
+    """Phrases from one list file; blank lines and "#" comments are skipped."""
+    if not os.path.exists(path):
+        raise DictionaryError(f"Dictionary file not found at {os.path.abspath(path)}")
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            entry = line.split("\t", 1)[0].strip()
+            if entry and not entry.startswith("#"):
+                yield entry
+
+
+def medical_words() -> Set[str]:
+    """Single-word drug and condition names, which are never redacted."""
+    from medical_data import CONDITION_SYNONYMS, DRUG_ALIASES, SAMPLE_DISEASES, SAMPLE_DRUGS
+
+    phrases = [d["name"] for d in SAMPLE_DRUGS] + [d["name"] for d in SAMPLE_DISEASES]
+    for table in (DRUG_ALIASES, CONDITION_SYNONYMS):
+        for key, values in table.items():
+            phrases += [key] + list(values)
+    return {k for p in phrases for k in phrase_keys(p)}
+
+
+class DictionaryRedactor:
+    """Word-level phrase matcher producing NAME / PLACE spans."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]], exclude: Iterable[str] = (),
+                 require_capital: bool = True):
+        """`entries` are (phrase, type) pairs; `exclude` are words never redacted alone."""
+        self.automaton = TokenAhoCorasick((keys, kind) for phrase, kind in entries
+                                          for keys in [phrase_keys(phrase)] if keys)
+        self.exclude = {word_key(w) for w in exclude}
+        self.require_capital = require_capital
+
+    @property
+    def size(self) -> int:
+        return self.automaton.size
+
+    @property
+    def max_words(self) -> int:
+        return self.automaton.max_tokens
+
+    def find(self, text: str) -> List[Span]:
+        """NAME / PLACE spans, leftmost-longest and non-overlapping."""
+        if not text or not self.size:
+            return []
+        spans: List[Span] = []
+        # a match starts and ends with a capital, so only runs of capitalised
+        # words go through the automaton
+        runs = _CAPITAL_RUN.finditer(text) if self.require_capital else [re.match(r".*", text, re.S)]
+        for run in runs:
+            words = list(_WORD.finditer(text, run.start(), run.end()))
+            hits = []
+            for first, last, kind in self.automaton.iter(word_key(w.group()) for w in words):
+                if self._accept(text, words, first, last):
+                    hits.append((first, last, kind))
+            hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+            next_free = 0
+            for first, last, kind in hits:
+                if first >= next_free:
+                    start, end = words[first].start(), words[last - 1].end()
+                    spans.append(Span(start, end, kind, text[start:end]))
+                    next_free = last
+        return spans
+
+    def _accept(self, text: str, words: Sequence[re.Match], first: int, last: int) -> bool:
+        if last - first == 1:
+            word = words[first]
+            if word_key(word.group()) in self.exclude:
+                return False
+            if self.require_capital and _SENTENCE_END.search(text, max(0, word.start() - 4), word.start()):
+                return False
+        if self.require_capital:
+            return words[first].group()[0].isupper() and words[last - 1].group()[0].isupper()
+        return True
+
+
+def load_dictionary(names: Optional[Sequence[str]] = None,
+                    places: Optional[Sequence[str]] = None) -> Optional[DictionaryRedactor]:
+    """Build the dictionary stage from list files, by default those named in
+    MEDIGUIDE_PHI_NAMES / MEDIGUIDE_PHI_PLACES; None when there are none."""
+    if names is None:
+        names = [p for p in os.getenv(NAMES_ENV, "").split(os.pathsep) if p]
+    if places is None:
+        places = [p for p in os.getenv(PLACES_ENV, "").split(os.pathsep) if p]
+    if not names and not places:
+        return None
+
+    def entries():
+        for kind, paths in (("NAME", names), ("PLACE", places)):
+            for path in paths:
+                for entry in read_entries(path):
+                    yield entry, kind
+
+    return DictionaryRedactor(entries(), exclude=medical_words())
@@ -0,0 +1,318 @@
+# privacy/redactor.py
+"""
+Single-pass PHI redaction.
+
+All patterns are compiled once into one alternation of named groups, and each
+match reports which kind of PHI it is. Every pattern contains a digit or an
+"@", so the text is never scanned position by position: a C-speed search
+jumps from one digit run / "@" to the next, and the alternation is only
+matched at the one or two places a match around it can start (the start of
+its token, or a "+" / "(" just before it). At a given start the first
+alternative that matches wins. A digit run that starts its own token is
+tried inside that search, so numbers that are not PHI ("500 mg", "38.5")
+never reach Python.
+
+Forms whose distinguishing part comes before the first digit are confirmed by
+a short look behind the match instead: a month before "12, 1985", a state
+before a ZIP code, an ID label before a short code, and "DOB" / "date of
+birth" before a date, which makes it a DOB. Labels stay in the text
+("DOB: [REDACTED_DOB]").
+
+With a dictionary stage (see `privacy.dictionary`), NAME and PLACE spans from
+it are merged in; where they overlap a pattern match, the pattern wins.
+
+Types:
+  EMAIL    - e-mail addresses
+  DOB      - dates introduced by "DOB", "date of birth", "born (on)"
+  DATE     - full dates (12/03/1985, 1985-03-12, 12 March 1985, March 12, 1985),
+             and two-digit years after a date word ("seen on 12/03/85")
+  ID       - SSN / card / Aadhaar shaped numbers, runs of 6+ digits,
+             letter-prefixed record numbers (A1234567, XZ-99812) and codes
+             after an ID label (MRN, NHS, insurance, passport...)
+  PHONE    - international (+44 20 7946 0958, 0091-...) and national
+             (555-123-4567, (555) 123-4567, 020 7946 0958, 98765 43210) numbers
+  ADDRESS  - street addresses (house number, up to three street-name words
+             and a street suffix: "221B Baker Street"), US ZIP with state,
+             UK postcodes
+  NAME     - people named in the dictionary stage's name lists
+  PLACE    - hospitals, streets and towns from its place lists
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+_MONTH = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+          r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)")
+_ID_LABEL = (r"(?:mrn|medical\s+record(?:\s+(?:number|no\.?))?|patient\s+(?:id|number|no\.?)|"
+             r"ssn|social\s+security(?:\s+(?:number|no\.?))?|nhs(?:\s+(?:number|no\.?))?|"
+             r"insurance(?:\s+(?:id|number|no\.?))?|policy(?:\s+(?:id|number|no\.?))|"
+             r"member\s+id|passport(?:\s+(?:number|no\.?))?|aadhaa?r|licen[cs]e(?:\s+(?:number|no\.?))?)")
+_STREET = (r"(?:street|st|avenue|ave|road|rd|boulevard|blvd|lane|ln|drive|dr|court|ct|way|place|pl|"
+           r"terrace|close|crescent|highway|hwy|parkway|square|sq)")
+# capitalised words that start a clause rather than name a street ("Visit 1 Call Your Dr")
+_NOT_STREET = (r"(?:Call|Phone|Ring|Text|Email|Contact|Visit|See|Ask|Tell|Take|Give|Get|Go|Come|Meet|"
+               r"Your|My|Our|His|Her|Their|A|An|And|Or|Then|Please|If|At|In|On|To|For|With)")
+# a label and its separator, right before the value ("MRN is: ", "DOB - ")
+_LABEL_END = r"\s*(?:is\s+)?[:#-]?\s*\Z"
+_DAY = r"(?:0?[1-9]|[12]\d|3[01])"
+_MON = r"(?:0?[1-9]|1[0-2])"
+# words that introduce a date ("seen on", "DOB:"); numbers like 5-10-15 need one
+_DATE_LABEL = (r"(?:on|dated?|since|from|until|till|before|after|seen|visit(?:ed)?|admitted|"
+               r"discharged|dob|d\.o\.b\.?|date\s+of\s+birth|born(?:\s+on)?)")
+
+# (type, pattern, context) in priority order. `context`, when given, must end
+# right where the match starts; it is (regex, whether it is part of the span).
+PATTERNS: List[Tuple[str, str, Optional[Tuple[str, bool]]]] = [
+    ("EMAIL", r"[\w.%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}", None),
+    # the (?=...) shape checks turn most numbers away before the alternatives are tried
+    ("DATE", rf"(?=\d{{1,4}}[/.-]\d)"
+             rf"(?:(?:{_MON}[/.-]{_DAY}|{_DAY}[/.-]{_MON})[/.-]\d{{4}}|\d{{4}}-{_MON}-{_DAY})(?!\w)", None),
+    ("DATE", rf"(?=\d{{1,2}}[/.-]\d)(?:{_MON}[/.-]{_DAY}|{_DAY}[/.-]{_MON})[/.-]\d{{2}}(?!\w)",
+     (rf"(?i:\b{_DATE_LABEL}){_LABEL_END}", False)),
+    ("DATE", rf"(?i:\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH}\.?,?\s+\d{{4}})(?!\w)", None),
+    ("ID", r"(?=\d{3,4}[\s-]\d)(?:\d{3}-\d{2}-\d{4}|(?:\d{4}[\s-]){3}\d{4}|\d{4}[\s-]\d{4}[\s-]\d{4})(?![\w-])", None),
+    ("PHONE", r"(?:\+|00)[1-9]\d{0,2}(?:[\s.-]?\(?\d{1,5}\)?){2,5}(?!\w)", None),
+    ("PHONE", r"(?:\(\d{3}\)\s?|\d{3}[-.\s]?)\d{3}[-.\s]?\d{4}(?!\w)", None),
+    ("PHONE", r"(?:0\d{2,4}[\s-]\d{3,4}[\s-]\d{3,4}|\d{5}[\s-]\d{5})(?!\w)", None),
+    ("ID", r"\d{6,}(?!\w)", None),
+    ("ADDRESS", rf"\d{{1,5}}[A-Za-z]?\s+(?:(?!{_NOT_STREET}\s)[A-Z][A-Za-z'-]*\s+){{1,3}}(?i:{_STREET})\b\.?",
+     None),
+    ("ADDRESS", r"[A-Z]{1,2}\d[A-Z\d]?\s+\d[A-Z]{2}\b", None),
+    ("ID", r"[A-Z]{1,3}-?\d{5,}(?!\w)", None),
+    ("DATE", r"\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}(?!\w)", (rf"(?i:\b{_MONTH})\.?\s+\Z", True)),
+    ("ADDRESS", r"\d{5}(?:-\d{4})?(?!\w)", (r"\b[A-Z]{2}\s+\Z", True)),
+    ("ID", r"[A-Z0-9][A-Z0-9-]{3,}(?!\w)", (rf"(?i:\b{_ID_LABEL}){_LABEL_END}", False)),
+]
+
+# (type, new type, label): a match of `type` right after `label` is `new type`
+RELABEL: List[Tuple[str, str, str]] = [
+    ("DATE", "DOB", rf"(?i:\b(?:dob|d\.o\.b\.?|date\s+of\s+birth|born(?:\s+on)?)){_LABEL_END}"),
+]
+
+REDACTION_TYPES = ("EMAIL", "DOB", "DATE", "ID", "PHONE", "ADDRESS", "NAME", "PLACE")
+
+# how far a context or label may reach back from the match
+MAX_CONTEXT = 32
+# how far an e-mail local part may reach back from its "@"
+MAX_LOCAL = 64
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+    type: str
+    text: str
+
+
+def placeholder(kind: str) -> str:
+    return f"[REDACTED_{kind}]"
+
+
+_PLACEHOLDERS = {kind: placeholder(kind) for kind in REDACTION_TYPES}
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _local_start(text: str, at: int, floor: int) -> int:
+    """Start of the e-mail local part ending at `at` (`at` when there is none)."""
+    i, stop = at, max(floor, at - MAX_LOCAL)
+    while i > stop:
+        c = text[i - 1]
+        if not (c.isalnum() or c in "_.%+-"):
+            break
+        i -= 1
+    return i
+
+
+def _starts(text: str, t: int, floor: int) -> List[int]:
+    """Where a match containing the digit run or "@" at `t` can start."""
+    i = t
+    if i == floor or text[i - 1] == " ":
+        return [t]
+    if text[t] == "@":
+        i = _local_start(text, t, floor)
+        return [i] if i < t else []
+    # "+44", "(555)", "NW1", "XZ-99812"
+    stop = max(floor, t - 4)
+    while i > stop:
+        c = text[i - 1]
+        if not (c.isalpha() or c in "+(-"):
+            break
+        i -= 1
+    # the back-off stopped at a non-letter, so past `i` only "+(-" end a word
+    starts = [] if i and _is_word(text[i - 1]) else [i]
+    for j in range(i, t):
+        if text[j] in "+(-":
+            starts.append(j + 1)
+    return starts
+
+
+class Redactor:
+    """Finds and masks PHI in one pass over the text."""
+
+    def __init__(self, patterns: Optional[List[Tuple[str, str, Optional[Tuple[str, bool]]]]] = None,
+                 relabel: Optional[List[Tuple[str, str, str]]] = None, dictionary=None):
+        self.dictionary = dictionary
+        self.patterns = list(PATTERNS if patterns is None else patterns)
+        # an empty group closing each alternative tells which one matched (it is
+        # m.lastindex); this matches faster than a group around each alternative
+        self.regex = re.compile("|".join(f"(?:{p})(?P<g{i}>)" for i, (_, p, _) in enumerate(self.patterns)))
+        self._index = {number: int(name[1:]) for name, number in self.regex.groupindex.items()}
+        # the next digit run or "@" that either follows letters, "+", "(" or "-" (a
+        # match may start before it: no group set) or starts a match of the
+        # alternation itself (its groups set as above). Its leading character class
+        # lets the engine skip straight to the next candidate
+        self._trigger = re.compile(r"[\d@](?<![\d@]\d)(?:(?<=[\w+(-].)|(?<=(?=%s).))\d*" % self.regex.pattern)
+        # per alternative: (type, compiled pattern, compiled context, context in span)
+        self._alternatives = [
+            (kind, re.compile(pattern), re.compile(context[0]) if context else None,
+             bool(context and context[1]))
+            for kind, pattern, context in self.patterns
+        ]
+        self._relabel = {kind: (new, re.compile(label))
+                         for kind, new, label in (RELABEL if relabel is None else relabel)}
+        # closing group -> type, for alternatives that need no context or relabel check
+        self._plain: Dict[int, str] = {}
+        for number, index in self._index.items():
+            kind, _, context, _ = self._alternatives[index]
+            if context is None and kind not in self._relabel:
+                self._plain[number] = kind
+
+    def _span(self, text: str, index: int, begin: int, end: int, start: int, floor: int) -> Optional[Span]:
+        """The span for alternative `index` matching `begin`-`end` from `start`, once
+        its context is confirmed."""
+        kind, _, context, included = self._alternatives[index]
+        while context is not None:
+            c = context.search(text, max(floor, begin - MAX_CONTEXT), begin)
+            if c is not None:
+                begin = c.start() if included else begin
+                break
+            # unconfirmed: fall through to the next alternative matching here
+            for index in range(index + 1, len(self._alternatives)):
+                m = self._alternatives[index][1].match(text, start)
+                if m:
+                    break
+            else:
+                return None
+            kind, _, context, included = self._alternatives[index]
+            begin, end = m.span()
+        relabel = self._relabel.get(kind)
+        if relabel and relabel[1].search(text, max(floor, begin - MAX_CONTEXT), begin):
+            kind = relabel[0]
+        return Span(begin, end, kind, text[begin:end])
+
+    def finditer(self, text: str) -> Iterator[Span]:
+        """Typed spans, leftmost first."""
+        if self.dictionary is None:
+            return self._pattern_spans(text)
+        return _merge(self._pattern_spans(text), self.dictionary.find(text))
+
+    def _pattern_spans(self, text: str) -> Iterator[Span]:
+        pos = 0  # end of the last span
+        search, match, plain = self._trigger.search, self.regex.match, self._plain
+        trigger = search(text)
+        while trigger:
+            t = trigger.start()
+            group = trigger.lastindex
+            if group:
+                # matched in the search, starting at the trigger
+                end = trigger.start(group)
+                kind = plain.get(group)
+                if kind:
+                    span = Span(t, end, kind, text[t:end])
+                else:
+                    span = self._span(text, self._index[group], t, end, t, pos)
+                starts = ()
+            else:
+                span = None
+                # right after the last span, the trigger starts its token
+                starts = _starts(text, t, pos) if t > pos else (t,)
+            for start in starts:
+                m = match(text, start)
+                if m is None:
+                    continue
+                begin, end = m.span()
+                kind = plain.get(m.lastindex)
+                if kind:
+                    if kind == "EMAIL" and text[t] != "@":
+                        # a digit in the local part triggered: take in all of "jane.roe5@"
+                        begin = _local_start(text, text.index("@", t), pos)
+                    span = Span(begin, end, kind, text[begin:end])
+                else:
+                    span = self._span(text, self._index[m.lastindex], begin, end, start, pos)
+                if span:
+                    break
+            if span:
+                yield span
+                pos = span.end
+                trigger = search(text, pos)
+            else:
+                trigger = search(text, trigger.end())
+
+    def find(self, text: str) -> List[Span]:
+        """Typed PHI spans in `text`, in order and non-overlapping."""
+        return list(self.finditer(text)) if text else []
+
+    def redact(self, text: str) -> Tuple[str, List[Span]]:
+        """`text` with every span replaced by its placeholder, and the spans."""
+        if not text:
+            return text, []
+        spans = self.find(text)
+        return apply_spans(text, spans), spans
+
+
+def _merge(primary: Iterable[Span], secondary: Iterable[Span]) -> Iterator[Span]:
+    """Spans of both, in order; where they overlap, `primary` wins."""
+    rest = iter(secondary)
+    extra = next(rest, None)
+    for span in primary:
+        while extra and extra.start < span.end:
+            if extra.end <= span.start:
+                yield extra
+            extra = next(rest, None)
+        yield span
+    while extra:
+        yield extra
+        extra = next(rest, None)
+
+
+def apply_spans(text: str, spans: List[Span]) -> str:
+    if not spans:
+        return text
+    out, last = [], 0
+    append = out.append
+    for start, end, kind, _ in spans:
+        append(text[last:start])
+        append(_PLACEHOLDERS.get(kind) or placeholder(kind))
+        last = end
+    append(text[last:])
+    return "".join(out)
+
+
+def count_types(spans: List[Span]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for span in spans:
+        counts[span.type] = counts.get(span.type, 0) + 1
+    return counts
+
+
+_DEFAULT: Optional[Redactor] = None
+
+
+def get_redactor() -> Redactor:
+    """Process-wide redactor, compiled once, with the dictionary stage if configured."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        from .dictionary import load_dictionary
+        _DEFAULT = Redactor(dictionary=load_dictionary())
+    return _DEFAULT
+
+
+def sanitize_text(text: str) -> Tuple[str, bool]:
+    """Mask PHI in `text`; returns (sanitized text, whether anything was masked)."""
+    if not text:
+        return text, False
+    redacted, spans = get_redactor().redact(text)
+    return redacted, bool(spans)
@@ -0,0 +1,115 @@
+# privacy/stream.py
+"""
+PHI redaction for streamed text.
+
+Model output arrives a few characters at a time, and an e-mail address or
+phone number can be split across chunks ("555-12" + "3-4567"). The
+`StreamRedactor` releases text as soon as nothing in it can still become
+part of a match: it holds back only the open tail of the buffer - an
+unfinished word, a run of digit groups that more digits could extend, the
+words after a house number, a month or state that a date or ZIP could
+follow, and with a dictionary stage the capitalised words a name could
+continue. Everything before that tail is redacted and released immediately,
+so latency stays at one or two tokens.
+
+A short window of already released text is kept as context, so labels
+("DOB:", "MRN") seen in an earlier chunk still type the match that follows.
+"""
+
+import re
+from typing import List, Optional
+
+from .redactor import MAX_CONTEXT, Redactor, Span, _MONTH, get_redactor, placeholder
+
+# a digit group, possibly letter-prefixed ("NW1", "A1234567", "221B")
+_GROUP = r"[A-Za-z]{0,3}\d[\dA-Za-z]*"
+# the tail of a buffer that more text could still turn into (a longer) match
+_OPEN = re.compile(
+    r"(?:[\w.%+-]+@[\w.-]*"
+    rf"|[+(]?{_GROUP}(?:[\s().\-/,:]{{1,3}}{_GROUP})*"
+    r"(?:[\s().\-/,+]{0,3}|\s+[A-Za-z]*\.?,?\s*|(?:\s+[A-Z][A-Za-z'-]*){1,4}\.?\s*)"
+    rf"|(?i:\b{_MONTH}\.?(?:\s+\d{{1,2}}(?:st|nd|rd|th)?,?)?\s*\d{{0,4}})"
+    r"|\b[A-Z]{2}\s*\d{0,5}(?:-\d{0,4})?"
+    r"|[\w.%+'’-]+)\Z")
+# trailing capitalised words that a dictionary phrase could continue ("St Mary's ")
+_NAME_RUN = re.compile(r"(?:\b[A-Z][\w'’.-]*(?:[ \t]+[a-z]{1,3})*[ \t]+)+\Z")
+# how far back the open tail is looked for; longer tails are released
+HOLD_WINDOW = 96
+
+
+class StreamRedactor:
+    """Incremental redaction: `feed` chunks, then `flush` at the end."""
+
+    def __init__(self, redactor: Optional[Redactor] = None):
+        self.redactor = redactor or get_redactor()
+        # spans found so far, with offsets into the whole (unredacted) stream
+        self.spans: List[Span] = []
+        self._buffer = ""
+        # _buffer[:_released] was already emitted and is kept only as context
+        self._released = 0
+        # stream offset of _buffer[0]
+        self._offset = 0
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk; returns the redacted text that is now safe to emit."""
+        if not chunk:
+            return ""
+        self._buffer += chunk
+        buffer = self._buffer
+        window = max(self._released, len(buffer) - HOLD_WINDOW)
+        tail = _OPEN.search(buffer, window)
+        hold = tail.start() if tail else len(buffer)
+        if self.redactor.dictionary is not None:
+            run = _NAME_RUN.search(buffer, window, hold)
+            if run and run.end() == hold:
+                hold = run.start()
+        return self._release(hold)
+
+    def flush(self) -> str:
+        """Redact and return everything still held back."""
+        out = self._release(len(self._buffer))
+        self._buffer, self._released = "", 0
+        return out
+
+    def _release(self, end: int) -> str:
+        buffer, start = self._buffer, self._released
+        if end <= start:
+            return ""
+        spans = []
+        for span in self.redactor.finditer(buffer):
+            if span.end <= start:
+                continue
+            if span.start >= end:
+                break
+            if span.end > end:
+                # still growing; hold it back whole
+                end = max(span.start, start)
+                break
+            spans.append(span)
+        out, last = [], start
+        for span in spans:
+            # a context word before `start` (a month, a state) is already out
+            begin = max(span.start, start)
+            out.append(buffer[last:begin])
+            out.append(placeholder(span.type))
+            last = span.end
+            self.spans.append(Span(self._offset + begin, self._offset + span.end,
+                                   span.type, buffer[begin:span.end]))
+        out.append(buffer[last:end])
+        keep = max(0, end - MAX_CONTEXT)
+        self._buffer = buffer[keep:]
+        self._offset += keep
+        self._released = end - keep
+        return "".join(out)
+
+
+def redact_stream(chunks, redactor: Optional[Redactor] = None):
+    """Redact an iterable of text chunks, yielding non-empty redacted pieces."""
+    stream = StreamRedactor(redactor)
+    for chunk in chunks:
+        out = stream.feed(chunk)
+        if out:
+            yield out
+    out = stream.flush()
+    if out:
+        yield out
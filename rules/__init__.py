@@ -2,6 +2,8 @@
 Rules package for MediGuideAI
 """
 
-from .rules_loader import load_rules, RulesLoadError
+from .rules_loader import load_rules, rules_version, RulesLoadError
+from .scoring import detect_critical, rank_conditions, severity_label
 
-__all__ = ['load_rules', 'RulesLoadError']
\ No newline at end of file
+__all__ = ['load_rules', 'rules_version', 'RulesLoadError', 'detect_critical', 'rank_conditions',
+           'severity_label']
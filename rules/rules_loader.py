@@ -13,6 +13,7 @@ Expected schema:
 }
 """
 
+import hashlib
 import json
 from pathlib import Path
 from typing import Dict, Optional
@@ -45,6 +46,11 @@ def load_rules(path: Optional[str] = None) -> Dict[str, Dict[str, int]]:
         cleaned[token_key] = inner
     return cleaned
 
+def rules_version(rules: Dict[str, Dict[str, int]]) -> str:
+    """Short content hash of loaded rules; changes whenever any weight does."""
+    payload = json.dumps(rules, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
 if __name__ == "__main__":
     try:
         r = load_rules()
@@ -0,0 +1,44 @@
+# rules/scoring.py
+"""
+Headless symptom scoring for the Symptom Checker.
+
+Ranks conditions by the summed rule weights of the selected symptoms and
+flags critical cases, with no Streamlit dependency, so the page and the
+load-test harness run the same code.
+"""
+
+from typing import Dict, List, Tuple
+
+CRITICAL_CONDITIONS = ("ischemic heart disease", "ischemic stroke", "sepsis", "septic shock",
+                       "pulmonary embolism")
+
+SEVERITY_LABELS = ((range(1, 4), "Mild"), (range(4, 7), "Moderate"), (range(7, 11), "Severe"))
+
+
+def rank_conditions(selected: List[str], rules: Dict[str, Dict[str, int]]) -> Tuple[List[Tuple[str, float]], Dict[str, int]]:
+    """(conditions with their score as % of the best, raw summed weights)."""
+    raw = {}
+    for s in selected:
+        tok = s.lower().strip()
+        mapping = rules.get(tok, {})
+        for cond, w in mapping.items():
+            raw[cond] = raw.get(cond, 0) + int(w)
+    if not raw:
+        return [], {}
+    m = max(raw.values())
+    ranked = [(c, round(100.0*v/m,1)) for c,v in raw.items()]
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    return ranked, raw
+
+
+def detect_critical(ranked: List[tuple], severity_value:int) -> bool:
+    if severity_value >= 8:
+        return True
+    for cond, pct in ranked:
+        if pct >= 85 and cond.lower() in CRITICAL_CONDITIONS:
+            return True
+    return False
+
+
+def severity_label(severity_value: int) -> str:
+    return next((label for r, label in SEVERITY_LABELS if severity_value in r), "Mild")
@@ -0,0 +1,52 @@
+# tests/test_gateway.py
+"""LLMGateway queueing: a caller that leaves while queued gives up its place at once."""
+
+import asyncio
+import threading
+import unittest
+
+from llm.gateway import LLMGateway
+
+
+class QueuedCancelTest(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def upstream(self, messages, client_config=None, status=None, **kwargs):
+        self.calls.append(messages[0]["content"])
+        self.release.wait(5)
+        yield "answer"
+        status["ok"] = True
+
+    def test_queue_depth_falls_when_a_queued_caller_leaves(self):
+        asyncio.run(self.run_queued_cancel())
+
+    async def run_queued_cancel(self):
+        gateway = LLMGateway(self.upstream, max_concurrency=1, max_per_key=1)
+
+        async def consume(content):
+            return [c async for c in gateway.stream([{"role": "user", "content": content}], {"api_key": "k"})]
+
+        first = asyncio.ensure_future(consume("first"))
+        second = asyncio.ensure_future(consume("second"))
+        for _ in range(100):
+            if gateway.metrics()["queued"] == 1:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(gateway.metrics()["queued"], 1)
+
+        second.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await second
+        await asyncio.sleep(0)
+        self.assertEqual(gateway.metrics()["queued"], 0)
+        self.assertEqual(gateway.metrics()["in_flight_prompts"], 1)
+
+        self.release.set()
+        self.assertEqual(await first, ["answer"])
+        self.assertEqual(self.calls, ["first"])
+
+
+if __name__ == "__main__":
+    unittest.main()
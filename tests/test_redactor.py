@@ -0,0 +1,32 @@
+# tests/test_redactor.py
+"""Dates in privacy.redactor: real dates are masked, dose and ratio numbers are not."""
+
+import unittest
+
+from privacy.redactor import Redactor
+
+
+class DateTest(unittest.TestCase):
+    def setUp(self):
+        self.redactor = Redactor()
+
+    def redact(self, text):
+        return self.redactor.redact(text)[0]
+
+    def test_doses_and_ratios_stay(self):
+        for text in ("dose 5-10-15 mg", "ratio 10/20/30", "titrate 2.5.10 weekly", "on 2020-13-01"):
+            with self.subTest(text=text):
+                self.assertEqual(self.redact(text), text)
+
+    def test_full_dates(self):
+        self.assertEqual(self.redact("seen 12/03/1985"), "seen [REDACTED_DATE]")
+        self.assertEqual(self.redact("seen 1985-03-12"), "seen [REDACTED_DATE]")
+
+    def test_two_digit_year_needs_a_date_word(self):
+        self.assertEqual(self.redact("seen on 12/03/85"), "seen on [REDACTED_DATE]")
+        self.assertEqual(self.redact("DOB: 12/3/85"), "DOB: [REDACTED_DOB]")
+        self.assertEqual(self.redact("ratio 12/03/85"), "ratio 12/03/85")
+
+
+if __name__ == "__main__":
+    unittest.main()
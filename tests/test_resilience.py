@@ -0,0 +1,51 @@
+# tests/test_resilience.py
+"""ModelRouter health accounting: one outcome per attempt, recorded when the stream ends."""
+
+import unittest
+
+import httpx
+
+from llm.resilience import ModelRouter
+
+
+def complete(model):
+    yield "Hello"
+    yield " there"
+
+
+def dropped(model):
+    yield "Hello"
+    raise httpx.ReadError("connection dropped")
+
+
+class OutcomeTest(unittest.TestCase):
+    def setUp(self):
+        self.router = ModelRouter(failure_threshold=3, sleep=lambda _: None)
+
+    def health(self):
+        return self.router._health["m"]
+
+    def test_completed_stream_counts_once(self):
+        for _ in range(5):
+            self.assertEqual(list(self.router.stream(complete, ["m"])), ["Hello", " there"])
+        self.assertEqual(list(self.health().outcomes), [True] * 5)
+        self.assertEqual(len(self.health().latencies), 5)
+
+    def test_mid_stream_drops_are_only_failures(self):
+        for _ in range(3):
+            with self.assertRaises(httpx.ReadError):
+                list(self.router.stream(dropped, ["m"]))
+        self.assertEqual(list(self.health().outcomes), [False] * 3)
+        self.assertEqual(self.health().state, "open")
+
+    def test_error_rate_of_a_model_that_always_drops(self):
+        router = ModelRouter(failure_threshold=100, sleep=lambda _: None)
+        for _ in range(5):
+            with self.assertRaises(httpx.ReadError):
+                list(router.stream(dropped, ["m"]))
+        self.assertEqual(router.snapshot()["m"]["error_rate"], 1.0)
+        self.assertEqual(router.snapshot()["m"]["consecutive_failures"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,15 +7,20 @@ MediGuideAI — Premium Medical Dashboard UI
 """
 
 import os
-import re
 import time
 from typing import List, Tuple, Dict
 import streamlit as st
 import pandas as pd
 
-from config import get_client, send_chat_stream
-from rules import load_rules, RulesLoadError
+from config import get_client, render_client_status
+from rules import load_rules, rules_version, RulesLoadError, detect_critical, rank_conditions
+from rules import severity_label as rules_severity_label
 from medical_data import SAMPLE_DISEASES, SAMPLE_DRUGS
+from catalogue import get_catalogue, popcount
+from privacy import sanitize_text
+from llm import (CacheError, SimilarCacheError, analysis_messages, chat_system_prompt, extractive_summary,
+                 get_chat_context, get_gateway, get_response_cache, get_similar_cache, medication_context,
+                 prompt_key, summary_messages)
 
 # ------------------------
 # Page config & logger
@@ -49,6 +54,8 @@ def safe_load_rules():
 
 RULES = safe_load_rules()
 
+DRUG_PAGE_SIZES = [10, 20, 50]
+
 # ------------------------
 # Enhanced Theme Palette System
 # ------------------------
@@ -327,42 +334,10 @@ def apply_dynamic_style(palette_name: str):
     """, unsafe_allow_html=True)
 
 # ------------------------
-# Sanitizer & scoring
+# Scoring
 # ------------------------
-def sanitize_text(text: str) -> Tuple[str, bool]:
-    if not text:
-        return text, False
-    s = text
-    flag = False
-    s, n = re.subn(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", "[REDACTED_EMAIL]", s)
-    if n: flag = True
-    s, n = re.subn(r"\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b", "[REDACTED_PHONE]", s)
-    if n: flag = True
-    s, n = re.subn(r"\b\d{6,}\b", "[REDACTED_ID]", s)
-    if n: flag = True
-    return s, flag
-
 def score_symptoms(selected: List[str]):
-    raw = {}
-    for s in selected:
-        tok = s.lower().strip()
-        mapping = RULES.get(tok, {})
-        for cond, w in mapping.items():
-            raw[cond] = raw.get(cond, 0) + int(w)
-    if not raw:
-        return [], {}
-    m = max(raw.values())
-    ranked = [(c, round(100.0*v/m,1)) for c,v in raw.items()]
-    ranked.sort(key=lambda x: x[1], reverse=True)
-    return ranked, raw
-
-def detect_critical(ranked: List[tuple], severity_value:int) -> bool:
-    if severity_value >= 8:
-        return True
-    for cond, pct in ranked:
-        if pct >= 85 and cond.lower() in ("ischemic heart disease","ischemic stroke","sepsis","septic shock","pulmonary embolism"):
-            return True
-    return False
+    return rank_conditions(selected, RULES)
 
 def ambulance_map_link(location_query: str = "") -> str:
     base = "https://www.google.com/maps/search/ambulance+near+me"
@@ -418,6 +393,10 @@ def sidebar_controls():
     
     st.sidebar.markdown("---")
     
+    # AI key status, resolved once per process
+    render_client_status()
+    
+    
     # Disclaimer
     st.sidebar.markdown("""
     <div style='
@@ -894,7 +873,7 @@ def page_symptom_checker(ctx):
             range(4, 7): ("#fbbf24", "Moderate"),
             range(7, 11): ("#ef4444", "Severe")
         }
-        severity_label = next((label for r, (_, label) in severity_colors.items() if severity_val in r), "Mild")
+        severity_label = rules_severity_label(severity_val)
         severity_color = next((color for r, (color, _) in severity_colors.items() if severity_val in r), "#4ade80")
         
         st.markdown(f"""
@@ -1015,6 +994,25 @@ def page_symptom_checker(ctx):
                         </div>
                     """, unsafe_allow_html=True)
                 
+                # Related medications from the catalogue's condition index
+                catalogue = get_catalogue()
+                with st.expander("💊 Medications related to these conditions", expanded=False):
+                    shown_any = False
+                    for cond, _ in ranked[:3]:
+                        meds = catalogue.medications_for(cond)
+                        if not meds["indicated"] and not meds["contraindicated"]:
+                            continue
+                        shown_any = True
+                        st.markdown(f"**{cond}**")
+                        if meds["indicated"]:
+                            st.markdown("- Commonly used: " + ", ".join(d["name"] for d in meds["indicated"]))
+                        if meds["contraindicated"]:
+                            st.markdown("- Use with caution / avoid: " + ", ".join(d["name"] for d in meds["contraindicated"]))
+                    if shown_any:
+                        st.caption("Never start or stop a medication without advice from a healthcare professional.")
+                    else:
+                        st.caption("No catalogue medications are linked to these conditions.")
+                
                 # Healthcare Recommendations
                 st.markdown("""
                     <div style='background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%); padding: 20px; border-radius: 15px; margin: 20px 0; box-shadow: 0 10px 30px rgba(67, 233, 123, 0.3);'>
@@ -1031,6 +1029,11 @@ def page_symptom_checker(ctx):
                     </div>
                 """, unsafe_allow_html=True)
             
+            # Medications mentioned in the details (one pass of the catalogue's name matcher)
+            med_report = get_catalogue().medication_report(sanitized_extra, [c for c, _ in ranked[:3]])
+            render_medication_report(med_report)
+            med_context = medication_context(med_report)
+            
             # AI Enhanced Analysis
             if ai_enable:
                 client = get_client()
@@ -1043,36 +1046,26 @@ def page_symptom_checker(ctx):
                     
                     try:
                         with st.spinner("🤖 Generating advanced AI analysis..."):
-                            prompt = f"""Provide a comprehensive medical analysis for:
+                            msgs = analysis_messages(selected, severity_val, severity_label, sanitized_extra, ranked, med_context)
                             
-Symptoms: {', '.join(selected)}
-Severity: {severity_val}/10 ({severity_label})
-Additional Details: {sanitized_extra if sanitized_extra else 'None provided'}
-{f'Possible Conditions: {" ,".join([c for c, _ in ranked[:3]])}' if ranked else ''}
-
-Provide:
-1. Detailed symptom analysis
-2. Possible causes and risk factors
-3. Recommended precautions and self-care
-4. When to seek immediate medical attention
-5. Preventive measures
-
-Be thorough but remind users to consult healthcare professionals."""
-                            
-                            msgs = [
-                                {"role":"system","content":"You are an expert medical assistant. Provide detailed, evidence-based analysis with proper precautions and recommendations."},
-                                {"role":"user","content":prompt}
-                            ]
-                            
-                            response_text = ""
-                            for chunk in send_chat_stream(msgs, client):
-                                response_text += chunk
-                            
-                            st.markdown(f"""
-                                <div style='background: white; padding: 25px; border-radius: 15px; margin: 15px 0; box-shadow: 0 8px 20px rgba(0,0,0,0.1); border-left: 5px solid #667eea;'>
-                                    <div style='color: #2d3748; line-height: 1.8;'>{response_text}</div>
-                                </div>
-                            """, unsafe_allow_html=True)
+                            # Identical analyses are served from the on-disk response cache
+                            try:
+                                cache = get_response_cache()
+                            except CacheError:
+                                cache = None
+                            cache_key = prompt_key(msgs, client.get("model", ""), rules_version(RULES))
+                            cached = cache.get(cache_key) if cache else None
+                            if cached:
+                                response_text = cached["response"]
+                                st.caption(f"⚡ Cached analysis from {time.strftime('%Y-%m-%d %H:%M', time.localtime(cached['created']))}")
+                                st.markdown(analysis_card(response_text), unsafe_allow_html=True)
+                            else:
+                                stream_status = {}
+                                response_text = stream_into(st.empty(), get_gateway().stream_sync(msgs, client, status=stream_status, page="Symptom Checker"),
+                                                            analysis_card)
+                                if cache and stream_status.get("ok"):
+                                    cache.put(cache_key, response_text, stream_status.get("model") or client.get("model", ""),
+                                              {"rules_version": rules_version(RULES)})
                             
                             # Emergency reminder for AI analysis
                             if critical:
@@ -1314,6 +1307,150 @@ def page_find_care(ctx):
         </div>
     """, unsafe_allow_html=True)
 
+# Streamed AI output is redrawn at most this often, or once this many characters are pending
+STREAM_FLUSH_SECONDS = 0.08
+STREAM_FLUSH_CHARS = 160
+
+def analysis_card(text: str) -> str:
+    return f"""
+        <div style='background: white; padding: 25px; border-radius: 15px; margin: 15px 0; box-shadow: 0 8px 20px rgba(0,0,0,0.1); border-left: 5px solid #667eea;'>
+            <div style='color: #2d3748; line-height: 1.8;'>{text}</div>
+        </div>
+    """
+
+def assistant_bubble(text: str) -> str:
+    return f"""
+    <div style='
+        background: #38ef7d;
+        color: purple;
+        padding: 12px 18px;
+        border-radius: 18px 18px 18px 5px;
+        margin: 8px 80px 8px 0;
+        border-left: 4px solid #0ea5e9;
+        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
+    '>
+        <strong style='color: #0ea5e9;'>🤖 AI Assistant:</strong><br>{text}
+    </div>
+    """
+
+def stream_into(placeholder, chunks, render, interval: float = STREAM_FLUSH_SECONDS,
+                min_chars: int = STREAM_FLUSH_CHARS) -> str:
+    """Render `chunks` into `placeholder` as they arrive and return the full text.
+
+    The first chunk is drawn immediately, later ones in batches, so the user
+    waits only for the first token and Streamlit sends a few deltas per second.
+    """
+    text = ""
+    last_flush = None
+    pending = 0
+    for chunk in chunks:
+        text += chunk
+        pending += len(chunk)
+        now = time.perf_counter()
+        if last_flush is None or now - last_flush >= interval or pending >= min_chars:
+            placeholder.markdown(render(text + " ▌"), unsafe_allow_html=True)
+            last_flush, pending = now, 0
+    placeholder.markdown(render(text), unsafe_allow_html=True)
+    return text
+
+def summarize_chat(client: Dict, previous: str, turns: List[Dict], max_tokens: int) -> str:
+    """Fold older chat turns into the rolling summary; local extract if the model fails."""
+    msgs = summary_messages(previous, turns, max_tokens)
+    status = {}
+    try:
+        summary = "".join(get_gateway().stream_sync(msgs, client, status=status, page="AI Chat"))
+    except Exception:
+        summary = ""
+    return summary.strip() if status.get("ok") and summary.strip() else extractive_summary(previous, turns, max_tokens)
+
+def format_interaction(hit: Dict) -> str:
+    reasons = "; ".join(
+        f"{r['listed_under']}: {r['via'] or 'direct'}{' (' + r['note'] + ')' if r['note'] else ''}"
+        for r in hit["reasons"]
+    )
+    return f"**{hit['drugs'][0]} + {hit['drugs'][1]}** — {reasons}"
+
+def render_medication_report(report: Dict):
+    """Mentioned medications with their interaction and contraindication warnings."""
+    names = [d["name"] for d in report["drugs"]] + report["external"]
+    if not names:
+        return
+    warnings = bool(report["interactions"] or report["contraindicated"])
+    with st.expander(f"💊 Medications mentioned: {', '.join(names)}", expanded=warnings):
+        for drug, cond in report["contraindicated"]:
+            st.error(f"🚫 **{drug}** is contraindicated in **{cond}**")
+        for hit in report["interactions"]:
+            st.warning("⚠️ " + format_interaction(hit))
+        for drug in report["drugs"]:
+            st.markdown(
+                f"**{drug['name']}** ({drug['class']})  \n"
+                f"Major interactions: {drug['major_interactions'] or 'None listed'}  \n"
+                f"Contraindications: {drug['contraindications'] or 'None listed'}"
+            )
+        if report["external"]:
+            st.caption("Not in the drug database: " + ", ".join(report["external"]))
+        st.caption("Never start or stop a medication without advice from a healthcare professional.")
+
+def render_drug_details(drug: Dict, idx: int):
+    gradient_colors = [
+        "linear-gradient(135deg, #667eea 0%, #764ba2 100%)",
+        "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)",
+        "linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)",
+        "linear-gradient(135deg, #43e97b 0%, #38f9d7 100%)",
+        "linear-gradient(135deg, #fa709a 0%, #fee140 100%)"
+    ]
+    
+    # Drug header with gradient
+    st.markdown(f"""
+        <div style='background: {gradient_colors[idx % 5]}; padding: 20px; border-radius: 15px; margin-bottom: 20px; box-shadow: 0 8px 20px rgba(0,0,0,0.15);'>
+            <h2 style='color: white; margin: 0; text-align: center;'>{drug['name']}</h2>
+            <p style='color: white; text-align: center; font-size: 16px; margin: 5px 0; opacity: 0.9;'>{drug['class']}</p>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    # Main information in columns
+    col1, col2 = st.columns(2, gap="medium")
+    
+    with col1:
+        st.markdown("""
+            <div style='background: #f8f9fa; padding: 15px; border-radius: 10px; margin-bottom: 15px; border-left: 4px solid #28a745;'>
+                <h4 style='color: #28a745; margin: 0;'>🎯 Medical Uses</h4>
+            </div>
+        """, unsafe_allow_html=True)
+        st.markdown(f"**Indications:** {drug['indications']}")
+        
+        st.markdown("""
+            <div style='background: #fff3cd; padding: 15px; border-radius: 10px; margin: 15px 0; border-left: 4px solid #ffc107;'>
+                <h4 style='color: #856404; margin: 0;'>⚠️ Side Effects</h4>
+            </div>
+        """, unsafe_allow_html=True)
+        st.markdown(f"**Common Side Effects:** {drug['common_side_effects']}")
+    
+    with col2:
+        st.markdown("""
+            <div style='background: #f8d7da; padding: 15px; border-radius: 10px; margin-bottom: 15px; border-left: 4px solid #dc3545;'>
+                <h4 style='color: #721c24; margin: 0;'>🚫 Contraindications</h4>
+            </div>
+        """, unsafe_allow_html=True)
+        st.markdown(f"**Contraindications:** {drug.get('contraindications', 'None reported')}")
+        
+        st.markdown("""
+            <div style='background: #d1ecf1; padding: 15px; border-radius: 10px; margin: 15px 0; border-left: 4px solid #17a2b8;'>
+                <h4 style='color: #0c5460; margin: 0;'>🔗 Drug Interactions</h4>
+            </div>
+        """, unsafe_allow_html=True)
+        st.markdown(f"**Major Interactions:** {drug.get('major_interactions', 'None reported')}")
+    
+    # Footer with external links
+    st.markdown("---")
+    col_a, col_b, col_c = st.columns(3, gap="medium")
+    with col_a:
+        st.markdown(f"**[📚 PubMed Research](https://pubmed.ncbi.nlm.nih.gov/?term={drug['name']})**")
+    with col_b:
+        st.markdown(f"**[🏥 Drugs.com Info](https://www.drugs.com/search.php?searchterm={drug['name']})**")
+    with col_c:
+        st.markdown(f"**[📖 MedlinePlus](https://medlineplus.gov/druginfo/meds/search.html?query={drug['name']})**")
+
 def page_drugs(ctx):
     st.markdown("""
         <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 40px; border-radius: 20px; text-align: center; margin-bottom: 30px; box-shadow: 0 15px 35px rgba(102, 126, 234, 0.4);'>
@@ -1349,12 +1486,13 @@ def page_drugs(ctx):
         </style>
     """, unsafe_allow_html=True)
     
-    # Category pills
-    categories = list(set([drug['class'].split('(')[0].strip() for drug in SAMPLE_DRUGS]))
+    # Category pills (facet counts are precomputed per catalogue version)
+    catalogue = get_catalogue()
+    category_counts = catalogue.facets.values("category")
+    categories = [cat for cat, _ in category_counts]
     cols = st.columns(min(len(categories), 4))
-    for i, cat in enumerate(categories[:8]):
+    for i, (cat, count) in enumerate(category_counts[:8]):
         with cols[i % 4]:
-            count = len([d for d in SAMPLE_DRUGS if cat in d['class']])
             st.markdown(f"""
                 <div style='background: linear-gradient(135deg, #fa709a 0%, #fee140 100%); padding: 10px; border-radius: 20px; text-align: center; margin: 5px 0;'>
                     <small style='color: white; font-weight: 600;'>{cat}</small><br>
@@ -1364,12 +1502,37 @@ def page_drugs(ctx):
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Interaction checker (pairwise lookups in the precomputed interaction graph)
+    with st.expander("🔗 Check Interactions Between Medications", expanded=False):
+        med_col1, med_col2 = st.columns(2, gap="medium")
+        with med_col1:
+            chosen_meds = st.multiselect(
+                "Medications from the database",
+                catalogue.names(),
+                key="interaction_meds"
+            )
+        with med_col2:
+            other_meds = st.text_input(
+                "Other medications",
+                placeholder="e.g., warfarin, alcohol, ibuprofen",
+                key="interaction_other"
+            )
+        med_list = chosen_meds + [m.strip() for m in other_meds.split(",") if m.strip()]
+        if len(med_list) >= 2:
+            found = catalogue.interactions.check(med_list)
+            if not found:
+                st.success(f"✓ No major interactions listed among {len(med_list)} medications")
+            for hit in found:
+                st.warning("⚠️ " + format_interaction(hit))
+        else:
+            st.caption("Select or type at least two medications to check.")
+    
     # Enhanced search section
     col1, col2 = st.columns([3, 1])
     with col1:
         search_term = st.text_input(
             "🔍 Search Medications",
-            placeholder="Search by drug name, class, or indication...",
+            placeholder="Search by drug name, brand name, class, or indication...",
             key="drug_search"
         )
     with col2:
@@ -1379,83 +1542,97 @@ def page_drugs(ctx):
             key="category_filter"
         )
     
-    # Filter drugs
-    filtered_drugs = SAMPLE_DRUGS
-    if search_term:
-        filtered_drugs = [d for d in filtered_drugs if 
-                         search_term.lower() in d["name"].lower() or 
-                         search_term.lower() in d["class"].lower() or
-                         search_term.lower() in d["indications"].lower()]
+    # Side-effect / contraindication filters (parsed into facet terms when the catalogue loads)
+    side_effect_counts = dict(catalogue.facets.values("side_effect"))
+    contraindication_counts = dict(catalogue.facets.values("contraindication"))
+    fcol1, fcol2, fcol3 = st.columns([2, 2, 1])
+    with fcol1:
+        side_effect_filter = st.multiselect(
+            "Causes side effect",
+            list(side_effect_counts),
+            format_func=lambda v: f"{v} ({side_effect_counts[v]})",
+            placeholder="e.g., QT prolongation",
+            key="side_effect_filter"
+        )
+    with fcol2:
+        contraindication_filter = st.multiselect(
+            "Contraindicated in",
+            list(contraindication_counts),
+            format_func=lambda v: f"{v} ({contraindication_counts[v]})",
+            placeholder="e.g., Pregnancy",
+            key="contraindication_filter"
+        )
+    with fcol3:
+        contraindication_mode = st.radio(
+            "Contraindication filter",
+            ["Show", "Exclude"],
+            horizontal=True,
+            help="Show drugs contraindicated in the selected conditions, or hide them",
+            key="contraindication_mode"
+        )
+    
+    # Filter drugs (facet and search bitmaps are intersected before any card is built)
+    selections, exclusions = {}, {}
     if category_filter != "All Categories":
-        filtered_drugs = [d for d in filtered_drugs if category_filter in d["class"]]
+        selections["category"] = [category_filter]
+    if side_effect_filter:
+        selections["side_effect"] = side_effect_filter
+    if contraindication_filter:
+        target = exclusions if contraindication_mode == "Exclude" else selections
+        target["contraindication"] = contraindication_filter
+    search_bits = catalogue.search(search_term or "")
+    if search_term and search_term.strip():
+        # spelling correction and synonym / brand-name resolution (e.g. "Tylenol" -> Paracetamol)
+        suggestions = catalogue.suggest(search_term)
+        exact = [sug for sug in suggestions if sug["distance"] == 0]
+        if exact:
+            for sug in exact:
+                search_bits |= 1 << sug["doc_id"]
+        elif suggestions and not search_bits:
+            best = suggestions[0]["distance"]
+            corrected = [sug for sug in suggestions if sug["distance"] == best]
+            for sug in corrected:
+                search_bits |= 1 << sug["doc_id"]
+            st.info("🔤 No exact match — showing results for " + ", ".join(
+                f"**{sug['name']}**" + (f" ({sug['term']})" if sug["term"].lower() != sug["name"].lower() else "")
+                for sug in corrected
+            ))
+    result_bits = catalogue.facets.query(selections, base=search_bits, exclude=exclusions)
+    total = popcount(result_bits)
     
     st.markdown(f"""
         <div style='background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%); padding: 15px; border-radius: 10px; margin: 20px 0; text-align: center;'>
-            <h4 style='color: white; margin: 0;'>📊 Found {len(filtered_drugs)} medications</h4>
+            <h4 style='color: white; margin: 0;'>📊 Found {total} medications</h4>
         </div>
     """, unsafe_allow_html=True)
     
+    # Pagination: only the visible page of cards is rendered
+    page_col1, page_col2 = st.columns([1, 3])
+    with page_col1:
+        page_size = st.selectbox("Per page", DRUG_PAGE_SIZES, index=1, key="drug_page_size")
+    page_count = max(1, -(-total // page_size))
+    filter_signature = (catalogue.version, search_term, category_filter, tuple(side_effect_filter),
+                        tuple(contraindication_filter), contraindication_mode, page_size)
+    if st.session_state.get("drug_filter_signature") != filter_signature:
+        st.session_state["drug_filter_signature"] = filter_signature
+        st.session_state["drug_page"] = 1
+    with page_col2:
+        page = st.number_input(
+            f"Page (of {page_count})",
+            min_value=1,
+            max_value=page_count,
+            step=1,
+            key="drug_page"
+        )
+    offset = (int(page) - 1) * page_size
+    visible_drugs = catalogue.select(result_bits, offset=offset, limit=page_size)
+    if total:
+        st.caption(f"Showing {offset + 1}–{offset + len(visible_drugs)} of {total}")
+    
     # Display drugs in enhanced cards
-    for idx, drug in enumerate(filtered_drugs):
-        gradient_colors = [
-            "linear-gradient(135deg, #667eea 0%, #764ba2 100%)",
-            "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)",
-            "linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)",
-            "linear-gradient(135deg, #43e97b 0%, #38f9d7 100%)",
-            "linear-gradient(135deg, #fa709a 0%, #fee140 100%)"
-        ]
-        
+    for idx, drug in enumerate(visible_drugs, start=offset):
         with st.expander(f"💊 {drug['name']} ({drug['class']})", expanded=False):
-            # Drug header with gradient
-            st.markdown(f"""
-                <div style='background: {gradient_colors[idx % 5]}; padding: 20px; border-radius: 15px; margin-bottom: 20px; box-shadow: 0 8px 20px rgba(0,0,0,0.15);'>
-                    <h2 style='color: white; margin: 0; text-align: center;'>{drug['name']}</h2>
-                    <p style='color: white; text-align: center; font-size: 16px; margin: 5px 0; opacity: 0.9;'>{drug['class']}</p>
-                </div>
-            """, unsafe_allow_html=True)
-            
-            # Main information in columns
-            col1, col2 = st.columns(2, gap="medium")
-            
-            with col1:
-                st.markdown("""
-                    <div style='background: #f8f9fa; padding: 15px; border-radius: 10px; margin-bottom: 15px; border-left: 4px solid #28a745;'>
-                        <h4 style='color: #28a745; margin: 0;'>🎯 Medical Uses</h4>
-                    </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"**Indications:** {drug['indications']}")
-                
-                st.markdown("""
-                    <div style='background: #fff3cd; padding: 15px; border-radius: 10px; margin: 15px 0; border-left: 4px solid #ffc107;'>
-                        <h4 style='color: #856404; margin: 0;'>⚠️ Side Effects</h4>
-                    </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"**Common Side Effects:** {drug['common_side_effects']}")
-            
-            with col2:
-                st.markdown("""
-                    <div style='background: #f8d7da; padding: 15px; border-radius: 10px; margin-bottom: 15px; border-left: 4px solid #dc3545;'>
-                        <h4 style='color: #721c24; margin: 0;'>🚫 Contraindications</h4>
-                    </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"**Contraindications:** {drug.get('contraindications', 'None reported')}")
-                
-                st.markdown("""
-                    <div style='background: #d1ecf1; padding: 15px; border-radius: 10px; margin: 15px 0; border-left: 4px solid #17a2b8;'>
-                        <h4 style='color: #0c5460; margin: 0;'>🔗 Drug Interactions</h4>
-                    </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"**Major Interactions:** {drug.get('major_interactions', 'None reported')}")
-            
-            # Footer with external links
-            st.markdown("---")
-            col_a, col_b, col_c = st.columns(3, gap="medium")
-            with col_a:
-                st.markdown(f"**[📚 PubMed Research](https://pubmed.ncbi.nlm.nih.gov/?term={drug['name']})**")
-            with col_b:
-                st.markdown(f"**[🏥 Drugs.com Info](https://www.drugs.com/search.php?searchterm={drug['name']})**")
-            with col_c:
-                st.markdown(f"**[📖 MedlinePlus](https://medlineplus.gov/druginfo/meds/search.html?query={drug['name']})**")
+            render_drug_details(drug, idx)
 
 def page_selfcare(ctx):
     st.markdown("""
@@ -1741,6 +1918,8 @@ def page_ai_chat(ctx):
     # Initialize chat history
     if "ai_chat_history" not in st.session_state:
         st.session_state.ai_chat_history = []
+    if "ai_chat_context" not in st.session_state:
+        st.session_state.ai_chat_context = {}
     
     # Compact disclaimer
     with st.expander("⚠️ Important Safety Information - Click to read", expanded=False):
@@ -1778,20 +1957,12 @@ def page_ai_chat(ctx):
                     <strong>You:</strong><br>{msg['text']}
                 </div>
                 """, unsafe_allow_html=True)
+                if msg.get("medications"):
+                    render_medication_report(msg["medications"])
             else:
-                st.markdown(f"""
-                <div style='
-                    background: #38ef7d;
-                    color: purple;
-                    padding: 12px 18px;
-                    border-radius: 18px 18px 18px 5px;
-                    margin: 8px 80px 8px 0;
-                    border-left: 4px solid #0ea5e9;
-                    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
-                '>
-                    <strong style='color: #0ea5e9;'>🤖 AI Assistant:</strong><br>{msg['text']}
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(assistant_bubble(msg['text']), unsafe_allow_html=True)
+                if msg.get("similar"):
+                    st.caption(f"⚡ Answer reused from a similar earlier question ({msg['similar']:.0%} match)")
     
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -1828,6 +1999,7 @@ def page_ai_chat(ctx):
     with col2:
         if st.button("🗑️ Clear", use_container_width=True):
             st.session_state.ai_chat_history = []
+            st.session_state.ai_chat_context = {}
             st.rerun()
     
     # Send button styling
@@ -1858,31 +2030,50 @@ def page_ai_chat(ctx):
             if phi_detected:
                 st.warning("⚠️ Personal information removed for privacy")
             
+            # Medications mentioned in the message, with their database entries
+            med_report = get_catalogue().medication_report(sanitized_input)
+            med_context = medication_context(med_report)
+            
             # Add user message
             st.session_state.ai_chat_history.append({
                 "role": "user",
-                "text": sanitized_input
+                "text": sanitized_input,
+                "medications": med_report
             })
             
             try:
                 with st.spinner("🤖 AI is thinking..."):
-                    # Build full conversation context
-                    messages = [{"role": "system", "content": "You are a cautious, evidence-based medical assistant. Provide helpful information but always remind users to consult healthcare professionals."}]
+                    # Build conversation context within the token budget
+                    system = chat_system_prompt(med_context)
                     
-                    # Add conversation history
-                    for msg in st.session_state.ai_chat_history:
-                        messages.append({
-                            "role": msg["role"] if msg["role"] == "user" else "assistant",
-                            "content": msg["text"]
-                        })
+                    # Recent turns verbatim, older ones as a cached rolling summary
+                    history = [{
+                        "role": msg["role"] if msg["role"] == "user" else "assistant",
+                        "content": msg["text"]
+                    } for msg in st.session_state.ai_chat_history]
+                    context = get_chat_context(lambda previous, turns, max_tokens: summarize_chat(client, previous, turns, max_tokens))
+                    messages = context.build(system, history, st.session_state.ai_chat_context)
                     
-                    response = ""
-                    for chunk in send_chat_stream(messages, client):
-                        response += chunk
+                    # Single-turn questions close enough to an earlier one reuse its answer
+                    try:
+                        similar = get_similar_cache() if len(history) == 1 else None
+                    except SimilarCacheError:
+                        similar = None
+                    namespace = prompt_key([{"role": "system", "content": system}], client.get("model", ""))
+                    hit = similar.lookup(sanitized_input, namespace) if similar else None
+                    if hit:
+                        response = hit["response"]
+                    else:
+                        stream_status = {}
+                        response = stream_into(st.empty(), get_gateway().stream_sync(messages, client, status=stream_status, page="AI Chat"),
+                                               assistant_bubble)
+                        if similar and stream_status.get("ok"):
+                            similar.put(sanitized_input, response, namespace, stream_status.get("model") or "")
                     
                     st.session_state.ai_chat_history.append({
                         "role": "assistant",
-                        "text": response
+                        "text": response,
+                        "similar": hit["similarity"] if hit else None
                     })
                     
                     st.rerun()
@@ -2124,6 +2315,8 @@ def main():
         st.session_state.current_page = "Home"
     if "ai_chat_history" not in st.session_state:
         st.session_state.ai_chat_history = []
+    if "ai_chat_context" not in st.session_state:
+        st.session_state.ai_chat_context = {}
     if "ai_enabled" not in st.session_state:
         st.session_state.ai_enabled = False
     # ------------------------